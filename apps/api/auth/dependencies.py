@@ -1,38 +1,92 @@
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from pydantic import BaseModel
 from auth.jwt import decode_access_token
+from auth.principal_cache import principal_cache
+from auth.revocation import token_revocations
+from core.config import settings
 from core.database import prisma
 
 security = HTTPBearer()
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Dependency to get the current authenticated user"""
-    token = credentials.credentials
-    payload = decode_access_token(token)
-    
-    if payload is None:
+
+class TokenPrincipal(BaseModel):
+    """Identidad armada solo con los claims firmados del token (JWT_CLAIMS_MODE)."""
+    id: str
+    rol: str
+    empresaId: Optional[str] = None
+    tokenVersion: int = 0
+
+
+def _decode_credentials(credentials: HTTPAuthorizationCredentials) -> dict:
+    payload = decode_access_token(credentials.credentials)
+    if payload is None or payload.get("sub") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
-    
-    user_id: str = payload.get("sub")
-    if user_id is None:
+    return payload
+
+
+async def _load_user(payload: dict):
+    user_id: str = payload["sub"]
+    token_version = payload.get("ver", 0)
+    user = principal_cache.get(user_id, token_version)
+    if user is None:
+        user = await prisma.user.find_unique(where={"id": user_id})
+        if user is not None:
+            principal_cache.set(user_id, user, token_version)
+
+    if user is None or not user.activo:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
+            detail="User not found or inactive",
         )
-    
-    user = await prisma.user.find_unique(where={"id": user_id})
-    
-    if user is None or not user.activo:
+
+    # Un cambio de rol/desactivación incrementa tokenVersion: los tokens
+    # emitidos con la versión anterior quedan revocados.
+    if (user.tokenVersion or 0) != token_version:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found or inactive",
+            detail="Token revoked",
         )
-    
+
     return user
 
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Dependency to get the current authenticated user"""
+    return await _load_user(_decode_credentials(credentials))
+
+
+async def get_principal(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Dependency liviana para endpoints que solo necesitan id/rol/empresaId.
+
+    Con JWT_CLAIMS_MODE y un token que trae los claims, autoriza contra el
+    mapa de versiones en memoria sin consultar la base. En cualquier otro
+    caso (modo apagado, token viejo, mapa sin datos) cae a get_current_user.
+    """
+    payload = _decode_credentials(credentials)
+
+    if settings.JWT_CLAIMS_MODE and "rol" in payload and "ver" in payload:
+        token_version = payload.get("ver", 0)
+        current = token_revocations.is_current(payload["sub"], token_version)
+        if current is False:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token revoked",
+            )
+        if current:
+            return TokenPrincipal(
+                id=payload["sub"],
+                rol=payload["rol"],
+                empresaId=payload.get("empresaId"),
+                tokenVersion=token_version,
+            )
+
+    return await _load_user(payload)
+
 async def require_admin(current_user = Depends(get_current_user)):
     """Dependency to require admin role (INSTRUCTOR or SUPER_ADMIN)"""
     if current_user.rol not in ["INSTRUCTOR", "SUPER_ADMIN"]:
@@ -57,7 +111,7 @@ class RequireRole:
     def __init__(self, roles: list[str]):
         self.roles = roles
 
-    async def __call__(self, current_user = Depends(get_current_user)):
+    async def __call__(self, current_user = Depends(get_principal)):
         if current_user.rol not in self.roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -1,3 +1,7 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -14,17 +18,160 @@ from core.config import settings
 # compatible con los hashes ya guardados en la base sin migrar nada.
 MAX_PASSWORD_BYTES = 72
 
+logger = logging.getLogger("vmp-api.auth")
+
+# Costo (rounds) con el que se generan los hashes nuevos. Arranca en
+# BCRYPT_ROUNDS y, con BCRYPT_CALIBRATE, se toma al iniciar el worker de la
+# calibración compartida (use_shared_bcrypt_rounds). Los hashes guardados con
+# otro costo se regeneran en el próximo login exitoso (ver needs_rehash).
+_bcrypt_rounds = settings.BCRYPT_ROUNDS
+
+
+def get_bcrypt_rounds() -> int:
+    return _bcrypt_rounds
+
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
     password_bytes = password.encode("utf-8")[:MAX_PASSWORD_BYTES]
-    return bcrypt.hashpw(password_bytes, bcrypt.gensalt()).decode("utf-8")
+    return bcrypt.hashpw(password_bytes, bcrypt.gensalt(rounds=_bcrypt_rounds)).decode("utf-8")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
     password_bytes = plain_password.encode("utf-8")[:MAX_PASSWORD_BYTES]
     return bcrypt.checkpw(password_bytes, hashed_password.encode("utf-8"))
 
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """Costo de un hash bcrypt ("$2b$12$..." -> 12), None si no tiene ese formato"""
+    parts = hashed_password.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True si el hash guardado no usa el costo configurado"""
+    return hash_rounds(hashed_password) != _bcrypt_rounds
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int, max_rounds: int) -> int:
+    """Elige el mayor costo cuyo hash entra en target_ms en esta máquina.
+
+    Mide con min_rounds (mejor de 3, para no calibrar de más por ruido) y
+    extrapola: cada round extra duplica el tiempo. Bloquea el thread, llamar
+    fuera del event loop.
+    """
+    global _bcrypt_rounds
+    samples = []
+    for _ in range(3):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibracion", bcrypt.gensalt(rounds=min_rounds))
+        samples.append((time.perf_counter() - start) * 1000)
+    base_ms = min(samples)
+
+    rounds = min_rounds
+    while rounds < max_rounds and base_ms * 2 ** (rounds + 1 - min_rounds) <= target_ms:
+        rounds += 1
+
+    logger.info(
+        f"bcrypt calibrado: rounds={rounds} "
+        f"(~{base_ms * 2 ** (rounds - min_rounds):.0f} ms, objetivo {target_ms:.0f} ms)"
+    )
+    _bcrypt_rounds = rounds
+    return rounds
+
+async def use_shared_bcrypt_rounds(db, target_ms: float, min_rounds: int, max_rounds: int) -> int:
+    """Costo calibrado una sola vez para todos los workers (tabla bcrypt_calibration).
+
+    Si cada worker usara su propia calibración, needs_rehash haría ir y venir
+    el hash de un usuario según qué worker atienda el login. El primero que
+    arranca sin fila calibra y la guarda; si dos calibran a la vez gana el
+    primer INSERT y todos terminan usando ese valor.
+    """
+    global _bcrypt_rounds
+    configured = _bcrypt_rounds
+    try:
+        rows = await db.query_raw('SELECT "rounds" FROM "bcrypt_calibration" WHERE "id" = 1')
+        if not rows:
+            rounds = await asyncio.get_running_loop().run_in_executor(
+                None, calibrate_bcrypt_rounds, target_ms, min_rounds, max_rounds
+            )
+            await db.execute_raw(
+                'INSERT INTO "bcrypt_calibration" ("id", "rounds") VALUES (1, $1) ON CONFLICT ("id") DO NOTHING',
+                rounds,
+            )
+            rows = await db.query_raw('SELECT "rounds" FROM "bcrypt_calibration" WHERE "id" = 1')
+        _bcrypt_rounds = int(rows[0]["rounds"])
+    except Exception as e:
+        # Sin la tabla no hay un valor común: BCRYPT_ROUNDS es el mismo en todos
+        logger.warning(f"No se pudo usar la calibración compartida de bcrypt: {e}")
+        _bcrypt_rounds = configured
+    return _bcrypt_rounds
+
+# bcrypt tarda ~200-300 ms por llamada. Llamado directo desde un handler async
+# bloquea el event loop y frena todos los demás requests del worker, así que
+# los handlers usan las variantes *_async, que corren en un pool de threads
+# acotado (bcrypt libera el GIL, no hace falta un pool de procesos). Si ya hay
+# BCRYPT_POOL_MAX_PENDING operaciones en curso o en cola se rechaza la nueva
+# con PasswordHashPoolBusy (503) en vez de acumular latencia sin límite.
+class PasswordHashPoolBusy(RuntimeError):
+    """El pool de bcrypt alcanzó su límite de operaciones pendientes."""
+
+
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_pending = 0
+
+
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=settings.BCRYPT_POOL_SIZE,
+            thread_name_prefix="bcrypt",
+        )
+    return _hash_executor
+
+
+async def _run_in_hash_pool(func, *args):
+    global _hash_pending
+    if _hash_pending >= settings.BCRYPT_POOL_MAX_PENDING:
+        raise PasswordHashPoolBusy("Demasiadas operaciones de contraseña en curso")
+    _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), func, *args)
+    finally:
+        _hash_pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password fuera del event loop"""
+    return await _run_in_hash_pool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password fuera del event loop"""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+def hash_pool_stats() -> dict:
+    return {
+        "rounds": _bcrypt_rounds,
+        "pool_size": settings.BCRYPT_POOL_SIZE,
+        "max_pending": settings.BCRYPT_POOL_MAX_PENDING,
+        "pending": _hash_pending,
+    }
+
+def build_token_claims(user) -> dict:
+    """Claims del access token de un usuario.
+
+    Siempre incluye la versión de token ("ver"); con JWT_CLAIMS_MODE agrega
+    además rol y empresaId para que get_principal pueda autorizar sin query.
+    """
+    claims = {"sub": user.id, "ver": getattr(user, "tokenVersion", 0) or 0}
+    if settings.JWT_CLAIMS_MODE:
+        claims["rol"] = user.rol
+        claims["empresaId"] = user.empresaId
+    return claims
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
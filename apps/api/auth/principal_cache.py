@@ -0,0 +1,90 @@
+"""
+Cache en memoria (por proceso) del usuario autenticado.
+
+get_current_user corre en cada request autenticada y antes hacía siempre un
+prisma.user.find_unique solo para releer rol, empresaId y activo. Los
+dashboards disparan 6-10 llamadas en paralelo por página, así que ese
+round trip era la mayor parte del tráfico a la base.
+
+Las entradas se guardan por id de usuario junto con la versión de token con
+la que se cargaron: un token con otra versión es un miss. Cada escritura
+sobre el usuario (routers/users.py, SSO, reset de contraseña) llama a
+invalidate() para que el próximo request vuelva a leer de la base. Como cada
+worker de uvicorn tiene su propia copia, el TTL acota cuánto puede tardar en
+verse un cambio hecho desde otro worker.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from core.config import settings
+
+
+class PrincipalCache:
+    """LRU + TTL de usuarios autenticados, con contadores de hit/miss."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # user_id -> (token_version, expires_at, user)
+        self._entries: "OrderedDict[str, tuple[int, float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, user_id: str, token_version: int = 0) -> Optional[Any]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        version, expires_at, user = entry
+        if version != token_version or expires_at <= time.monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return user
+
+    def set(self, user_id: str, user: Any, token_version: int = 0) -> None:
+        if not self.enabled:
+            return
+        self._entries[user_id] = (token_version, time.monotonic() + self.ttl_seconds, user)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: str) -> None:
+        """Descarta la entrada de un usuario (llamar después de cualquier escritura sobre él)."""
+        if self._entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+principal_cache = PrincipalCache(
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,110 @@
+"""
+Mapa en memoria de versiones de token, para autorizar sin ir a la base.
+
+Con JWT_CLAIMS_MODE activo el token lleva firmados rol, empresaId y la
+versión de token del usuario (claim "ver"). Cada worker mantiene un mapa
+user_id -> (tokenVersion, activo) que se refresca en background cada
+TOKEN_REVOCATION_REFRESH_SECONDS trayendo solo los usuarios modificados
+desde la última pasada (users.updated_at), y se recarga completo cada
+TOKEN_REVOCATION_FULL_RELOAD_SECONDS para limpiar usuarios borrados.
+
+Desactivar un usuario o cambiarle el rol/empresa incrementa su tokenVersion,
+así que los tokens emitidos antes dejan de valer en cuanto el mapa se
+refresca. Si el mapa no conoce al usuario, quedó viejo (el loop se cayó) o
+el token es más nuevo que la versión que tiene (otro worker la incrementó),
+is_current() devuelve None y get_principal vuelve al camino con query.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from core.config import settings
+from core.database import prisma
+
+logger = logging.getLogger("vmp-api.auth")
+
+
+class TokenRevocationMap:
+    def __init__(self, refresh_seconds: float, full_reload_seconds: float) -> None:
+        self.refresh_seconds = refresh_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self._versions: dict[str, tuple[int, bool]] = {}
+        self._synced_until: Optional[datetime] = None
+        self._last_refresh = 0.0
+        self._last_full_reload = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_fresh(self) -> bool:
+        # Tolerar un par de refrescos fallidos antes de dejar de confiar en el mapa
+        return time.monotonic() - self._last_refresh < self.refresh_seconds * 3
+
+    def is_current(self, user_id: str, token_version: int) -> Optional[bool]:
+        """True/False si el mapa sabe la respuesta; None si hay que ir a la base."""
+        if not self.is_fresh:
+            return None
+        entry = self._versions.get(user_id)
+        if entry is None:
+            return None
+        version, activo = entry
+        if not activo or token_version < version:
+            return False
+        if token_version > version:
+            # Token emitido después de un cambio que este worker todavía no vio
+            return None
+        return True
+
+    def record(self, user_id: str, token_version: int, activo: bool) -> None:
+        """Actualiza la entrada local (escrituras hechas desde este mismo worker)."""
+        self._versions[user_id] = (token_version, activo)
+
+    def forget(self, user_id: str) -> None:
+        self._versions.pop(user_id, None)
+
+    async def refresh(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            # Margen para escrituras que estaban en vuelo durante la pasada anterior
+            started_at = datetime.utcnow() - timedelta(seconds=2)
+            full = (
+                self._synced_until is None
+                or now - self._last_full_reload >= self.full_reload_seconds
+            )
+            if full:
+                rows = await prisma.query_raw(
+                    'SELECT id, token_version, activo FROM "users"'
+                )
+                self._versions = {}
+                self._last_full_reload = now
+            else:
+                rows = await prisma.query_raw(
+                    'SELECT id, token_version, activo FROM "users" WHERE updated_at >= $1::timestamp',
+                    self._synced_until.isoformat(),
+                )
+            for row in rows:
+                self._versions[row["id"]] = (int(row["token_version"]), bool(row["activo"]))
+            self._synced_until = started_at
+            self._last_refresh = now
+
+    async def run_refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"No se pudo refrescar el mapa de versiones de token: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._versions),
+            "fresh": self.is_fresh,
+            "seconds_since_refresh": round(time.monotonic() - self._last_refresh, 1) if self._last_refresh else None,
+        }
+
+
+token_revocations = TokenRevocationMap(
+    refresh_seconds=settings.TOKEN_REVOCATION_REFRESH_SECONDS,
+    full_reload_seconds=settings.TOKEN_REVOCATION_FULL_RELOAD_SECONDS,
+)
@@ -25,5 +25,13 @@ celery_app.conf.update(
             "task": "workers.cron_jobs.check_expiring_credentials",
             "schedule": 86400.0, # Every 24 hours
         },
+        "refresh-metric-rollups": {
+            "task": "workers.cron_jobs.refresh_metric_rollups",
+            "schedule": 300.0, # Every 5 minutes
+        },
+        "rebuild-metric-rollups-daily": {
+            "task": "workers.cron_jobs.rebuild_metric_rollups",
+            "schedule": 86400.0, # Every 24 hours
+        },
     }
 )
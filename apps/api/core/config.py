@@ -11,7 +11,91 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 480  # 8 horas
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
-    
+
+    # Cache del usuario autenticado en get_current_user (por proceso).
+    # PRINCIPAL_CACHE_MAX_ENTRIES=0 lo desactiva.
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 2048
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
+
+    # Pool de threads para bcrypt (hash_password_async / verify_password_async)
+    BCRYPT_POOL_SIZE: int = 2
+    BCRYPT_POOL_MAX_PENDING: int = 64
+
+    # Costo de bcrypt para hashes nuevos. Con BCRYPT_CALIBRATE se calcula una
+    # vez (el mayor costo entre MIN y MAX cuyo hash tarde menos de
+    # BCRYPT_TARGET_MS en la CPU real) y se guarda en bcrypt_calibration para
+    # todos los workers. Los hashes con otro costo se regeneran en el
+    # siguiente login.
+    BCRYPT_ROUNDS: int = 12
+    BCRYPT_CALIBRATE: bool = False
+    BCRYPT_TARGET_MS: float = 250.0
+    BCRYPT_MIN_ROUNDS: int = 10
+    BCRYPT_MAX_ROUNDS: int = 14
+
+    # Modo "claims": el access token lleva rol, empresaId y tokenVersion
+    # firmados, y RequireRole/get_principal autorizan sin consultar la base
+    # (ver auth/revocation.py). Desactivado por defecto.
+    JWT_CLAIMS_MODE: bool = False
+    TOKEN_REVOCATION_REFRESH_SECONDS: float = 15.0
+    TOKEN_REVOCATION_FULL_RELOAD_SECONDS: float = 600.0
+
+    # Snapshots de métricas del dashboard: frescos durante TTL, luego se
+    # sirven viejos mientras se recalculan en background hasta MAX_STALE.
+    METRICS_SNAPSHOT_TTL_SECONDS: float = 30.0
+    METRICS_SNAPSHOT_MAX_STALE_SECONDS: float = 300.0
+
+    # Redis compartido entre workers (rate limiting; también lo usa Celery).
+    # Vacío: cada proceso lleva sus propios contadores.
+    REDIS_URL: str = ""
+    # Vida de los permisos de rate limit reservados localmente por clave
+    RATE_LIMIT_LEASE_SECONDS: float = 1.0
+
+    # Plan de cuentas en memoria para registrar ventas/compras
+    # (ver services/account_resolver.py)
+    ACCOUNT_RESOLVER_TTL_SECONDS: float = 300.0
+    # Importación masiva de ventas/compras: comprobantes por archivo y por transacción
+    ACCOUNTING_IMPORT_MAX_DOCUMENTS: int = 2000
+    ACCOUNTING_IMPORT_CHUNK_SIZE: int = 100
+    # Exportación del libro diario por streaming: partidas por consulta
+    ACCOUNTING_EXPORT_BATCH_SIZE: int = 1000
+    # Números de credencial que reserva cada worker de una vez
+    # (ver services/credential_numbering.py; 1 = numeración sin huecos)
+    CREDENTIAL_NUMBER_BLOCK_SIZE: int = 1
+    # Emisión de credenciales en lote: procesos que dibujan PDFs (cada uno
+    # carga reportlab), descargas/subidas simultáneas y vencimiento del job
+    CREDENTIAL_BATCH_PROCESSES: int = 2
+    CREDENTIAL_BATCH_UPLOAD_CONCURRENCY: int = 8
+    CREDENTIAL_BATCH_TIMEOUT_SECONDS: float = 900.0
+    # Fotos y firmas de las credenciales (services/asset_loader.py): tamaño
+    # del LRU en memoria, cada cuánto se revalidan y copia opcional en disco
+    ASSET_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    ASSET_CACHE_TTL_SECONDS: float = 3600.0
+    ASSET_CACHE_DIR: str = ""
+    # Validación pública de credenciales (escaneos de QR): resultados en
+    # memoria por worker; los números inexistentes se cachean menos tiempo.
+    # También es el max-age que se manda a proxies. 0 entradas lo desactiva.
+    CREDENTIAL_VALIDATION_CACHE_MAX_ENTRIES: int = 4096
+    CREDENTIAL_VALIDATION_CACHE_TTL_SECONDS: float = 60.0
+    CREDENTIAL_VALIDATION_NEGATIVE_TTL_SECONDS: float = 10.0
+    # Verificación masiva B2B (POST /b2b/credenciales/verificar): máximo de
+    # números + DNIs por pedido y cuántos se resuelven por consulta
+    CREDENTIAL_VERIFY_MAX_ITEMS: int = 5000
+    CREDENTIAL_VERIFY_CHUNK_SIZE: int = 500
+    # Manifiesto firmado para escáneres sin conexión: semilla de la clave
+    # Ed25519 (vacío = derivada de JWT_SECRET, ver services/offline_manifest.py)
+    OFFLINE_MANIFEST_SIGNING_KEY: str = ""
+    # La versión del manifiesto ignora las altas/bajas más nuevas que esto,
+    # por si todavía hay inserts con un id menor sin commitear
+    OFFLINE_MANIFEST_VERSION_LAG_SECONDS: int = 5
+    # Extracción de facturas PDF: procesos para texto/regex, threads para la
+    # llamada a Gemini y tiempo máximo de un job antes de darlo por perdido
+    INVOICE_PARSE_PROCESSES: int = 2
+    INVOICE_AI_THREADS: int = 4
+    INVOICE_JOB_TIMEOUT_SECONDS: float = 300.0
+    # ZIP de facturas: máximo de PDFs y tamaño máximo de cada PDF descomprimido
+    INVOICE_ZIP_MAX_FILES: int = 300
+    INVOICE_ZIP_MAX_FILE_BYTES: int = 15 * 1024 * 1024
+
     # CORS
     FRONTEND_URL: str = "https://www.vmp-edtech.com"
     ENVIRONMENT: str = "production"
@@ -0,0 +1,19 @@
+-- Migration: add_account_totals
+-- Totales acumulados de Debe/Haber por cuenta (ver services/ledger_service.py).
+-- El balance de sumas y saldos los lee directamente en vez de sumar ledger_entries.
+
+ALTER TABLE "accounts" ADD COLUMN IF NOT EXISTS "debit_total" DOUBLE PRECISION NOT NULL DEFAULT 0;
+ALTER TABLE "accounts" ADD COLUMN IF NOT EXISTS "credit_total" DOUBLE PRECISION NOT NULL DEFAULT 0;
+
+-- Carga inicial desde el libro mayor existente
+UPDATE "accounts" a
+SET "debit_total" = s.debit, "credit_total" = s.credit
+FROM (
+    SELECT "account_id", COALESCE(SUM("debit"), 0) AS debit, COALESCE(SUM("credit"), 0) AS credit
+    FROM "ledger_entries"
+    GROUP BY "account_id"
+) s
+WHERE s."account_id" = a."id";
+
+CREATE INDEX IF NOT EXISTS "ledger_entries_account_id_idx" ON "ledger_entries" ("account_id");
+CREATE INDEX IF NOT EXISTS "ledger_entries_journal_id_idx" ON "ledger_entries" ("journal_id");
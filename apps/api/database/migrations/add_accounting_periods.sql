@@ -0,0 +1,23 @@
+-- Migration: add_accounting_periods
+-- Cierres mensuales con el Debe/Haber acumulado por cuenta (ver services/period_close.py).
+-- Un balance a una fecha es el último cierre más los asientos posteriores.
+
+CREATE TABLE IF NOT EXISTS "accounting_periods" (
+  "id" TEXT PRIMARY KEY,
+  "period" TEXT NOT NULL UNIQUE,
+  "period_end" TIMESTAMP(3) NOT NULL UNIQUE,
+  "closed_by_id" TEXT,
+  "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS "account_balance_snapshots" (
+  "id" TEXT PRIMARY KEY,
+  "period_id" TEXT NOT NULL REFERENCES "accounting_periods"("id") ON DELETE CASCADE,
+  "account_id" TEXT NOT NULL,
+  "debit" DOUBLE PRECISION NOT NULL DEFAULT 0,
+  "credit" DOUBLE PRECISION NOT NULL DEFAULT 0,
+  UNIQUE ("period_id", "account_id")
+);
+
+-- El delta posterior al cierre filtra por fecha del asiento
+CREATE INDEX IF NOT EXISTS "journal_entries_date_idx" ON "journal_entries" ("date");
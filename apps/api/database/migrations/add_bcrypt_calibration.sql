@@ -0,0 +1,11 @@
+-- Migration: add_bcrypt_calibration
+-- Costo bcrypt calibrado (BCRYPT_CALIBRATE, ver auth/jwt.py). Una sola fila:
+-- el primer worker que calibra la guarda y todos usan ese valor, así los
+-- rehash del login no van y vienen entre costos distintos por worker.
+-- Para recalibrar (p. ej. después de cambiar de plan) borrar la fila.
+
+CREATE TABLE IF NOT EXISTS "bcrypt_calibration" (
+  "id" INTEGER PRIMARY KEY DEFAULT 1 CHECK ("id" = 1),
+  "rounds" INTEGER NOT NULL,
+  "calibrated_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
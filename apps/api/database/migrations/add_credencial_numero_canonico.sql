@@ -0,0 +1,34 @@
+-- Migration: add_credencial_numero_canonico
+-- Clave de búsqueda normalizada del número de credencial (ver
+-- services/credential_numbering.py::numero_canonico). La validación pública
+-- busca por igualdad sobre esta columna en vez de un IN con cinco variantes.
+
+ALTER TABLE "credenciales" ADD COLUMN IF NOT EXISTS "numero_canonico" TEXT;
+
+-- Carga inicial con la misma normalización que numero_canonico():
+--   VMP-YYYY-N (con o sin separadores)  -> VMP-YYYY-NNNNN
+--   BLT-RT/N, BLT-RT-N, BLT-RTN, N      -> VMP-2026-NNNNN (serie histórica)
+--   cualquier otro formato              -> en mayúsculas y sin espacios
+UPDATE "credenciales" c
+SET "numero_canonico" = CASE
+    WHEN p.anio IS NULL THEN p.num
+    ELSE 'VMP-' || p.anio || '-' || CASE WHEN length(p.codigo) < 5 THEN lpad(p.codigo, 5, '0') ELSE p.codigo END
+  END
+FROM (
+    SELECT
+      "id",
+      num,
+      COALESCE(vmp[1], CASE WHEN legacy IS NOT NULL THEN '2026' END) AS anio,
+      CAST(CAST(COALESCE(vmp[2], legacy[1]) AS NUMERIC) AS TEXT) AS codigo
+    FROM (
+        SELECT
+          "id",
+          num,
+          regexp_match(num, '^VMP[-/]?([0-9]{4})[-/]?([0-9]+)$') AS vmp,
+          regexp_match(num, '^(?:BLT-?RT[-/]?)?([0-9]+)$') AS legacy
+        FROM (SELECT "id", upper(regexp_replace("numero", '\s', '', 'g')) AS num FROM "credenciales") n
+    ) m
+) p
+WHERE c."id" = p."id";
+
+CREATE INDEX IF NOT EXISTS "credenciales_numero_canonico_idx" ON "credenciales" ("numero_canonico");
@@ -0,0 +1,7 @@
+-- Migration: add_credencial_pdf_hash
+-- PDFs de credenciales direccionados por contenido (ver services/credential_pdf.py):
+-- pdf_datos guarda lo que entra en el dibujo y pdf_hash la versión ya subida.
+-- Las credenciales existentes quedan con NULL y conservan su PDF.
+
+ALTER TABLE "credenciales" ADD COLUMN IF NOT EXISTS "pdf_datos" JSONB;
+ALTER TABLE "credenciales" ADD COLUMN IF NOT EXISTS "pdf_hash" TEXT;
@@ -0,0 +1,19 @@
+-- Migration: add_credential_batch_jobs
+-- Jobs de emisión de credenciales en lote (ver services/credential_batch.py).
+
+CREATE TABLE IF NOT EXISTS "credential_batch_jobs" (
+  "id" TEXT PRIMARY KEY,
+  "curso_id" TEXT NOT NULL,
+  "empresa_id" TEXT,
+  "status" TEXT NOT NULL DEFAULT 'PENDING',
+  "total" INTEGER NOT NULL DEFAULT 0,
+  "procesadas" INTEGER NOT NULL DEFAULT 0,
+  "emitidas" INTEGER NOT NULL DEFAULT 0,
+  "omitidas" INTEGER NOT NULL DEFAULT 0,
+  "fallidas" INTEGER NOT NULL DEFAULT 0,
+  "resultados" JSONB,
+  "error" TEXT,
+  "created_by_id" TEXT,
+  "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  "updated_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
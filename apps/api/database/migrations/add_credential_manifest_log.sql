@@ -0,0 +1,10 @@
+-- Migration: add_credential_manifest_log
+-- Altas y bajas de credenciales para los manifiestos delta de los escáneres
+-- sin conexión (ver services/offline_manifest.py). El id es la versión.
+
+CREATE TABLE IF NOT EXISTS "credential_manifest_log" (
+  "version" SERIAL PRIMARY KEY,
+  "numero" TEXT NOT NULL,
+  "accion" TEXT NOT NULL,
+  "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,20 @@
+-- Migration: add_credential_sequences
+-- Secuencia por año de los números de credencial VMP-YYYY-NNNNN (ver services/credential_numbering.py).
+-- Se reserva con UPDATE ... RETURNING en lugar de leer la última credencial.
+
+CREATE TABLE IF NOT EXISTS "credential_sequences" (
+  "year" INTEGER PRIMARY KEY,
+  "last_value" INTEGER NOT NULL DEFAULT 0
+);
+
+-- Carga inicial: mayor número ya emitido por año
+INSERT INTO "credential_sequences" ("year", "last_value")
+SELECT CAST(m[1] AS INTEGER), MAX(CAST(m[2] AS INTEGER))
+FROM (
+    SELECT regexp_match("numero", '^VMP-([0-9]{4})-([0-9]+)$') AS m
+    FROM "credenciales"
+) c
+WHERE m IS NOT NULL
+GROUP BY m[1]
+ON CONFLICT ("year") DO UPDATE
+SET "last_value" = GREATEST("credential_sequences"."last_value", EXCLUDED."last_value");
@@ -0,0 +1,6 @@
+-- Migration: add_invoice_extraction_batches
+-- Lotes de facturas subidas en un ZIP (ver services/invoice_extraction.py).
+
+ALTER TABLE "invoice_extraction_jobs" ADD COLUMN IF NOT EXISTS "batch_id" TEXT;
+
+CREATE INDEX IF NOT EXISTS "invoice_extraction_jobs_batch_id_idx" ON "invoice_extraction_jobs" ("batch_id");
@@ -0,0 +1,19 @@
+-- Migration: add_invoice_extraction_jobs
+-- Jobs de extracción de facturas PDF de compras (ver services/invoice_extraction.py).
+-- Un job DONE funciona como cache del PDF por su sha256.
+
+CREATE TABLE IF NOT EXISTS "invoice_extraction_jobs" (
+  "id" TEXT PRIMARY KEY,
+  "sha256" TEXT NOT NULL,
+  "filename" TEXT,
+  "status" TEXT NOT NULL DEFAULT 'PENDING',
+  "source" TEXT,
+  "result" JSONB,
+  "error" TEXT,
+  "created_by_id" TEXT,
+  "created_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  "updated_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS "invoice_extraction_jobs_sha256_status_idx"
+  ON "invoice_extraction_jobs" ("sha256", "status");
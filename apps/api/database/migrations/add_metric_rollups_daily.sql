@@ -0,0 +1,20 @@
+-- Migration: add_metric_rollups_daily
+-- Rollups diarios de métricas para los dashboards (services/metric_rollups.py).
+-- Después de crear la tabla, cargarla con la tarea rebuild_metric_rollups
+-- o con POST /api/admin/rollups/rebuild.
+
+CREATE TABLE IF NOT EXISTS "metric_rollups_daily" (
+  "day" DATE NOT NULL,
+  "metric" TEXT NOT NULL,
+  "dimension" TEXT NOT NULL DEFAULT '',
+  "count" INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY ("day", "metric", "dimension")
+);
+
+CREATE INDEX IF NOT EXISTS "metric_rollups_daily_metric_day_idx" ON "metric_rollups_daily" ("metric", "day");
+
+-- refresh_recent busca los registros modificados recientemente
+CREATE INDEX IF NOT EXISTS "cotizaciones_updated_at_idx" ON "cotizaciones" ("updated_at");
+CREATE INDEX IF NOT EXISTS "inscripciones_updated_at_idx" ON "inscripciones" ("updated_at");
+CREATE INDEX IF NOT EXISTS "credenciales_created_at_idx" ON "credenciales" ("created_at");
+CREATE INDEX IF NOT EXISTS "examenes_realizado_at_idx" ON "examenes" ("realizado_at");
@@ -0,0 +1,12 @@
+-- Migration: add_user_dni_normalizado
+-- Clave de búsqueda normalizada del DNI (ver services/dni.py::normalizar_dni).
+-- users.dni conserva lo que se cargó ("30.123.456"); la verificación masiva
+-- busca por igualdad sobre esta columna.
+
+ALTER TABLE "users" ADD COLUMN IF NOT EXISTS "dni_normalizado" TEXT;
+
+-- Carga inicial con la misma normalización que normalizar_dni()
+UPDATE "users"
+SET "dni_normalizado" = regexp_replace(upper("dni"), '[^0-9A-Z]', '', 'g');
+
+CREATE INDEX IF NOT EXISTS "users_dni_normalizado_idx" ON "users" ("dni_normalizado");
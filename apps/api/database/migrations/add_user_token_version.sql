@@ -0,0 +1,8 @@
+-- Migration: add_user_token_version
+-- Versión de token por usuario (JWT_CLAIMS_MODE, ver auth/revocation.py).
+-- Se incrementa al desactivar un usuario o cambiarle rol/empresa.
+
+ALTER TABLE "users" ADD COLUMN IF NOT EXISTS "token_version" INTEGER NOT NULL DEFAULT 0;
+
+-- El refresco incremental del mapa de revocación filtra por updated_at
+CREATE INDEX IF NOT EXISTS "users_updated_at_idx" ON "users" ("updated_at");
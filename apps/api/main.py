@@ -1,4 +1,5 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from core.config import settings
 from middleware.security import (
@@ -7,12 +8,17 @@ from middleware.security import (
     limiter,
     _rate_limit_exceeded_handler
 )
-from slowapi.errors import RateLimitExceeded
+from middleware.rate_limit import RateLimitExceeded
+from fastapi.responses import JSONResponse
+from auth.jwt import PasswordHashPoolBusy, use_shared_bcrypt_rounds
+from auth.revocation import token_revocations
+from services import credential_batch, invoice_extraction
+from services.asset_loader import asset_loader
 import sentry_sdk
 from sentry_sdk.integrations.fastapi import FastApiIntegration
 from core.logging import setup_logging
 
-from core.database import connect_db, disconnect_db
+from core.database import connect_db, disconnect_db, prisma
 
 # Setup structured logging
 setup_logging()
@@ -35,9 +41,24 @@ app = FastAPI(
 @app.on_event("startup")
 async def startup():
     await connect_db()
+    if settings.BCRYPT_CALIBRATE:
+        await use_shared_bcrypt_rounds(
+            prisma,
+            settings.BCRYPT_TARGET_MS,
+            settings.BCRYPT_MIN_ROUNDS,
+            settings.BCRYPT_MAX_ROUNDS,
+        )
+    if settings.JWT_CLAIMS_MODE:
+        app.state.token_revocation_task = asyncio.create_task(token_revocations.run_refresh_loop())
 
 @app.on_event("shutdown")
 async def shutdown():
+    task = getattr(app.state, "token_revocation_task", None)
+    if task is not None:
+        task.cancel()
+    invoice_extraction.shutdown()
+    credential_batch.shutdown()
+    await asset_loader.aclose()
     await disconnect_db()
 
 # Rate limiter state
@@ -45,6 +66,17 @@ app.state.limiter = limiter
 
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+
+@app.exception_handler(PasswordHashPoolBusy)
+async def password_hash_pool_busy_handler(request: Request, exc: PasswordHashPoolBusy):
+    # El pool de bcrypt está saturado (ráfaga de logins/altas): mejor pedir
+    # reintento que encolar sin límite y frenar al resto de la API.
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Servidor ocupado, reintentá en unos segundos."},
+        headers={"Retry-After": "2"},
+    )
+
 # Security Middleware
 app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(RequestIDMiddleware)
@@ -0,0 +1,256 @@
+"""
+Rate limiting con ventana deslizante y almacenamiento compartido.
+
+slowapi guardaba los contadores en la memoria de cada proceso: con varios
+workers de uvicorn cada uno aplicaba su propio límite y el efectivo se
+multiplicaba por la cantidad de workers. Acá los contadores viven en un
+store intercambiable:
+
+- RedisSlidingWindowStore: compartido entre workers (REDIS_URL). Cada
+  chequeo es un único EVALSHA de un script Lua, o sea un round trip.
+- MemorySlidingWindowStore: en proceso. Es el default sin REDIS_URL y el
+  fake de los tests; implementa exactamente el mismo algoritmo.
+
+El algoritmo es el de "ventana deslizante por contador": se guarda un
+contador por ventana fija y se estima la ventana deslizante como
+    anterior * (1 - fracción transcurrida de la actual) + actual
+que usa memoria O(1) por clave (a diferencia de guardar cada timestamp).
+
+Para no ir al store en cada request de los endpoints públicos calientes, el
+RateLimiter mantiene por clave un pequeño token bucket local:
+- cuando una clave agota su reserva local dentro de RATE_LIMIT_LEASE_SECONDS,
+  el siguiente chequeo pide al store varios permisos de una vez (prefetch)
+  y los consume localmente;
+- cuando el store rechaza, la clave queda bloqueada localmente hasta el
+  Retry-After, sin más consultas.
+Los permisos reservados y no usados cuentan igual contra el límite, así que
+la reserva nunca deja pasar más requests que el límite configurado.
+"""
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Optional, Protocol
+
+logger = logging.getLogger("vmp-api.ratelimit")
+
+
+@dataclass
+class WindowResult:
+    """Resultado de pedir `cost` permisos al store."""
+    granted: int
+    retry_after: float
+
+
+def _window_state(now: float, window_seconds: float) -> tuple[int, float]:
+    """(índice de la ventana fija actual, fracción transcurrida de esa ventana)"""
+    bucket = int(now // window_seconds)
+    return bucket, (now - bucket * window_seconds) / window_seconds
+
+
+def _retry_after(current: int, previous: int, limit: int, elapsed: float, window_seconds: float) -> float:
+    """Segundos hasta que la estimación deje lugar para un request más."""
+    room = limit - 1 - current
+    if room < 0 or previous <= 0:
+        # La ventana actual sola ya está llena: esperar a que termine
+        return (1 - elapsed) * window_seconds
+    needed_elapsed = 1 - room / previous
+    return max(0.0, (needed_elapsed - elapsed) * window_seconds)
+
+
+def _grant(current: int, previous: int, limit: int, cost: int, elapsed: float) -> int:
+    estimated = previous * (1 - elapsed) + current
+    return max(0, min(cost, math.floor(limit - estimated)))
+
+
+class SlidingWindowStore(Protocol):
+    is_shared: bool
+
+    async def acquire(self, key: str, limit: int, window_seconds: float, cost: int = 1) -> WindowResult:
+        """Otorga hasta `cost` permisos para `key`; granted=0 si está al límite."""
+        ...
+
+
+class MemorySlidingWindowStore:
+    """Store en proceso (un worker, o fake de tests)."""
+
+    is_shared = False
+
+    def __init__(self, clock=time.time) -> None:
+        self._clock = clock
+        # key -> (bucket, current, previous)
+        self._counters: dict[str, tuple[int, int, int]] = {}
+
+    async def acquire(self, key: str, limit: int, window_seconds: float, cost: int = 1) -> WindowResult:
+        bucket, elapsed = _window_state(self._clock(), window_seconds)
+        stored_bucket, current, previous = self._counters.get(key, (bucket, 0, 0))
+        if stored_bucket != bucket:
+            previous = current if stored_bucket == bucket - 1 else 0
+            current = 0
+
+        granted = _grant(current, previous, limit, cost, elapsed)
+        current += granted
+        self._counters[key] = (bucket, current, previous)
+
+        if len(self._counters) > 10_000:
+            self._prune(bucket)
+
+        retry_after = 0.0 if granted else _retry_after(current, previous, limit, elapsed, window_seconds)
+        return WindowResult(granted=granted, retry_after=retry_after)
+
+    def _prune(self, bucket: int) -> None:
+        # Claves que no se tocaron en las dos últimas ventanas ya no aportan nada
+        self._counters = {k: v for k, v in self._counters.items() if v[0] >= bucket - 1}
+
+    def reset(self) -> None:
+        self._counters.clear()
+
+
+# KEYS[1] = contador de la ventana actual, KEYS[2] = el de la anterior
+# ARGV = limit, elapsed (fracción), cost, ttl en ms
+# Devuelve {granted, current, previous}
+_SLIDING_WINDOW_LUA = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local limit = tonumber(ARGV[1])
+local elapsed = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local granted = math.floor(limit - (previous * (1 - elapsed) + current))
+if granted > cost then granted = cost end
+if granted <= 0 then
+    return {0, current, previous}
+end
+current = redis.call('INCRBY', KEYS[1], granted)
+if current == granted then
+    redis.call('PEXPIRE', KEYS[1], ARGV[4])
+end
+return {granted, current, previous}
+"""
+
+
+class RedisSlidingWindowStore:
+    """Store compartido entre workers sobre Redis (o cualquier server con su protocolo)."""
+
+    is_shared = True
+
+    def __init__(self, url: str, prefix: str = "rl", client=None, clock=time.time) -> None:
+        self.url = url
+        self.prefix = prefix
+        self._client = client
+        self._clock = clock
+        self._script = None
+
+    def _get_script(self):
+        # redis se importa recién acá: solo hace falta si hay REDIS_URL
+        if self._script is None:
+            client = self._client
+            if client is None:
+                import redis.asyncio as redis
+
+                client = redis.from_url(self.url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            self._script = client.register_script(_SLIDING_WINDOW_LUA)
+        return self._script
+
+    async def acquire(self, key: str, limit: int, window_seconds: float, cost: int = 1) -> WindowResult:
+        bucket, elapsed = _window_state(self._clock(), window_seconds)
+        # El hash tag {key} mantiene ambas claves en el mismo slot (Redis Cluster)
+        keys = [f"{self.prefix}:{{{key}}}:{bucket}", f"{self.prefix}:{{{key}}}:{bucket - 1}"]
+        ttl_ms = int(window_seconds * 2 * 1000)
+        granted, current, previous = await self._get_script()(
+            keys=keys, args=[limit, elapsed, cost, ttl_ms]
+        )
+        granted, current, previous = int(granted), int(current), int(previous)
+        retry_after = 0.0 if granted else _retry_after(current, previous, limit, elapsed, window_seconds)
+        return WindowResult(granted=granted, retry_after=retry_after)
+
+
+@dataclass
+class _LocalBucket:
+    tokens: int = 0
+    expires_at: float = 0.0
+    exhausted_early: bool = False
+    blocked_until: float = 0.0
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, limit: str, retry_after: float) -> None:
+        super().__init__(limit)
+        self.limit = limit
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Chequea límites contra un SlidingWindowStore con reserva local por clave."""
+
+    def __init__(self, store: SlidingWindowStore, lease_seconds: float = 1.0, fallback: Optional[SlidingWindowStore] = None) -> None:
+        self.store = store
+        self.lease_seconds = lease_seconds
+        # Si el store compartido no responde se sigue limitando por proceso
+        self.fallback = fallback or MemorySlidingWindowStore()
+        self._buckets: dict[str, _LocalBucket] = {}
+        self.store_calls = 0
+        self.local_hits = 0
+
+    async def hit(self, key: str, limit: int, window_seconds: float, prefetch: int = 1) -> None:
+        """Consume un permiso para `key` o levanta RateLimitExceeded."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            if now < bucket.blocked_until:
+                self.local_hits += 1
+                raise RateLimitExceeded(f"{limit} per {window_seconds:g}s", bucket.blocked_until - now)
+            if bucket.tokens > 0 and now < bucket.expires_at:
+                bucket.tokens -= 1
+                if bucket.tokens == 0:
+                    bucket.exhausted_early = True
+                self.local_hits += 1
+                return
+
+        # Solo se reserva por adelantado para claves calientes (que agotaron
+        # la reserva anterior antes de que venciera) y con store compartido
+        cost = 1
+        if self.store.is_shared and prefetch > 1 and bucket is not None and bucket.exhausted_early and now < bucket.expires_at:
+            cost = prefetch
+
+        result = await self._acquire(key, limit, window_seconds, cost)
+        if bucket is None:
+            bucket = self._buckets[key] = _LocalBucket()
+            if len(self._buckets) > 10_000:
+                self._prune(now)
+
+        if result.granted == 0:
+            bucket.tokens = 0
+            bucket.blocked_until = now + result.retry_after
+            raise RateLimitExceeded(f"{limit} per {window_seconds:g}s", result.retry_after)
+
+        bucket.tokens = result.granted - 1
+        bucket.expires_at = now + self.lease_seconds
+        bucket.exhausted_early = bucket.tokens == 0
+
+    async def _acquire(self, key: str, limit: int, window_seconds: float, cost: int) -> WindowResult:
+        self.store_calls += 1
+        try:
+            return await self.store.acquire(key, limit, window_seconds, cost)
+        except Exception as e:
+            logger.warning(f"Store de rate limit no disponible, usando contadores locales: {e}")
+            return await self.fallback.acquire(key, limit, window_seconds, cost)
+
+    def _prune(self, now: float) -> None:
+        self._buckets = {
+            k: b for k, b in self._buckets.items()
+            if b.expires_at > now or b.blocked_until > now
+        }
+
+    def reset(self) -> None:
+        self._buckets.clear()
+        for store in (self.store, self.fallback):
+            if hasattr(store, "reset"):
+                store.reset()
+
+    def stats(self) -> dict:
+        return {
+            "store": type(self.store).__name__,
+            "store_calls": self.store_calls,
+            "local_hits": self.local_hits,
+            "local_keys": len(self._buckets),
+        }
@@ -2,18 +2,44 @@
 Middleware de seguridad para la aplicación.
 Incluye rate limiting, headers de seguridad, y CORS.
 """
+import functools
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 from starlette.middleware.base import BaseHTTPMiddleware
 from typing import Callable
 import time
 
+from auth.jwt import decode_access_token
+from core.config import settings
+from middleware.rate_limit import (
+    MemorySlidingWindowStore,
+    RateLimiter,
+    RateLimitExceeded,
+    RedisSlidingWindowStore,
+)
+
+
+def get_remote_address(request: Request) -> str:
+    return request.client.host if request.client else "127.0.0.1"
+
+
+def _build_limiter() -> RateLimiter:
+    # Con REDIS_URL los contadores se comparten entre workers; sin él cada
+    # proceso limita por su cuenta (desarrollo, tests, un solo worker).
+    store = RedisSlidingWindowStore(settings.REDIS_URL) if settings.REDIS_URL else MemorySlidingWindowStore()
+    return RateLimiter(store, lease_seconds=settings.RATE_LIMIT_LEASE_SECONDS)
+
 
 # Configurar rate limiter
-limiter = Limiter(key_func=get_remote_address)
+limiter = _build_limiter()
+
+
+async def _rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"error": f"Rate limit exceeded: {exc.limit}"},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
 
 
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
@@ -60,27 +86,66 @@ class RequestIDMiddleware(BaseHTTPMiddleware):
         return response
 
 
+def _user_or_address(request: Request) -> str:
+    """Clave por usuario si el request trae un token válido, si no por IP."""
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        payload = decode_access_token(authorization[7:])
+        if payload and payload.get("sub"):
+            return f"user:{payload['sub']}"
+    return f"ip:{get_remote_address(request)}"
+
+
+def _address(request: Request) -> str:
+    return f"ip:{get_remote_address(request)}"
+
+
+def rate_limit(limit: int, window_seconds: float, per_user: bool = False, prefetch: int = 1):
+    """Decorator de rate limit por ruta (el endpoint debe recibir `request: Request`).
+
+    per_user: la clave es el usuario autenticado en vez de la IP.
+    prefetch: permisos que se reservan de una vez para claves calientes
+    (ver middleware/rate_limit.py); solo aplica con store compartido.
+    """
+    key_func = _user_or_address if per_user else _address
+
+    def decorator(func):
+        scope = f"{func.__module__}.{func.__name__}"
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            request = kwargs.get("request")
+            if request is None:
+                request = next(a for a in args if isinstance(a, Request))
+            await limiter.hit(f"{scope}:{key_func(request)}", limit, window_seconds, prefetch)
+            return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
 # Rate limit decorators para endpoints específicos
 def rate_limit_login():
     """Rate limit para login: 5 requests por minuto"""
-    return limiter.limit("5/minute")
+    return rate_limit(5, 60)
 
 
 def rate_limit_forgot_password():
     """Rate limit para forgot password: 3 requests por minuto"""
-    return limiter.limit("3/minute")
+    return rate_limit(3, 60)
 
 
 def rate_limit_public():
     """Rate limit para endpoints públicos: 20 requests por minuto"""
-    return limiter.limit("20/minute")
+    return rate_limit(20, 60, prefetch=5)
 
 
 def rate_limit_api():
     """Rate limit general para API: 60 requests por minuto"""
-    return limiter.limit("60/minute")
+    return rate_limit(60, 60, per_user=True, prefetch=10)
 
 
 def rate_limit_ia():
     """Rate limit para endpoints de validación con IA (costo por llamada externa): 10 requests por minuto"""
-    return limiter.limit("10/minute")
+    return rate_limit(10, 60, per_user=True)
@@ -1,8 +1,6 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Request
-import re
-import io
-import os
-import json
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Request, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
 from schemas.accounting import (
     AccountResponse, CreateAccountRequest, 
@@ -10,13 +8,20 @@ from schemas.accounting import (
     CreateManualJournalEntryRequest,
     VentaResponse, CreateVentaRequest,
     CompraResponse, CreateCompraRequest,
-    CajaMovimientoResponse, BalanceRow
+    CajaMovimientoResponse, BalanceRow,
+    ImportacionResponse, CierrePeriodoRequest, PeriodoResponse
 )
 from auth.dependencies import get_current_user, RequireRole
 from core.database import prisma
 from datetime import datetime
 from services.webhook_service import emit, WebhookEvent
-from services.audit_service import log_audit_action
+from services.audit_service import log_audit_action, log_audit_actions
+from services import ledger_service
+from services.account_resolver import account_resolver
+from services import accounting_export, accounting_import, invoice_extraction, period_close
+from services.accounting_posting import (
+    PostingError, validar_compra, cuentas_venta, partidas_venta, cuentas_compra, partidas_compra
+)
 
 router = APIRouter(dependencies=[Depends(RequireRole(["SUPER_ADMIN", "CONTADOR"]))])
 
@@ -32,7 +37,9 @@ async def listar_cuentas(current_user=Depends(get_current_user)):
 async def crear_cuenta(data: CreateAccountRequest, current_user=Depends(get_current_user)):
     if current_user.rol != "SUPER_ADMIN":
         raise HTTPException(status_code=403, detail="No tienes permisos")
-    return await prisma.account.create(data=data.model_dump())
+    account = await prisma.account.create(data=data.model_dump())
+    account_resolver.invalidate()
+    return account
 
 # --- Libro Diario ---
 
@@ -67,6 +74,43 @@ async def listar_asientos(desde: Optional[str] = None, hasta: Optional[str] = No
         order={"date": "desc"}
     )
 
+@router.get("/journal/export")
+async def exportar_diario(
+    formato: str = Query(accounting_export.CSV, pattern="^(csv|xlsx)$"),
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    cuenta: Optional[str] = None,
+    current_user=Depends(get_current_user)
+):
+    """Libro diario completo (o de una cuenta) en CSV o XLSX, leído y enviado por lotes."""
+    if current_user.rol != "SUPER_ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permisos")
+
+    fecha_desde = fecha_hasta = None
+    if desde:
+        try:
+            fecha_desde = datetime.strptime(f"{desde} 00:00:00", "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Formato 'desde' inválido. Debe ser YYYY-MM-DD")
+    if hasta:
+        try:
+            fecha_hasta = datetime.strptime(f"{hasta} 23:59:59", "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Formato 'hasta' inválido. Debe ser YYYY-MM-DD")
+
+    nombre = f"libro_diario_{datetime.now().strftime('%Y-%m-%d')}.{formato}"
+    if formato == accounting_export.XLSX:
+        contenido = accounting_export.diario_xlsx(fecha_desde, fecha_hasta, cuenta)
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        contenido = accounting_export.diario_csv(fecha_desde, fecha_hasta, cuenta)
+        media_type = "text/csv; charset=utf-8"
+    return StreamingResponse(
+        contenido,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
+    )
+
 @router.post("/journal", response_model=JournalEntryResponse)
 async def crear_asiento_manual(request: Request, data: CreateManualJournalEntryRequest, current_user=Depends(get_current_user)):
     if current_user.rol != "SUPER_ADMIN":
@@ -104,10 +148,25 @@ async def crear_asiento_manual(request: Request, data: CreateManualJournalEntryR
     if missing_accounts:
         raise HTTPException(status_code=400, detail=f"Las siguientes cuentas contables no existen: {', '.join(missing_accounts)}")
 
-    # 4. Crear Asiento dentro de una transacción robusta de Prisma
+    # 4. No se puede asentar dentro de un período cerrado
+    asiento_date = data.date or datetime.now()
+    try:
+        await period_close.verificar_abierto(asiento_date)
+    except period_close.PeriodoError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    # 5. Crear Asiento dentro de una transacción robusta de Prisma
     try:
-        asiento_date = data.date or datetime.now()
+        partidas = [
+            {
+                "accountId": entry.accountId,
+                "description": entry.description,
+                "debit": entry.debit,
+                "credit": entry.credit
+            } for entry in data.entries
+        ]
         async with prisma.tx() as transaction:
+            await ledger_service.aplicar_movimientos(transaction, partidas)
             asiento = await transaction.journalentry.create(
                 data={
                     "concept": data.concept,
@@ -115,14 +174,7 @@ async def crear_asiento_manual(request: Request, data: CreateManualJournalEntryR
                     "type": "GENERAL",
                     "date": asiento_date,
                     "entries": {
-                        "create": [
-                            {
-                                "accountId": entry.accountId,
-                                "description": entry.description,
-                                "debit": entry.debit,
-                                "credit": entry.credit
-                            } for entry in data.entries
-                        ]
+                        "create": partidas
                     }
                 },
                 include={
@@ -154,7 +206,14 @@ async def crear_asiento_manual(request: Request, data: CreateManualJournalEntryR
         raise HTTPException(status_code=500, detail=f"Error al registrar el asiento contable: {str(e)}")
 
 @router.get("/journal/accounts/{code}")
-async def listar_mayor_cuenta(code: str, desde: Optional[str] = None, hasta: Optional[str] = None, current_user=Depends(get_current_user)):
+async def listar_mayor_cuenta(
+    code: str,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=1000),
+    current_user=Depends(get_current_user)
+):
     if current_user.rol != "SUPER_ADMIN":
         raise HTTPException(status_code=403, detail="No tienes permisos")
         
@@ -163,66 +222,25 @@ async def listar_mayor_cuenta(code: str, desde: Optional[str] = None, hasta: Opt
     if not account:
         raise HTTPException(status_code=404, detail=f"Cuenta contable con código {code} no encontrada.")
         
-    # 2. Filtrar movimientos
-    where_clause = {
-        "accountId": account.id
-    }
-    
-    # Filtrar por la fecha del asiento padre
-    date_filter = {}
+    # 2. Filtrar por la fecha del asiento padre
+    fecha_desde = fecha_hasta = None
     if desde:
         try:
-            date_filter["gte"] = datetime.strptime(f"{desde} 00:00:00", "%Y-%m-%d %H:%M:%S")
+            fecha_desde = datetime.strptime(f"{desde} 00:00:00", "%Y-%m-%d %H:%M:%S")
         except ValueError:
             raise HTTPException(status_code=400, detail="Formato 'desde' inválido. Debe ser YYYY-MM-DD")
     if hasta:
         try:
-            date_filter["lte"] = datetime.strptime(f"{hasta} 23:59:59", "%Y-%m-%d %H:%M:%S")
+            fecha_hasta = datetime.strptime(f"{hasta} 23:59:59", "%Y-%m-%d %H:%M:%S")
         except ValueError:
             raise HTTPException(status_code=400, detail="Formato 'hasta' inválido. Debe ser YYYY-MM-DD")
             
-    if date_filter:
-        where_clause["journal"] = {
-            "is": {
-                "date": date_filter
-            }
-        }
-        
-    # 3. Consultar los movimientos en orden cronológico del asiento
-    ledger_entries = await prisma.ledgerentry.find_many(
-        where=where_clause,
-        include={
-            "journal": True,
-            "account": True
-        },
-        order=[
-            {"journal": {"date": "asc"}},
-            {"createdAt": "asc"}
-        ]
-    )
-    
-    # 4. Formatear la respuesta con balance dinámico
-    movimientos = []
-    saldo_acumulado = 0.0
-    
-    for entry in ledger_entries:
-        # Calcular según el tipo de cuenta
-        if account.type in ["ASSET", "EXPENSE"]:
-            saldo_acumulado += (entry.debit - entry.credit)
-        else:
-            saldo_acumulado += (entry.credit - entry.debit)
-            
-        movimientos.append({
-            "id": entry.id,
-            "date": entry.journal.date,
-            "concept": entry.journal.concept,
-            "reference": entry.journal.reference,
-            "type": entry.journal.type,
-            "description": entry.description or entry.journal.concept,
-            "debit": entry.debit,
-            "credit": entry.credit,
-            "balance": saldo_acumulado
-        })
+    # 3. Página de movimientos en orden cronológico, con el saldo anterior
+    #    calculado en SQL (ver ledger_service.libro_mayor)
+    try:
+        mayor = await ledger_service.libro_mayor(account, fecha_desde, fecha_hasta, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
         
     return {
         "account": {
@@ -231,8 +249,7 @@ async def listar_mayor_cuenta(code: str, desde: Optional[str] = None, hasta: Opt
             "name": account.name,
             "type": account.type
         },
-        "balance": saldo_acumulado,
-        "entries": movimientos
+        **mayor
     }
 
 # --- Ventas ---
@@ -243,22 +260,10 @@ async def registrar_venta(request: Request, data: CreateVentaRequest, current_us
         raise HTTPException(status_code=403, detail="No tienes permisos")
     
     # 1. Validar que las cuentas contables existan ANTES de empezar la transacción
-    account_ventas = await prisma.account.find_unique(where={"code": "4.1.01"}) # Ventas de Servicios
-    account_iva_df = await prisma.account.find_unique(where={"code": "2.1.05"}) # IVA Débito Fiscal
-    
-    # Cuenta de contrapartida (Caja o Banco)
-    pago_code = "1.1.01" if data.metodoPago == "EFECTIVO" else "1.1.02"
-    account_pago = await prisma.account.find_unique(where={"code": pago_code})
-    
-    if not all([account_ventas, account_iva_df, account_pago]):
-        missing = []
-        if not account_ventas: missing.append("4.1.01")
-        if not account_iva_df: missing.append("2.1.05")
-        if not account_pago: missing.append(pago_code)
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Faltan cuentas contables configuradas: {', '.join(missing)}. Por favor, ejecute el seed de contabilidad."
-        )
+    try:
+        cuentas = await cuentas_venta(data)
+    except PostingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     # 2. Iniciar Transacción
     try:
@@ -288,17 +293,9 @@ async def registrar_venta(request: Request, data: CreateVentaRequest, current_us
             company = await transaction.company.find_unique(where={"id": data.companyId})
             company_name = company.nombre if company else data.companyId
             
-            entries = [
-                {"accountId": account_pago.id, "debit": data.total, "credit": 0, "description": f"Cobro Venta {data.numero}"},
-                {"accountId": account_ventas.id, "debit": 0, "credit": data.subtotal, "description": f"Venta {data.numero}"},
-                {"accountId": account_iva_df.id, "debit": 0, "credit": data.iva, "description": f"IVA DF Venta {data.numero}"}
-            ]
-            
-            # Agregar percepciones si existen
-            if data.percepciones > 0:
-                # Usamos una cuenta genérica de pasivo por ahora o ajustamos contra Ventas
-                entries.append({"accountId": account_iva_df.id, "debit": 0, "credit": data.percepciones, "description": f"Percepciones Venta {data.numero}"})
+            entries = partidas_venta(data, cuentas)
 
+            await ledger_service.aplicar_movimientos(transaction, entries)
             await transaction.journalentry.create(
                 data={
                     "concept": f"Venta {data.numero} - {company_name}",
@@ -348,11 +345,17 @@ async def eliminar_venta(request: Request, id: str, current_user=Depends(get_cur
         raise HTTPException(status_code=404, detail="Venta no encontrada")
         
     # 2. Eliminar el asiento contable asociado si existe (usamos el numero como referencia)
-    journal_entry = await prisma.journalentry.find_first(where={"reference": venta.numero})
-    if journal_entry:
-        await prisma.journalentry.delete(where={"id": journal_entry.id})
+    #    y la venta (los items se borran en cascada) en una sola transacción
+    try:
+        async with prisma.tx() as transaction:
+            journal_entry = await transaction.journalentry.find_first(where={"reference": venta.numero})
+            if journal_entry:
+                await period_close.verificar_abierto(journal_entry.date)
+                await ledger_service.eliminar_asiento(transaction, journal_entry.id)
+            await transaction.venta.delete(where={"id": id})
+    except period_close.PeriodoError as e:
+        raise HTTPException(status_code=409, detail=str(e))
         
-    # 3. Eliminar la venta (los items se borran en cascada)
     # Log audit
     request_id = getattr(request.state, "request_id", "N/A")
     ip_address = request.client.host if request.client else "N/A"
@@ -365,7 +368,6 @@ async def eliminar_venta(request: Request, id: str, current_user=Depends(get_cur
         request_id=request_id
     )
     
-    await prisma.venta.delete(where={"id": id})
     return {"message": "Venta eliminada exitosamente"}
 
 @router.delete("/compras/{id}")
@@ -378,10 +380,16 @@ async def eliminar_compra(request: Request, id: str, current_user=Depends(get_cu
         raise HTTPException(status_code=404, detail="Compra no encontrada")
         
     # Intentar eliminar el asiento usando el CUIT o Numero como referencia si existe
-    if compra.numero:
-        journal_entry = await prisma.journalentry.find_first(where={"reference": compra.numero})
-        if journal_entry:
-            await prisma.journalentry.delete(where={"id": journal_entry.id})
+    try:
+        async with prisma.tx() as transaction:
+            if compra.numero:
+                journal_entry = await transaction.journalentry.find_first(where={"reference": compra.numero})
+                if journal_entry:
+                    await period_close.verificar_abierto(journal_entry.date)
+                    await ledger_service.eliminar_asiento(transaction, journal_entry.id)
+            await transaction.compra.delete(where={"id": id})
+    except period_close.PeriodoError as e:
+        raise HTTPException(status_code=409, detail=str(e))
             
     # Log audit
     request_id = getattr(request.state, "request_id", "N/A")
@@ -395,7 +403,6 @@ async def eliminar_compra(request: Request, id: str, current_user=Depends(get_cu
         request_id=request_id
     )
     
-    await prisma.compra.delete(where={"id": id})
     return {"message": "Compra eliminada exitosamente"}
 
 @router.post("/compras", response_model=CompraResponse)
@@ -403,55 +410,12 @@ async def registrar_compra(request: Request, data: CreateCompraRequest, current_
     if current_user.rol != "SUPER_ADMIN":
         raise HTTPException(status_code=403, detail="No tienes permisos")
     
-    # Validaciones específicas de ARCA 2026
-    if data.tipoFactura == "A_CBU":
-        if not data.cbuProveedor or len(data.cbuProveedor) != 22 or not data.cbuProveedor.isdigit():
-            raise HTTPException(
-                status_code=400, 
-                detail="Para comprobantes Clase A con Pago en CBU Informada, debe proporcionar una CBU del proveedor válida de 22 dígitos."
-            )
-            
-    # 1. Validar y recuperar cuentas básicas
-    account_iva_cf = await prisma.account.find_unique(where={"code": "1.1.05"}) # IVA Crédito Fiscal
-    gasto_code = "5.1.01" # Otros Gastos por defecto
-    if data.categoria == "SERVICIOS": gasto_code = "5.1.02"
-    elif data.categoria == "IMPUESTOS": gasto_code = "5.1.03"
-    elif data.categoria == "SUELDOS": gasto_code = "5.1.04"
-    
-    account_gasto = await prisma.account.find_unique(where={"code": gasto_code})
-    
-    # Si es Factura A Especial con Pago en CBU, forzar cuenta de Banco (1.1.02)
-    pago_code = "1.1.01" if data.metodoPago == "EFECTIVO" else "1.1.02"
-    if data.tipoFactura == "A_CBU":
-        pago_code = "1.1.02"  # Banco obligatorio para CBU
-        
-    account_pago = await prisma.account.find_unique(where={"code": pago_code})
-    
-    if not all([account_gasto, account_pago]):
-        raise HTTPException(status_code=400, detail="Faltan cuentas contables de egresos o caja/banco configuradas.")
-
-    # Si es Factura A con Retención, garantizar existencia de cuentas de retenciones (2.1.08 y 2.1.09)
-    account_ret_iva = None
-    account_ret_gan = None
-    if data.tipoFactura == "A_RETENCION":
-        account_ret_iva = await prisma.account.find_unique(where={"code": "2.1.08"})
-        if not account_ret_iva:
-            account_ret_iva = await prisma.account.create(data={
-                "code": "2.1.08",
-                "name": "Retenciones IVA a Pagar",
-                "type": "LIABILITY",
-                "parentCode": "2.1",
-                "level": 3
-            })
-        account_ret_gan = await prisma.account.find_unique(where={"code": "2.1.09"})
-        if not account_ret_gan:
-            account_ret_gan = await prisma.account.create(data={
-                "code": "2.1.09",
-                "name": "Retenciones Ganancias a Pagar",
-                "type": "LIABILITY",
-                "parentCode": "2.1",
-                "level": 3
-            })
+    # Validaciones específicas de ARCA 2026 y cuentas del asiento
+    try:
+        validar_compra(data)
+        cuentas = await cuentas_compra(data)
+    except PostingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     try:
         async with prisma.tx() as transaction:
@@ -478,27 +442,9 @@ async def registrar_compra(request: Request, data: CreateCompraRequest, current_
             )
             
             # Generar asientos contables según regulaciones
-            if data.tipoFactura == "A_RETENCION" and account_ret_iva and account_ret_gan:
-                # 100% de IVA y 6% de Ganancias sobre subtotal
-                ret_iva_amt = data.iva
-                ret_gan_amt = round(data.subtotal * 0.06, 2)
-                neto_amt = round(data.total - ret_iva_amt - ret_gan_amt, 2)
-                
-                entries = [
-                    {"accountId": account_gasto.id, "debit": data.subtotal, "credit": 0, "description": f"Gasto {data.categoria} - {data.proveedor}"},
-                    {"accountId": account_pago.id, "debit": 0, "credit": neto_amt, "description": f"Pago Neto Compra {data.numero} (Retenciones aplicadas)"},
-                    {"accountId": account_ret_iva.id, "debit": 0, "credit": ret_iva_amt, "description": f"Retención IVA 100% - Compra {data.numero}"},
-                    {"accountId": account_ret_gan.id, "debit": 0, "credit": ret_gan_amt, "description": f"Retención Ganancias 6% - Compra {data.numero}"}
-                ]
-            else:
-                entries = [
-                    {"accountId": account_gasto.id, "debit": data.subtotal, "credit": 0, "description": f"Gasto {data.categoria} - {data.proveedor}"},
-                    {"accountId": account_pago.id, "debit": 0, "credit": data.total, "description": f"Pago Compra {data.numero}"}
-                ]
-            
-            if data.iva > 0 and account_iva_cf:
-                entries.append({"accountId": account_iva_cf.id, "debit": data.iva, "credit": 0, "description": f"IVA CF Compra {data.numero}"})
+            entries = partidas_compra(data, cuentas)
                 
+            await ledger_service.aplicar_movimientos(transaction, entries)
             await transaction.journalentry.create(
                 data={
                     "concept": f"Compra {data.numero} - {data.proveedor}",
@@ -540,329 +486,155 @@ async def registrar_compra(request: Request, data: CreateCompraRequest, current_
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al registrar compra: {str(e)}")
 
-def clean_amount(val_str: str) -> float:
-    val_str = val_str.strip()
-    if re.search(r',\d{2}$', val_str):
-        val_str = val_str.replace(".", "").replace(",", ".")
-    elif re.search(r'\.\d{2}$', val_str):
-        if "," in val_str:
-            val_str = val_str.replace(",", "")
-    else:
-        if "." in val_str and "," in val_str:
-            if val_str.find(",") > val_str.find("."):
-                val_str = val_str.replace(".", "").replace(",", ".")
-            else:
-                val_str = val_str.replace(",", "")
-        elif "," in val_str:
-            parts = val_str.split(",")
-            if len(parts[-1]) != 3:
-                val_str = val_str.replace(",", ".")
-            else:
-                val_str = val_str.replace(",", "")
-    try:
-        return float(val_str)
-    except ValueError:
-        return 0.0
+# --- Importación masiva ---
 
-@router.post("/compras/upload-pdf")
-async def upload_compra_pdf(file: UploadFile = File(...), current_user=Depends(get_current_user)):
+async def _importar_comprobantes(kind: str, request: Request, file: UploadFile, dry_run: bool, current_user) -> ImportacionResponse:
     if current_user.rol != "SUPER_ADMIN":
         raise HTTPException(status_code=403, detail="No tienes permisos")
-        
+
     try:
-        contents = await file.read()
-        
-        # --- EXTRACCIÓN DE TEXTO LOCAL (Ultra rápida) ---
-        pdf_file = io.BytesIO(contents)
-        full_text = ""
-        try:
-            import pdfplumber
-            with pdfplumber.open(pdf_file) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text(layout=True)
-                    if text:
-                        full_text += text + "\n"
-        except ImportError:
-            from pypdf import PdfReader
-            reader = PdfReader(pdf_file)
-            for page in reader.pages:
-                full_text += page.extract_text() or ""
-                
-        # --- OPCION A: EXTRACTION CON GOOGLE GEMINI AI ---
-        gemini_key = os.environ.get("GEMINI_API_KEY")
-        if gemini_key:
-            try:
-                import google.generativeai as genai
-                
-                genai.configure(api_key=gemini_key)
-                model = genai.GenerativeModel('gemini-3.6-flash')
-                prompt = f"""
-                Eres un auditor contable experto. Tu única tarea es extraer los datos reales de esta factura a partir del documento adjunto o del texto proporcionado.
-                REGLA CRÍTICA DE ORO: ¡NO INVENTES NINGÚN DATO! Si un dato no está explícitamente en el documento, usa un string vacío "" (o 0 para números). NUNCA uses nombres genéricos como "Librería" o "Proveedor" si no aparecen.
-                
-                Extrae los datos en este formato JSON exacto:
-                {{
-                    "proveedor": "Nombre o Razón Social exacta del emisor",
-                    "cuit": "CUIT del emisor con guiones (XX-XXXXXXXX-X)",
-                    "numero": "Punto de Venta y Número (Ej: 00001-00001234)",
-                    "fecha": "Fecha en formato YYYY-MM-DD",
-                    "subtotal": Importe Neto Gravado (Float, usa 0 si no existe),
-                    "iva": Total de impuestos IVA (Float, usa 0 si no existe),
-                    "total": Importe Total de la factura (Float, usa 0 si no existe),
-                    "categoria": Clasifica obligatoriamente como "SERVICIOS", "IMPUESTOS", "SUELDOS" u "OTROS",
-                    "metodoPago": "TRANSFERENCIA" o "EFECTIVO",
-                    "items": [
-                        {{
-                            "descripcion": "Descripción exacta del artículo o servicio",
-                            "cantidad": Numero Float,
-                            "precioUnit": Numero Float,
-                            "subtotal": Numero Float
-                        }}
-                    ]
-                }}
-                IMPORTANTE: Extrae TODOS los ítems detallados de la factura dentro del array 'items'. Si no hay ítems detallados, devuelve un array vacío [].
-                """
-                
-                # OPTIMIZACIÓN DE VELOCIDAD: Si el PDF es digital (tiene texto), enviamos texto.
-                # Esto evita el costoso OCR multimodal de Gemini que demora 4-6 segundos extra.
-                if len(full_text.strip()) > 100:
-                    payload = [
-                        f"TEXTO EXTRAÍDO DE LA FACTURA:\n\n{full_text}",
-                        prompt
-                    ]
-                else:
-                    # Fallback para imágenes/facturas escaneadas (usa multimodal OCR)
-                    payload = [
-                        {"mime_type": "application/pdf", "data": contents},
-                        prompt
-                    ]
-                
-                response = model.generate_content(
-                    payload,
-                    generation_config=genai.types.GenerationConfig(
-                        response_mime_type="application/json"
-                    )
-                )
-                json_str = response.text.strip()
-                data = json.loads(json_str)
-                # Validaciones básicas del output de Gemini
-                if "proveedor" in data and "items" in data:
-                    return data
-            except Exception as e:
-                import traceback
-                error_trace = traceback.format_exc()
-                print(f"Error procesando con Gemini AI/MarkItDown: {error_trace}")
-                raise HTTPException(status_code=500, detail=f"Error AI: {str(e)}")
-        
-        # --- OPCION B: EXTRACTION TRADICIONAL (FALLBACK LOCAL MANUAL) ---
-        # El PDF ya fue leído en full_text al inicio.
-            
-        # Parse CUIT
-        cuit_match = re.search(r'\b(20|23|24|27|30|33)-?(\d{8})-?(\d)\b', full_text)
-        cuit = ""
-        if cuit_match:
-            cuit = f"{cuit_match.group(1)}-{cuit_match.group(2)}-{cuit_match.group(3)}"
-            
-        # Parse Invoice Number (AFIP specific Pt Vta + Comp Nro or standard fallback)
-        num_match = re.search(r'(?:Punto de Venta|Pt\. Vta|Vta)[:\s]*(\d{4,5})\s*(?:Comp\.?\s*Nro|Nro|N°|Nro\.?|Comp\.?|Nro\. Comprobante)[:\s]*(\d{8})', full_text, re.IGNORECASE)
-        numero = ""
-        if num_match:
-            numero = f"{num_match.group(1).zfill(5)}-{num_match.group(2)}"
+        documentos = accounting_import.leer_archivo(kind, file.filename, await file.read())
+    except accounting_import.ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # 1. Validar todo antes de escribir; 2. registrar los válidos en lotes
+    comprobantes = await accounting_import.validar(kind, documentos)
+    creados = [] if dry_run else await accounting_import.registrar(kind, comprobantes)
+
+    if creados:
+        request_id = getattr(request.state, "request_id", "N/A")
+        ip_address = request.client.host if request.client else "N/A"
+        if kind == accounting_import.VENTAS:
+            action = "INVOICE_SALE_CREATE"
+            detalle = lambda d: f"Venta registrada (importación): Nro {d.numero} por un total de ${d.total:.2f} ARS."
         else:
-            num_match_fallback = re.search(r'\b(\d{4,5})[ -](\d{8})\b', full_text)
-            if num_match_fallback:
-                numero = f"{num_match_fallback.group(1).zfill(5)}-{num_match_fallback.group(2)}"
-            
-        # Parse Date (DD/MM/YYYY)
-        date_match = re.search(r'\b(\d{2})[/-](\d{2})[/-](\d{4})\b', full_text)
-        fecha = datetime.now().strftime("%Y-%m-%d")
-        if date_match:
-            day, month, year = date_match.groups()
-            fecha = f"{year}-{month}-{day}"
-            
-        # Extract Items from Table (AFIP standard format)
-        # Usually looks like: Código  Producto/Servicio  Cantidad  U.Medida  Precio Unit.  % Bonf  Subtotal
-        items_extraidos = []
-        lines = [l.strip() for l in full_text.split('\n') if l.strip()]
-        
-        in_table = False
-        for i, line in enumerate(lines):
-            # Detectar el inicio de la tabla de items
-            line_lower = line.lower()
-            if "producto/servicio" in line_lower or "descripción" in line_lower or "codigo" in line_lower:
-                in_table = True
-                continue
-            
-            # Si estamos en la tabla y encontramos "Subtotal" o "Importe Otros Tributos", la tabla terminó
-            if in_table and ("subtotal" in line_lower and "importe" not in line_lower.replace(" ", "")):
-                # Algunos PDFs de AFIP dicen "Subtotal: $ xxx", pero si empieza con Subtotal, probablemente terminamos
-                if line_lower.startswith("subtotal"):
-                    in_table = False
-                    continue
-            if in_table and ("importe otros tributos" in line_lower or "importe neto gravado" in line_lower or "iva" in line_lower):
-                in_table = False
-                continue
-
-            if in_table:
-                # Buscar filas que tengan formato de ítem: texto largo seguido de varios números separados por espacios
-                # Ejemplo AFIP: 1  Limpieza oficina  1,00  unidades  1000,00  0,00  1000,00
-                # Regex busca: [Cantidad (opcional)] [Descripcion] [Cantidad] [Precio] [Subtotal]
-                # Por simplicidad, buscaremos una línea que termine con importes (números con decimales)
-                importes = re.findall(r'\b\d{1,3}(?:\.\d{3})*,\d{2}\b|\b\d+\.\d{2}\b', line)
-                
-                if len(importes) >= 2: # Al menos Precio Unitario y Subtotal
-                    # Extraer el último importe como subtotal, y el antepenúltimo o penúltimo como precio
-                    subt_str = importes[-1]
-                    precio_str = importes[-2] if len(importes) > 2 else importes[0]
-                    
-                    subt = clean_amount(subt_str)
-                    precio = clean_amount(precio_str)
-                    
-                    # Tratar de encontrar la cantidad (usualmente un número entero o decimal pequeño)
-                    cant_match = re.search(r'\b(\d+(?:[,.]\d{1,2})?)\s+(?:unidades|u|kg|lts|hs|horas)?\s+'+re.escape(precio_str), line, re.IGNORECASE)
-                    cantidad = 1.0
-                    if cant_match:
-                        cantidad = clean_amount(cant_match.group(1))
-                    else:
-                        # Si subtotal > precio, inferir cantidad
-                        if precio > 0 and subt > precio:
-                            cantidad = round(subt / precio, 2)
-
-                    # La descripción suele ser todo el texto al principio de la línea antes de los números
-                    # Quitamos todos los importes encontrados
-                    desc = line
-                    for imp in importes:
-                        desc = desc.replace(imp, "")
-                    # Limpiamos unidades y códigos de barras si existen
-                    desc = re.sub(r'\b(unidades|u|kg|lts|hs|horas)\b', '', desc, flags=re.IGNORECASE)
-                    desc = re.sub(r'^[A-Z0-9-]+\s+', '', desc) # Quitar código al inicio
-                    desc = re.sub(r'\d+(?:[,.]\d+)?', '', desc) # Quitar otros números sueltos
-                    desc = re.sub(r'\s+', ' ', desc).strip()
-                    
-                    if len(desc) < 3:
-                        desc = "Artículo/Servicio"
-
-                    items_extraidos.append({
-                        "descripcion": desc,
-                        "cantidad": cantidad,
-                        "precioUnit": precio,
-                        "subtotal": subt
-                    })
-
-        # Calculate Totals
-        total = 0.0
-        subtotal = 0.0
-        iva = 0.0
-        
-        # Look for Total amount
-        total_patterns = [
-            r'(?:Importe Total|Total|TOTAL|Total Facturado)(?:\s*[:$]?\s*)(\d{1,3}(?:\.\d{3})*(?:,\d{2}))',
-            r'(?:Importe Total|Total|TOTAL|Total Facturado)(?:\s*[:$]?\s*)(\d+[,.]\d{2})',
-            r'TOTAL\s+\$?\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2}))',
-            r'Importe Total\s+\$?\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2}))',
-        ]
-        
-        for p in total_patterns:
-            matches = re.findall(p, full_text, re.IGNORECASE)
-            if matches:
-                total = clean_amount(matches[-1])
-                break
-                
-        # Look for Subtotal (Net Amount)
-        subtotal_patterns = [
-            r'(?:Importe Neto Gravado|Neto Gravado|Neto|Subtotal)(?:\s*[:$]?\s*)(\d{1,3}(?:\.\d{3})*(?:,\d{2}))',
-            r'(?:Importe Neto Gravado|Neto Gravado|Neto|Subtotal)(?:\s*[:$]?\s*)(\d+[,.]\d{2})',
-            r'Neto\s+\$?\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2}))',
-        ]
-        
-        for p in subtotal_patterns:
-            matches = re.findall(p, full_text, re.IGNORECASE)
-            if matches:
-                subtotal = clean_amount(matches[-1])
-                break
-                    
-        # Calculate/find IVA
-        iva_patterns = [
-            r'(?:IVA\s*(?:21|10\.5|27)%\s*:?\s*\$?)\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2}))',
-            r'(?:IVA\s*(?:21|10\.5|27)%\s*:?\s*\$?)\s*(\d+[,.]\d{2})',
+            action = "INVOICE_PURCHASE_CREATE"
+            detalle = lambda d: f"Compra registrada (importación, {d.tipoFactura}): {d.proveedor} (Total: ${d.total:.2f} ARS)."
+        await log_audit_actions([
+            {
+                "action": action,
+                "user_id": current_user.id,
+                "user_email": current_user.email,
+                "details": detalle(c.data),
+                "ip_address": ip_address,
+                "request_id": request_id,
+            }
+            for c in creados
+        ])
+
+        if kind == accounting_import.COMPRAS:
+            # ── Disparar evento invoice.processed hacia n8n (como el alta individual) ──
+            for c in creados:
+                await emit(WebhookEvent.INVOICE_PROCESSED, {
+                    "compra_id":   c.id,
+                    "proveedor":   c.data.proveedor,
+                    "numero":      c.data.numero,
+                    "total":       c.data.total,
+                    "categoria":   c.data.categoria,
+                    "metodoPago":  c.data.metodoPago,
+                    "fecha":       c.data.fecha.isoformat() if c.data.fecha else None,
+                    "registrado_por": current_user.email,
+                })
+
+    estado_ok = "VALIDO" if dry_run else "CREADO"
+    errores = sum(1 for c in comprobantes if c.error)
+    return ImportacionResponse(
+        total=len(comprobantes),
+        creados=len(creados),
+        errores=errores,
+        dryRun=dry_run,
+        resultados=[
+            {
+                "fila": c.fila,
+                "numero": c.numero,
+                "estado": "ERROR" if c.error else estado_ok,
+                "id": c.id,
+                "motivo": c.error,
+            }
+            for c in comprobantes
         ]
-        for p in iva_patterns:
-            matches = re.findall(p, full_text, re.IGNORECASE)
-            if matches:
-                iva = clean_amount(matches[-1])
-                break
-
-        # Check if items matched anything, if not fallback to subtotal
-        if not items_extraidos:
-            if subtotal == 0.0:
-                subtotal = total
-            items_extraidos = [{
-                "descripcion": "Carga rápida desde factura PDF",
-                "cantidad": 1,
-                "precioUnit": subtotal,
-                "subtotal": subtotal
-            }]
-        else:
-            # Reconcile subtotal if we extracted items
-            calc_subtotal = sum(float(i.get("subtotal", 0.0)) for i in items_extraidos)
-            if subtotal == 0.0:
-                subtotal = calc_subtotal
-            if total == 0.0:
-                total = subtotal + iva
-
-        # Parse Provider Name
-        proveedor = ""
-        for line in lines:
-            if "Razón Social:" in line or "Razon Social:" in line:
-                proveedor = line.split(":", 1)[1].strip()
-                break
-                
-        if not proveedor and len(lines) > 0:
-            for line in lines:
-                if "Razón Social:" in line or "Razon Social:" in line or "Nombre / Razón Social" in line or "Nombre/Razón Social" in line:
-                    parts = line.split(":")
-                    if len(parts) > 1:
-                        proveedor = parts[-1].strip()
-                        break
-                        
-        if not proveedor and len(lines) > 0:
-            for l in lines[:5]:
-                if not any(k in l.lower() for k in ["factura", "cuit", "fecha", "punto de venta", "pág", "pag", "original", "duplicado", "comprobante"]):
-                    proveedor = l
-                    break
-                    
-        if not proveedor:
-            proveedor = "Proveedor Desconocido"
-            
-        if cuit and cuit in proveedor:
-            proveedor = proveedor.replace(cuit, "").strip()
-        proveedor = re.sub(r'\s+', ' ', proveedor).strip()
-        proveedor = proveedor.replace("Apellido y Nombre /", "").replace("Razón Social:", "").replace("Razon Social:", "").strip()
-        
-        # Determine category based on keywords
-        categoria = "OTROS"
-        full_text_lower = full_text.lower()
-        if any(k in full_text_lower for k in ["honorarios", "servicios", "abono", "asesoramiento", "mensual", "alquiler", "limpieza", "seguridad"]):
-            categoria = "SERVICIOS"
-        elif any(k in full_text_lower for k in ["impuesto", "tasa", "afip", "rentas", "iibb", "municipalidad"]):
-            categoria = "IMPUESTOS"
-        elif any(k in full_text_lower for k in ["sueldo", "recibo", "jornal", "sac", "vacaciones"]):
-            categoria = "SUELDOS"
-            
-        return {
-            "proveedor": proveedor,
-            "cuit": cuit,
-            "numero": numero,
-            "fecha": fecha,
-            "subtotal": subtotal,
-            "iva": iva,
-            "total": total,
-            "categoria": categoria,
-            "metodoPago": "TRANSFERENCIA" if categoria == "SERVICIOS" else "EFECTIVO",
-            "items": items_extraidos
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al procesar PDF de factura: {str(e)}")
+    )
+
+@router.post("/ventas/import", response_model=ImportacionResponse)
+async def importar_ventas(request: Request, file: UploadFile = File(...), dryRun: bool = Query(False), current_user=Depends(get_current_user)):
+    """
+    Importación masiva de ventas desde CSV o JSON (ver services/accounting_import.py).
+    Con dryRun=true solo valida.
+    """
+    return await _importar_comprobantes(accounting_import.VENTAS, request, file, dryRun, current_user)
+
+@router.post("/compras/import", response_model=ImportacionResponse)
+async def importar_compras(request: Request, file: UploadFile = File(...), dryRun: bool = Query(False), current_user=Depends(get_current_user)):
+    """
+    Importación masiva de compras desde CSV o JSON (ver services/accounting_import.py).
+    Con dryRun=true solo valida.
+    """
+    return await _importar_comprobantes(accounting_import.COMPRAS, request, file, dryRun, current_user)
+
+# --- Lectura de facturas PDF (jobs, ver services/invoice_extraction.py) ---
+
+@router.post("/compras/pdf-jobs", status_code=202)
+async def crear_job_pdf_compra(file: UploadFile = File(...), current_user=Depends(get_current_user)):
+    """
+    Encola la extracción de datos de una factura PDF y devuelve el job para
+    consultarlo. Si el mismo PDF ya se procesó, el job vuelve ya terminado.
+    """
+    if current_user.rol != "SUPER_ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permisos")
+
+    job = await invoice_extraction.submit(await file.read(), file.filename, current_user.id)
+    return invoice_extraction.serializar(job)
+
+@router.get("/compras/pdf-jobs/{job_id}")
+async def obtener_job_pdf_compra(job_id: str, current_user=Depends(get_current_user)):
+    if current_user.rol != "SUPER_ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permisos")
+
+    job = await invoice_extraction.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job de extracción no encontrado")
+    return invoice_extraction.serializar(job)
+
+@router.post("/compras/pdf-zip")
+async def subir_zip_facturas_compra(file: UploadFile = File(...), current_user=Depends(get_current_user)):
+    """
+    Lectura de un ZIP con facturas PDF de proveedores (lectura local, en
+    paralelo). Devuelve el lote de borradores de compra para revisar.
+    """
+    if current_user.rol != "SUPER_ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permisos")
+
+    try:
+        return await invoice_extraction.ingest_zip(file.file, current_user.id)
+    except invoice_extraction.ZipIngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/compras/pdf-batches/{batch_id}")
+async def obtener_lote_facturas_compra(batch_id: str, current_user=Depends(get_current_user)):
+    if current_user.rol != "SUPER_ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permisos")
+
+    lote = await invoice_extraction.get_batch(batch_id)
+    if not lote:
+        raise HTTPException(status_code=404, detail="Lote de facturas no encontrado")
+    return lote
+
+@router.post("/compras/upload-pdf")
+async def upload_compra_pdf(file: UploadFile = File(...), current_user=Depends(get_current_user)):
+    """
+    Compatibilidad con clientes que esperan los datos en la misma respuesta:
+    encola el job y espera el resultado sin bloquear el event loop.
+    """
+    if current_user.rol != "SUPER_ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permisos")
+
+    job = await invoice_extraction.submit(await file.read(), file.filename, current_user.id)
+    job = await invoice_extraction.wait(job.id, timeout=60)
+    if job.status == invoice_extraction.DONE:
+        return job.result
+    if job.status == invoice_extraction.FAILED:
+        raise HTTPException(status_code=500, detail=job.error)
+    return JSONResponse(status_code=202, content=jsonable_encoder(invoice_extraction.serializar(job)))
 
 @router.get("/compras", response_model=List[CompraResponse])
 async def listar_compras(current_user=Depends(get_current_user)):
@@ -872,58 +644,76 @@ async def listar_compras(current_user=Depends(get_current_user)):
 
 # --- Reportes ---
 
+def _fecha_as_of(asOf: Optional[str]) -> Optional[datetime]:
+    if not asOf:
+        return None
+    try:
+        return datetime.strptime(asOf, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato 'asOf' inválido. Debe ser YYYY-MM-DD")
+
 @router.get("/reports/balance", response_model=List[BalanceRow])
-async def obtener_balance(current_user=Depends(get_current_user)):
+async def obtener_balance(asOf: Optional[str] = None, current_user=Depends(get_current_user)):
     if current_user.rol != "SUPER_ADMIN":
         raise HTTPException(status_code=403, detail="No tienes permisos")
         
-    accounts = await prisma.account.find_many(include={"ledgerEntries": True}, order={"code": "asc"})
+    # Totales acumulados por cuenta (services/ledger_service.py): una sola lectura
+    accounts = await prisma.account.find_many(order={"code": "asc"})
+    totales = {acc.id: (acc.debitTotal, acc.creditTotal) for acc in accounts}
+
+    # A una fecha: último cierre mensual + asientos posteriores (services/period_close.py)
+    fecha = _fecha_as_of(asOf)
+    if fecha:
+        totales = await period_close.saldos_al(fecha)
     
-    result = []
+    balance = []
     for acc in accounts:
-        debit = sum(e.debit for e in acc.ledgerEntries)
-        credit = sum(e.credit for e in acc.ledgerEntries)
-        
-        # Calcular saldo según tipo de cuenta
-        if acc.type in ["ASSET", "EXPENSE"]:
-            balance = debit - credit
-        else:
-            balance = credit - debit
-            
-        result.append(BalanceRow(
+        debit, credit = totales.get(acc.id, (0.0, 0.0))
+        balance.append(BalanceRow(
             accountCode=acc.code,
             accountName=acc.name,
             debit=debit,
             credit=credit,
-            balance=balance
+            balance=ledger_service.saldo(acc.type, debit, credit)
         ))
-        
-    return result
+    return balance
 
 @router.get("/summary")
-async def obtener_resumen(current_user=Depends(get_current_user)):
-    """Resumen para el Centro Contable: ingresos/egresos del mes, saldo en caja/banco y últimos movimientos."""
-    now = datetime.now()
+async def obtener_resumen(asOf: Optional[str] = None, current_user=Depends(get_current_user)):
+    """Resumen para el Centro Contable: ingresos/egresos del mes, saldo en caja/banco y últimos movimientos.
+
+    Con asOf (YYYY-MM-DD) el resumen es al cierre de ese día: el mes es el de
+    esa fecha y el saldo de caja sale de los cierres de período.
+    """
+    fecha = _fecha_as_of(asOf)
+    now = fecha or datetime.now()
     inicio_mes = datetime(now.year, now.month, 1)
+    rango = {"gte": inicio_mes}
+    if fecha:
+        rango["lt"] = period_close.limite_al(fecha)
 
-    ventas_mes = await prisma.venta.find_many(where={"fecha": {"gte": inicio_mes}})
-    compras_mes = await prisma.compra.find_many(where={"fecha": {"gte": inicio_mes}})
+    ventas_mes = await prisma.venta.find_many(where={"fecha": rango})
+    compras_mes = await prisma.compra.find_many(where={"fecha": rango})
 
     ingresos_mes = sum(v.total for v in ventas_mes)
     egresos_mes = sum(c.total for c in compras_mes)
     rentabilidad = round((ingresos_mes - egresos_mes) / ingresos_mes * 100, 1) if ingresos_mes > 0 else 0
 
     cuentas_caja = await prisma.account.find_many(
-        where={"code": {"in": ["1.1.01", "1.1.02"]}},
-        include={"ledgerEntries": True}
-    )
-    saldo_caja = sum(
-        sum(e.debit for e in cuenta.ledgerEntries) - sum(e.credit for e in cuenta.ledgerEntries)
-        for cuenta in cuentas_caja
+        where={"code": {"in": ["1.1.01", "1.1.02"]}}
     )
+    saldo_caja = sum(cuenta.debitTotal - cuenta.creditTotal for cuenta in cuentas_caja)
+    hasta = {}
+    if fecha:
+        totales = await period_close.saldos_al(fecha)
+        saldo_caja = sum(
+            debit - credit
+            for debit, credit in (totales.get(cuenta.id, (0.0, 0.0)) for cuenta in cuentas_caja)
+        )
+        hasta = {"fecha": {"lt": rango["lt"]}}
 
-    ultimas_ventas = await prisma.venta.find_many(take=5, order={"fecha": "desc"})
-    ultimas_compras = await prisma.compra.find_many(take=5, order={"fecha": "desc"})
+    ultimas_ventas = await prisma.venta.find_many(where=hasta, take=5, order={"fecha": "desc"})
+    ultimas_compras = await prisma.compra.find_many(where=hasta, take=5, order={"fecha": "desc"})
 
     movimientos = [
         {"fecha": v.fecha.isoformat(), "descripcion": f"Venta {v.numero}", "monto": v.total, "tipo": "in"}
@@ -943,6 +733,56 @@ async def obtener_resumen(current_user=Depends(get_current_user)):
     }
 
 
+# --- Cierre de períodos ---
+
+@router.get("/periods", response_model=List[PeriodoResponse])
+async def listar_periodos(current_user=Depends(get_current_user)):
+    if current_user.rol != "SUPER_ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permisos")
+    return await period_close.listar_periodos()
+
+@router.post("/periods/close", response_model=PeriodoResponse)
+async def cerrar_periodo(request: Request, data: CierrePeriodoRequest, current_user=Depends(get_current_user)):
+    if current_user.rol != "SUPER_ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permisos")
+    try:
+        cierre = await period_close.cerrar_periodo(data.period, current_user.id)
+    except period_close.PeriodoError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    request_id = getattr(request.state, "request_id", "N/A")
+    ip_address = request.client.host if request.client else "N/A"
+    await log_audit_action(
+        action="ACCOUNTING_PERIOD_CLOSE",
+        user_id=current_user.id,
+        user_email=current_user.email,
+        details=f"Período contable {data.period} cerrado.",
+        ip_address=ip_address,
+        request_id=request_id
+    )
+    return cierre
+
+@router.delete("/periods/{period}")
+async def reabrir_periodo(request: Request, period: str, current_user=Depends(get_current_user)):
+    if current_user.rol != "SUPER_ADMIN":
+        raise HTTPException(status_code=403, detail="No tienes permisos")
+    borrados = await period_close.reabrir_periodo(period)
+    if not borrados:
+        raise HTTPException(status_code=404, detail=f"El período {period} no está cerrado")
+
+    request_id = getattr(request.state, "request_id", "N/A")
+    ip_address = request.client.host if request.client else "N/A"
+    await log_audit_action(
+        action="ACCOUNTING_PERIOD_REOPEN",
+        user_id=current_user.id,
+        user_email=current_user.email,
+        details=f"Período contable {period} reabierto ({borrados} cierres eliminados).",
+        ip_address=ip_address,
+        request_id=request_id
+    )
+    return {"message": f"Período {period} reabierto", "cierresEliminados": borrados}
+
+
 # --- Inicialización ---
 
 @router.post("/seed")
@@ -984,5 +824,6 @@ async def seed_accounting(current_user=Depends(get_current_user)):
             c["level"] = len(code_parts)
             await prisma.account.create(data=c)
             created += 1
+    account_resolver.invalidate()
         
     return {"message": f"Plan de cuentas inicial creado. {created} cuentas nuevas agregadas."}
@@ -4,7 +4,17 @@ import psutil
 import os
 from typing import List
 from auth.dependencies import get_current_user
+from auth.principal_cache import principal_cache
+from auth.revocation import token_revocations
+from auth.jwt import hash_pool_stats
+from middleware.security import limiter
+from routers.metrics import metrics_snapshots
 from schemas.models import UserResponse
+from services import metric_rollups
+from services.account_resolver import account_resolver
+from services.asset_loader import asset_loader
+from services.credential_numbering import credential_numbers
+from services.credential_validator import credential_validator
 from services.backup_service import BackupService
 from core.database import prisma
 
@@ -47,6 +57,40 @@ async def get_system_health(current_user: UserResponse = Depends(get_current_use
         "environment": os.getenv("ENVIRONMENT", "development")
     }
 
+@router.get("/cache/stats", tags=["admin"])
+async def get_cache_stats(current_user: UserResponse = Depends(get_current_user)):
+    """
+    Hit/miss counters of the in-process caches, to size them per worker.
+    """
+    if current_user.rol != "SUPER_ADMIN":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    return {
+        "pid": os.getpid(),
+        "principal": principal_cache.stats(),
+        "token_revocations": token_revocations.stats(),
+        "bcrypt": hash_pool_stats(),
+        "rate_limit": limiter.stats(),
+        "metrics_snapshots": metrics_snapshots.stats(),
+        "accounts": account_resolver.stats(),
+        "credential_numbers": credential_numbers.stats(),
+        "credential_assets": asset_loader.stats(),
+        "credential_validation": credential_validator.stats(),
+    }
+
+@router.post("/rollups/rebuild", tags=["admin"])
+async def rebuild_rollups(current_user: UserResponse = Depends(get_current_user)):
+    """
+    Recalculate the daily metric rollups from the source tables (first load
+    after the migration, or when the worker is not running).
+    """
+    if current_user.rol != "SUPER_ADMIN":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    await metric_rollups.rebuild_all()
+    metrics_snapshots.invalidate()
+    return {"message": "Rollups recalculated"}
+
 @router.post("/backups/create", tags=["admin"])
 async def create_backup(current_user: UserResponse = Depends(get_current_user)):
     if current_user.rol != "SUPER_ADMIN":
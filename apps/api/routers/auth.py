@@ -1,11 +1,32 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Request
+import logging
+from fastapi import APIRouter, HTTPException, status, Depends, Request, BackgroundTasks
 from schemas.models import UserLogin, UserRegister, TokenResponse, UserResponse
-from auth.jwt import hash_password, verify_password, create_access_token
+from auth.jwt import hash_password_async, verify_password_async, create_access_token, build_token_claims, needs_rehash
 from core.database import prisma
 from auth.dependencies import get_current_user
+from auth.principal_cache import principal_cache
+from auth.revocation import token_revocations
 from middleware.security import rate_limit_login, rate_limit_forgot_password
+from services.dni import normalizar_dni
 
 router = APIRouter()
+logger = logging.getLogger("vmp-api.auth")
+
+
+async def _rehash_password(user_id: str, old_hash: str, password: str) -> None:
+    """Regenera el hash con el costo bcrypt actual (después de responder el login)"""
+    try:
+        new_hash = await hash_password_async(password)
+        # Solo si sigue el hash verificado: un cambio o reset de contraseña
+        # hecho mientras tanto no se pisa con la contraseña anterior
+        actualizados = await prisma.user.update_many(
+            where={"id": user_id, "passwordHash": old_hash}, data={"passwordHash": new_hash}
+        )
+        if actualizados:
+            principal_cache.invalidate(user_id)
+    except Exception as e:
+        # Se reintenta solo en el próximo login
+        logger.warning(f"No se pudo regenerar el hash de {user_id}: {e}")
 
 @router.post("/register", response_model=TokenResponse)
 async def register(data: UserRegister):
@@ -42,7 +63,7 @@ async def register(data: UserRegister):
         empresa_id = empresa_match.id
 
     # Hash password
-    hashed_password = hash_password(data.password)
+    hashed_password = await hash_password_async(data.password)
 
     # Crear usuario
     user = await prisma.user.create(
@@ -52,6 +73,7 @@ async def register(data: UserRegister):
             "nombre": data.nombre,
             "apellido": data.apellido,
             "dni": data.dni,
+            "dniNormalizado": normalizar_dni(data.dni),
             "telefono": data.telefono,
             "empresaId": empresa_id,
             "rol": "ALUMNO",  # Default role
@@ -59,7 +81,7 @@ async def register(data: UserRegister):
     )
     
     # Crear token
-    access_token = create_access_token(data={"sub": user.id})
+    access_token = create_access_token(data=build_token_claims(user))
     
     return {
         "access_token": access_token,
@@ -75,14 +97,14 @@ async def register(data: UserRegister):
 
 @router.post("/login", response_model=TokenResponse)
 @rate_limit_login()
-async def login(request: Request, data: UserLogin):
+async def login(request: Request, data: UserLogin, background_tasks: BackgroundTasks):
     """Login de usuario"""
 
     
     # Buscar usuario por email
     user = await prisma.user.find_unique(where={"email": data.email})
     
-    if not user or not verify_password(data.password, user.passwordHash):
+    if not user or not await verify_password_async(data.password, user.passwordHash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -93,9 +115,12 @@ async def login(request: Request, data: UserLogin):
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User account is inactive",
         )
+
+    if needs_rehash(user.passwordHash):
+        background_tasks.add_task(_rehash_password, user.id, user.passwordHash, data.password)
     
     # Crear token
-    access_token = create_access_token(data={"sub": user.id})
+    access_token = create_access_token(data=build_token_claims(user))
     
     return {
         "access_token": access_token,
@@ -232,13 +257,15 @@ async def reset_password(data: ResetPasswordRequest):
             )
         
         # Hash nueva contraseña
-        hashed_password = hash_password(data.new_password)
+        hashed_password = await hash_password_async(data.new_password)
         
-        # Actualizar contraseña del usuario
-        await prisma.user.update(
+        # Actualizar contraseña del usuario (invalida los tokens emitidos antes)
+        user = await prisma.user.update(
             where={"id": token_record.userId},
-            data={"passwordHash": hashed_password}
+            data={"passwordHash": hashed_password, "tokenVersion": {"increment": 1}}
         )
+        principal_cache.invalidate(token_record.userId)
+        token_revocations.record(user.id, user.tokenVersion, user.activo)
         
         # Marcar token como usado
         await prisma.passwordresettoken.update(
@@ -309,7 +336,7 @@ async def select_context(
     """Seleccionar contexto organizacional y retornar permisos + menú (compatible Blister)"""
     # Generate context-scoped access token
     context_token = create_access_token(data={
-        "sub": current_user.id,
+        **build_token_claims(current_user),
         "org": "vmp-org-001",
         "rol": current_user.rol
     })
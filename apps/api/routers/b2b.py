@@ -1,10 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
+import json
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel
 from auth.dependencies import get_current_user
+from core.config import settings
 from core.database import prisma
+from middleware.security import rate_limit_api
+from services import credential_verification, metric_rollups
 from services.asistencia_service import sincronizar_asistencia_alumno
+from services.audit_service import log_audit_action
+from services.dni import normalizar_dni
 
 router = APIRouter()
 
@@ -103,7 +110,7 @@ async def crear_empleado(data: EmpleadoCreate, current_user=Depends(get_current_
     if current_user.rol not in ["SUPERVISOR", "SUPER_ADMIN", "INSTRUCTOR"] and not current_user.empresaId:
         raise HTTPException(status_code=403, detail="Sin permisos B2B")
     
-    from auth.jwt import hash_password
+    from auth.jwt import hash_password_async
     import secrets
     import string
     
@@ -122,10 +129,11 @@ async def crear_empleado(data: EmpleadoCreate, current_user=Depends(get_current_
     new_emp = await prisma.user.create(
         data={
             "email": data.email,
-            "passwordHash": hash_password(temp_password),
+            "passwordHash": await hash_password_async(temp_password),
             "nombre": data.nombre,
             "apellido": data.apellido,
             "dni": data.dni,
+            "dniNormalizado": normalizar_dni(data.dni),
             "rol": "ALUMNO",
             "empresaId": current_user.empresaId,
             "activo": True
@@ -185,13 +193,14 @@ async def asignar_curso_masivo(data: AsignacionMasiva, current_user=Depends(get_
             }
         )
         if not existing:
-            await prisma.inscripcion.create(
+            inscripcion = await prisma.inscripcion.create(
                 data={
                     "alumnoId": al.id,
                     "cursoId": curso.id,
                     "estado": "NO_INICIADO"
                 }
             )
+            await metric_rollups.record(metric_rollups.ENROLLMENTS, inscripcion.createdAt, inscripcion.estado)
             # Sincronizar asistencia en sesiones programadas
             await sincronizar_asistencia_alumno(al.id, curso.id)
             asignados += 1
@@ -201,3 +210,59 @@ async def asignar_curso_masivo(data: AsignacionMasiva, current_user=Depends(get_
     return {
         "message": f"Se asignaron {asignados} cursos correctamente. {ya_existian} ya estaban asignados."
     }
+
+
+class VerificacionMasiva(BaseModel):
+    numeros: List[str] = []
+    dnis: List[str] = []
+
+
+@router.post("/credenciales/verificar")
+@rate_limit_api()
+async def verificar_credenciales(
+    request: Request,
+    data: VerificacionMasiva,
+    formato: str = Query("json", pattern="^(json|ndjson)$"),
+    current_user=Depends(get_current_user)
+):
+    """
+    Verifica de una vez las credenciales de una cuadrilla, por número de
+    credencial y/o DNI. Devuelve un estado compacto por ítem (valid, expired,
+    not_found) en el orden recibido. Con formato=ndjson los resultados se
+    envían en streaming, una línea JSON por ítem.
+    """
+    if current_user.rol not in ["SUPERVISOR", "SUPER_ADMIN", "INSTRUCTOR"] and not current_user.empresaId:
+        raise HTTPException(status_code=403, detail="Sin permisos B2B")
+
+    total = len(data.numeros) + len(data.dnis)
+    if total > settings.CREDENTIAL_VERIFY_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Se pueden verificar hasta {settings.CREDENTIAL_VERIFY_MAX_ITEMS} credenciales por pedido"
+        )
+
+    await log_audit_action(
+        action="CREDENTIAL_BULK_VERIFY",
+        user_id=current_user.id,
+        user_email=current_user.email,
+        details=f"Verificación masiva: {len(data.numeros)} números, {len(data.dnis)} DNIs ({formato}).",
+        ip_address=request.client.host if request.client else None,
+        request_id=getattr(request.state, "request_id", None)
+    )
+
+    resultados = credential_verification.verificar(data.numeros, data.dnis)
+    if formato == "ndjson":
+        async def lineas():
+            async for resultado in resultados:
+                yield json.dumps(resultado, ensure_ascii=False) + "\n"
+
+        return StreamingResponse(lineas(), media_type="application/x-ndjson")
+
+    items = [r async for r in resultados]
+    return {
+        "total": len(items),
+        "validas": sum(1 for r in items if r["status"] == "valid"),
+        "vencidas": sum(1 for r in items if r["status"] == "expired"),
+        "noEncontradas": sum(1 for r in items if r["status"] == "not_found"),
+        "resultados": items,
+    }
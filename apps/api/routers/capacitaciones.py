@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Depends, Query
 from typing import Optional
-from auth.dependencies import get_current_user
+from auth.dependencies import get_current_user, get_principal
 from core.database import prisma
+from services import metric_rollups
 from datetime import datetime
 
 router = APIRouter()
 
 @router.get("/pending-actions")
-async def pending_actions(current_user=Depends(get_current_user)):
+async def pending_actions(current_user=Depends(get_principal)):
     """Dashboard: pending items count"""
     # Count pending essay grades (fotos_credencial pendientes que el user puede evaluar)
     pending_fotos = await prisma.fotocredencial.count(where={"estado": "PENDIENTE"}) if current_user.rol in ["SUPER_ADMIN", "INSTRUCTOR"] else 0
@@ -29,14 +30,21 @@ async def pending_actions(current_user=Depends(get_current_user)):
     }
 
 @router.get("/overview")
-async def overview(current_user=Depends(get_current_user)):
+async def overview(current_user=Depends(get_principal)):
     """Dashboard: general statistics"""
     total_cursos = await prisma.curso.count(where={"activo": True})
     total_empresas = await prisma.company.count(where={"activa": True})
     total_alumnos = await prisma.user.count(where={"rol": "ALUMNO", "activo": True})
-    total_inscripciones = await prisma.inscripcion.count()
-    completadas = await prisma.inscripcion.count(where={"estado": {"in": ["COMPLETADO", "APROBADO"]}})
-    credenciales = await prisma.credencial.count()
+    # Inscripciones y credenciales salen de los rollups diarios (O(días))
+    rollups = await prisma.metricrollupdaily.group_by(
+        by=["metric", "dimension"],
+        where={"metric": {"in": [metric_rollups.ENROLLMENTS, metric_rollups.CREDENTIALS]}},
+        sum={"count": True},
+    )
+    totales = {(r["metric"], r["dimension"]): r["_sum"]["count"] or 0 for r in rollups}
+    total_inscripciones = sum(v for (m, _), v in totales.items() if m == metric_rollups.ENROLLMENTS)
+    completadas = totales.get((metric_rollups.ENROLLMENTS, "COMPLETADO"), 0) + totales.get((metric_rollups.ENROLLMENTS, "APROBADO"), 0)
+    credenciales = sum(v for (m, _), v in totales.items() if m == metric_rollups.CREDENTIALS)
     return {
         "cursos": total_cursos,
         "empresas": total_empresas,
@@ -51,7 +59,7 @@ async def overview(current_user=Depends(get_current_user)):
 async def history(
     limit: int = Query(50, le=200),
     skip: int = Query(0),
-    current_user=Depends(get_current_user)
+    current_user=Depends(get_principal)
 ):
     """Historico de capacitaciones completadas"""
     where = {"estado": {"in": ["COMPLETADO", "APROBADO", "REPROBADO"]}}
@@ -79,7 +87,7 @@ async def history(
 @router.get("/sessions")
 async def list_sessions(
     limit: int = Query(50),
-    current_user=Depends(get_current_user)
+    current_user=Depends(get_principal)
 ):
     """Sesiones programadas"""
     try:
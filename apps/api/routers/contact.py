@@ -9,6 +9,7 @@ from typing import Optional
 import logging
 import os
 from services.email_service import email_service
+from services import metric_rollups
 
 logger = logging.getLogger(__name__)
 
@@ -87,7 +88,7 @@ async def submit_contact_form(data: ContactFormRequest):
         """
 
         # Guardar en la base de datos como una Cotización para que llegue al panel del LMS
-        await prisma.cotizacion.create(
+        cotizacion = await prisma.cotizacion.create(
             data={
                 "empresa": data.empresa,
                 "nombre": data.nombre,
@@ -105,6 +106,7 @@ async def submit_contact_form(data: ContactFormRequest):
                 "status": "pending",
             }
         )
+        await metric_rollups.record(metric_rollups.LEADS, cotizacion.createdAt, cotizacion.status)
         logger.info(f"Cotización guardada en base de datos para {data.empresa} ({data.email})")
 
         # Notificación por email al equipo administrativo (administracion@vmp-edtech.com)
@@ -7,6 +7,8 @@ import logging
 from core.security_utils import sanitize_data
 from middleware.security import rate_limit_public
 from auth.dependencies import require_super_admin
+from services import metric_rollups
+from services.dni import normalizar_dni
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -127,6 +129,7 @@ async def create_cotizacion(
             }
         )
         
+        await metric_rollups.record(metric_rollups.LEADS, new_cotizacion.createdAt, new_cotizacion.status)
         logger.info(f"Nueva cotización creada: {new_cotizacion.id} - {cotizacion.empresa}")
         
         # Enviar emails de notificación
@@ -259,10 +262,13 @@ async def update_cotizacion_status(
         )
     
     try:
+        anterior = await db.cotizacion.find_unique(where={"id": cotizacion_id})
         cotizacion = await db.cotizacion.update(
             where={"id": cotizacion_id},
             data={"status": status}
         )
+        if anterior:
+            await metric_rollups.move(metric_rollups.LEADS, anterior.createdAt, anterior.status, status)
         
         logger.info(f"Cotización {cotizacion_id} actualizada a estado: {status}")
         
@@ -327,7 +333,7 @@ async def convert_cotizacion_to_client(
     """
     import secrets
     import string
-    from auth.jwt import hash_password
+    from auth.jwt import hash_password_async
 
     try:
         # 1. Obtener y validar cotización
@@ -428,10 +434,11 @@ async def convert_cotizacion_to_client(
             alumno = await db.user.create(
                 data={
                     "email": alumno_email,
-                    "passwordHash": hash_password(password_temporal),
+                    "passwordHash": await hash_password_async(password_temporal),
                     "nombre": alumno_nombre,
                     "apellido": alumno_apellido,
                     "dni": alumno_dni,
+                    "dniNormalizado": normalizar_dni(alumno_dni),
                     "telefono": empresa_telefono,
                     "rol": "ALUMNO",
                     "empresaId": empresa.id,
@@ -450,6 +457,7 @@ async def convert_cotizacion_to_client(
                     "estado": "NO_INICIADO"
                 }
             )
+            await metric_rollups.record(metric_rollups.ENROLLMENTS, inscripcion.createdAt, inscripcion.estado)
             
             logger.info(f"Inscripción creada: {inscripcion.id} - Alumno {alumno.id} en curso {curso.id}")
             
@@ -480,6 +488,7 @@ async def convert_cotizacion_to_client(
             where={"id": cotizacion_id},
             data={"status": "converted"}
         )
+        await metric_rollups.move(metric_rollups.LEADS, cotizacion.createdAt, cotizacion.status, "converted")
         
         logger.info(f"Cotización {cotizacion_id} marcada como convertida")
         
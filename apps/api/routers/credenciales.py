@@ -3,12 +3,14 @@ Router dedicado a la gestión de credenciales.
 Generación manual por instructores y listados.
 """
 from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import RedirectResponse
 from typing import Optional, List
 from datetime import datetime
 from auth.dependencies import get_current_user
 from middleware.security import rate_limit_public
 from core.database import prisma
-from services.credential_service import generate_credential_for_student
+from services.credential_service import generate_credential_for_student, regenerar_pdf
+from services import credential_batch, credential_pdf, offline_manifest
 from services.credential_validator import credential_validator
 from services.webhook_service import emit, WebhookEvent
 from pydantic import BaseModel
@@ -26,6 +28,11 @@ class GenerarCredencialManualRequest(BaseModel):
     cursoId: str
 
 
+class EmitirLoteRequest(BaseModel):
+    cursoId: str
+    empresaId: Optional[str] = None
+
+
 class CredencialListItem(BaseModel):
     id: str
     numero: str
@@ -140,6 +147,8 @@ async def eliminar_credencial(id: str, current_user=Depends(get_current_user)):
         raise HTTPException(status_code=404, detail="Credencial no encontrada")
 
     await prisma.credencial.delete(where={"id": id})
+    credential_validator.invalidate(credencial.numero)
+    await offline_manifest.registrar(credencial.numero, offline_manifest.BAJA)
 
     return {"status": "success", "message": "Credencial eliminada correctamente"}
 
@@ -219,12 +228,95 @@ async def generar_credencial_manual(
         raise HTTPException(status_code=500, detail=f"Error generando credencial: {str(e)}")
 
 
+@router.post("/lotes", status_code=202)
+async def emitir_lote_credenciales(
+    data: EmitirLoteRequest,
+    current_user=Depends(get_current_user)
+):
+    """Emitir en background las credenciales de todos los inscriptos que completaron un curso.
+
+    Un INSTRUCTOR solo puede emitir para los alumnos de su propia empresa.
+    El avance se consulta en GET /credenciales/lotes/{job_id}.
+    """
+    if current_user.rol not in ["SUPER_ADMIN", "INSTRUCTOR"]:
+        raise HTTPException(status_code=403, detail="No tienes permisos para generar credenciales")
+
+    empresa_id = data.empresaId
+    if current_user.rol == "INSTRUCTOR":
+        if empresa_id and empresa_id != current_user.empresaId:
+            raise HTTPException(status_code=403, detail="No tenés permisos para emitir credenciales a esta empresa")
+        empresa_id = current_user.empresaId
+
+    curso = await prisma.curso.find_unique(where={"id": data.cursoId})
+    if not curso:
+        raise HTTPException(status_code=404, detail="Curso no encontrado")
+
+    job = await credential_batch.submit(data.cursoId, empresa_id, current_user)
+    return credential_batch.serializar(job)
+
+
+@router.get("/lotes/{job_id}")
+async def obtener_lote_credenciales(job_id: str, current_user=Depends(get_current_user)):
+    """Estado y avance de un lote de emisión."""
+    if current_user.rol not in ["SUPER_ADMIN", "INSTRUCTOR"]:
+        raise HTTPException(status_code=403, detail="No tienes permisos")
+    job = await credential_batch.get(job_id)
+    if job is None or (current_user.rol != "SUPER_ADMIN" and job.createdById != current_user.id):
+        raise HTTPException(status_code=404, detail="Lote no encontrado")
+    return credential_batch.serializar(job)
+
+
+@router.get("/manifiesto")
+async def obtener_manifiesto(
+    desde: Optional[int] = Query(None, ge=0, description="Versión que ya tiene el escáner: devuelve solo el delta"),
+    current_user=Depends(get_current_user)
+):
+    """
+    Manifiesto firmado (Ed25519) de las credenciales vigentes para validar
+    sin conexión. Sin `desde` es el completo; con `desde` solo las altas y
+    bajas posteriores a esa versión.
+
+    Trae todas las credenciales del sistema (con el hash número:DNI, que con
+    DNIs de 8 dígitos se puede revertir): solo para los roles que escanean.
+    """
+    if current_user.rol not in ["SUPERVISOR", "SUPER_ADMIN", "INSTRUCTOR"]:
+        raise HTTPException(status_code=403, detail="No tienes permisos")
+    return await offline_manifest.generar(desde)
+
+
+@router.get("/manifiesto/clave")
+async def obtener_clave_manifiesto():
+    """Clave pública con la que los escáneres verifican el manifiesto (pública)."""
+    return offline_manifest.clave_publica()
+
+
+@router.get("/{id}/pdf")
+async def descargar_pdf_credencial(id: str, current_user=Depends(get_current_user)):
+    """
+    Descarga el PDF de la credencial. Si cambió algo de lo que entra en el
+    dibujo (p. ej. la plantilla) y todavía no se redibujó, se genera ahora.
+    """
+    credencial = await prisma.credencial.find_unique(where={"id": id})
+    if not credencial:
+        raise HTTPException(status_code=404, detail="Credencial no encontrada")
+    if current_user.rol not in ["SUPER_ADMIN", "INSTRUCTOR"] and credencial.alumnoId != current_user.id:
+        raise HTTPException(status_code=403, detail="No tienes permisos")
+    try:
+        pdf_url, _ = await credential_pdf.asegurar(credencial)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generando el PDF: {str(e)}")
+    return RedirectResponse(pdf_url)
+
+
 @router.post("/regenerar/{credencial_id}")
 async def regenerar_credencial(
     credencial_id: str,
     current_user=Depends(get_current_user)
 ):
-    """Regenerar una credencial existente (forzado, Solo SUPER_ADMIN)"""
+    """
+    Regenerar el PDF de una credencial existente con los datos actuales
+    (mismo número; Solo SUPER_ADMIN). Si nada cambió se reutiliza el PDF.
+    """
     if current_user.rol != "SUPER_ADMIN":
         raise HTTPException(status_code=403, detail="No tienes permisos")
 
@@ -234,18 +326,16 @@ async def regenerar_credencial(
         raise HTTPException(status_code=404, detail="Credencial no encontrada")
 
     try:
-        result = await generate_credential_for_student(
-            alumno_id=existing.alumnoId,
-            curso_id=existing.cursoId,
-            emisor_id=current_user.id,
-            force=True
-        )
+        pdf_url, renderizado = await regenerar_pdf(existing, current_user.id)
         return {
-            "message": "Credencial regenerada exitosamente",
+            "message": "Credencial regenerada exitosamente" if renderizado else "La credencial no cambió: se reutiliza el PDF existente",
             "credencial": {
-                "numero": result["credencial"].numero,
-                "pdfUrl": result["pdfUrl"]
+                "numero": existing.numero,
+                "pdfUrl": pdf_url,
+                "renderizado": renderizado
             }
         }
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error regenerando credencial: {str(e)}")
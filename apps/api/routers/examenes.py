@@ -9,10 +9,12 @@ from schemas.models import (
 )
 from auth.dependencies import get_current_user
 from core.database import prisma
+from services import metric_rollups, offline_manifest
 from prisma import Json
 from core.config import settings
+from services.credential_numbering import credential_numbers, numero_canonico
+from services.credential_validator import credential_validator
 from services.credencial_generator import (
-    generate_credencial_number,
     create_credencial_pdf,
     save_credencial_pdf,
     generate_qr_code
@@ -112,10 +114,8 @@ async def generate_credencial(
         # Convert URL to file path
         foto_path = foto_credencial.fotoUrl.replace("/uploads/", "uploads/")
     
-    # Generate credential number
-    year = datetime.now().year
-    count = await prisma.credencial.count()
-    numero_credencial = generate_credencial_number(year, count + 1)
+    # Generate credential number (atomic per-year sequence)
+    numero_credencial = await credential_numbers.numero(datetime.now().year)
     
     # Build QR URL
     qr_url = f"{settings.FRONTEND_URL}/validar/{numero_credencial}"
@@ -154,6 +154,7 @@ async def generate_credencial(
     credencial = await prisma.credencial.create(
         data={
             "numero": numero_credencial,
+            "numeroCanonico": numero_canonico(numero_credencial),
             "alumnoId": inscripcion.alumnoId,
             "cursoId": inscripcion.cursoId,
             "pdfUrl": pdf_url,
@@ -162,6 +163,9 @@ async def generate_credencial(
             "fechaVencimiento": fecha_vencimiento
         }
     )
+    credential_validator.invalidate(credencial.numero)
+    await offline_manifest.registrar(credencial.numero, offline_manifest.ALTA)
+    await metric_rollups.record(metric_rollups.CREDENTIALS, credencial.fechaEmision)
     
     return {
         "message": "Credencial generada exitosamente",
@@ -287,7 +291,7 @@ async def enviar_quiz(
     intento_actual = intentos_previos + 1
 
     # Guardar examen en base de datos
-    await prisma.examen.create(
+    examen = await prisma.examen.create(
         data={
             "alumnoId": current_user.id,
             "cursoId": data.cursoId,
@@ -297,6 +301,7 @@ async def enviar_quiz(
             "aprobado": aprobado
         }
     )
+    await metric_rollups.record(metric_rollups.EXAMS, examen.realizadoAt, metric_rollups.exam_dimension(aprobado))
 
     # Generar mensaje con información de intento
     if aprobado:
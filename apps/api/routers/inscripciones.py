@@ -12,6 +12,7 @@ from schemas.inscripciones import (
 )
 from auth.dependencies import get_current_user
 from core.database import prisma
+from services import metric_rollups
 from services.progreso_calculator import (
     calcular_progreso_curso,
     calcular_modulos_completados,
@@ -139,6 +140,7 @@ async def inscribirse_en_curso(cursoId: str, current_user=Depends(get_current_us
             "estado": "NO_INICIADO"
         }
     )
+    await metric_rollups.record(metric_rollups.ENROLLMENTS, inscripcion.createdAt, inscripcion.estado)
 
     return _serialize_inscripcion(inscripcion)
 
@@ -2,21 +2,95 @@
 Router de métricas para el panel administrativo.
 Proporciona estadísticas y datos para visualización.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from datetime import datetime, timedelta
 from typing import Optional
+from core.config import settings
 from core.database import prisma
-from auth.dependencies import get_current_user
+from auth.dependencies import get_principal
 from schemas.models import UserResponse
+from services import metric_rollups
+from services.snapshot_cache import SnapshotCache, snapshot_meta
 
 router = APIRouter()
 
+# Snapshots de los agregados del dashboard, compartidos por las sesiones admin
+metrics_snapshots = SnapshotCache(
+    ttl_seconds=settings.METRICS_SNAPSHOT_TTL_SECONDS,
+    max_stale_seconds=settings.METRICS_SNAPSHOT_MAX_STALE_SECONDS,
+)
+
+
+def _count_by(rows: list, field: str) -> dict:
+    """Filas de group_by(count=True) -> {valor: cantidad}"""
+    return {str(row[field]): row["_count"]["_all"] for row in rows}
+
+
+async def _compute_overview() -> dict:
+    # Tres consultas en paralelo en lugar de 13 count() secuenciales: los
+    # totales simples en un solo SELECT y los estados con group_by.
+    totals_rows, quotes_rows, enrollments_rows = await asyncio.gather(
+        prisma.query_raw(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM "users") AS users,
+                (SELECT COUNT(*) FROM "companies") AS companies,
+                (SELECT COUNT(*) FROM "cursos") AS courses,
+                (SELECT COUNT(*) FROM "credenciales") AS credentials
+            """
+        ),
+        prisma.cotizacion.group_by(by=["status"], count=True),
+        prisma.inscripcion.group_by(by=["estado"], count=True),
+    )
+    totals = {k: int(v) for k, v in totals_rows[0].items()}
+    quotes = _count_by(quotes_rows, "status")
+    enrollments = _count_by(enrollments_rows, "estado")
+
+    total_quotes = sum(quotes.values())
+    total_enrollments = sum(enrollments.values())
+    quotes_converted = quotes.get("converted", 0)
+    enrollments_completed = enrollments.get("COMPLETADO", 0)
+
+    # Calcular tasa de conversión
+    conversion_rate = (quotes_converted / total_quotes * 100) if total_quotes > 0 else 0
+
+    return {
+        "totals": {
+            "users": totals["users"],
+            "companies": totals["companies"],
+            "courses": totals["courses"],
+            "enrollments": total_enrollments,
+            "credentials": totals["credentials"],
+            "quotes": total_quotes
+        },
+        "quotes": {
+            "pending": quotes.get("pending", 0),
+            "contacted": quotes.get("contacted", 0),
+            "converted": quotes_converted,
+            "rejected": quotes.get("rejected", 0),
+            "conversion_rate": round(conversion_rate, 2)
+        },
+        "enrollments": {
+            # EstadoInscripcion no tiene ACTIVO: "activas" son las EN_PROGRESO
+            "active": enrollments.get("EN_PROGRESO", 0),
+            "completed": enrollments_completed,
+            "completion_rate": round((enrollments_completed / total_enrollments * 100) if total_enrollments > 0 else 0, 2)
+        }
+    }
+
 
 @router.get("/overview")
-async def get_overview_metrics(current_user: UserResponse = Depends(get_current_user)):
+async def get_overview_metrics(
+    refresh: bool = Query(False, description="Recalcular ignorando el snapshot"),
+    current_user: UserResponse = Depends(get_principal)
+):
     """
     Obtener métricas generales del sistema.
     Requiere autenticación de SUPER_ADMIN.
+
+    Se sirve desde un snapshot compartido por todas las sesiones (ver
+    services/snapshot_cache.py); "snapshot.ageSeconds" indica su antigüedad.
     """
     if current_user.rol != "SUPER_ADMIN":
         raise HTTPException(
@@ -25,49 +99,8 @@ async def get_overview_metrics(current_user: UserResponse = Depends(get_current_
         )
     
     try:
-        # Contar totales
-        total_users = await prisma.user.count()
-        total_companies = await prisma.company.count()
-        total_courses = await prisma.curso.count()
-        total_enrollments = await prisma.inscripcion.count()
-        total_credentials = await prisma.credencial.count()
-        total_quotes = await prisma.cotizacion.count()
-        
-        # Cotizaciones por estado
-        quotes_pending = await prisma.cotizacion.count(where={"status": "pending"})
-        quotes_contacted = await prisma.cotizacion.count(where={"status": "contacted"})
-        quotes_converted = await prisma.cotizacion.count(where={"status": "converted"})
-        quotes_rejected = await prisma.cotizacion.count(where={"status": "rejected"})
-        
-        # Inscripciones por estado
-        enrollments_active = await prisma.inscripcion.count(where={"estado": "ACTIVO"})
-        enrollments_completed = await prisma.inscripcion.count(where={"estado": "COMPLETADO"})
-        
-        # Calcular tasa de conversión
-        conversion_rate = (quotes_converted / total_quotes * 100) if total_quotes > 0 else 0
-        
-        return {
-            "totals": {
-                "users": total_users,
-                "companies": total_companies,
-                "courses": total_courses,
-                "enrollments": total_enrollments,
-                "credentials": total_credentials,
-                "quotes": total_quotes
-            },
-            "quotes": {
-                "pending": quotes_pending,
-                "contacted": quotes_contacted,
-                "converted": quotes_converted,
-                "rejected": quotes_rejected,
-                "conversion_rate": round(conversion_rate, 2)
-            },
-            "enrollments": {
-                "active": enrollments_active,
-                "completed": enrollments_completed,
-                "completion_rate": round((enrollments_completed / total_enrollments * 100) if total_enrollments > 0 else 0, 2)
-            }
-        }
+        snapshot = await metrics_snapshots.get("overview", _compute_overview, force=refresh)
+        return {**snapshot.value, "snapshot": snapshot_meta(snapshot)}
     except Exception as e:
         print(f"Error getting overview metrics: {str(e)}")
         raise HTTPException(
@@ -79,7 +112,7 @@ async def get_overview_metrics(current_user: UserResponse = Depends(get_current_
 @router.get("/recent-activity")
 async def get_recent_activity(
     limit: int = 5,
-    current_user: UserResponse = Depends(get_current_user)
+    current_user: UserResponse = Depends(get_principal)
 ):
     """
     Últimas inscripciones registradas, para el feed de actividad reciente
@@ -120,10 +153,11 @@ async def get_recent_activity(
 @router.get("/conversions")
 async def get_conversion_metrics(
     days: int = 30,
-    current_user: UserResponse = Depends(get_current_user)
+    current_user: UserResponse = Depends(get_principal)
 ):
     """
     Obtener datos de conversión de cotizaciones en los últimos N días.
+    Lee los rollups diarios (services/metric_rollups.py): O(días), no O(cotizaciones).
     """
     if current_user.rol != "SUPER_ADMIN":
         raise HTTPException(
@@ -135,20 +169,20 @@ async def get_conversion_metrics(
         # Calcular fecha de inicio
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        # Obtener cotizaciones del período
-        quotes = await prisma.cotizacion.find_many(
+        # Rollups de leads del período (una fila por día y estado)
+        rollups = await prisma.metricrollupdaily.find_many(
             where={
-                "createdAt": {
-                    "gte": start_date
-                }
+                "metric": metric_rollups.LEADS,
+                "day": {"gte": start_date.replace(hour=0, minute=0, second=0, microsecond=0)},
+                "count": {"gt": 0},
             },
-            order_by={"createdAt": "asc"}
+            order={"day": "asc"}
         )
         
         # Agrupar por día
         daily_data = {}
-        for quote in quotes:
-            date_key = quote.createdAt.strftime("%Y-%m-%d")
+        for row in rollups:
+            date_key = row.day.strftime("%Y-%m-%d")
             if date_key not in daily_data:
                 daily_data[date_key] = {
                     "date": date_key,
@@ -159,8 +193,8 @@ async def get_conversion_metrics(
                     "rejected": 0
                 }
             
-            daily_data[date_key]["total"] += 1
-            daily_data[date_key][quote.status] += 1
+            daily_data[date_key]["total"] += row.count
+            daily_data[date_key][row.dimension] = daily_data[date_key].get(row.dimension, 0) + row.count
         
         return {
             "period_days": days,
@@ -175,39 +209,57 @@ async def get_conversion_metrics(
         )
 
 
+COURSE_SORT_FIELDS = ("completion_rate", "total_enrollments", "completed_enrollments", "nombre")
+
+
 @router.get("/courses")
-async def get_course_metrics(current_user: UserResponse = Depends(get_current_user)):
+async def get_course_metrics(
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    sort: Optional[str] = Query(None, description=f"Uno de: {', '.join(COURSE_SORT_FIELDS)}"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    current_user: UserResponse = Depends(get_principal)
+):
     """
     Obtener estadísticas por curso.
+
+    Dos consultas fijas sin importar el tamaño del catálogo: los cursos con
+    sus _count y un group_by de inscripciones por (cursoId, estado).
     """
     if current_user.rol != "SUPER_ADMIN":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permisos para ver estas métricas"
         )
+    if sort is not None and sort not in COURSE_SORT_FIELDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"sort debe ser uno de: {', '.join(COURSE_SORT_FIELDS)}"
+        )
     
     try:
-        courses = await prisma.curso.find_many(
-            include={
-                "_count": {
-                    "select": {
-                        "inscripciones": True,
-                        "credenciales": True
+        courses, completed_rows = await asyncio.gather(
+            prisma.curso.find_many(
+                include={
+                    "_count": {
+                        "select": {
+                            "inscripciones": True,
+                            "credenciales": True
+                        }
                     }
                 }
-            }
+            ),
+            prisma.inscripcion.group_by(
+                by=["cursoId", "estado"],
+                where={"estado": "COMPLETADO"},
+                count=True,
+            ),
         )
+        completed_by_course = {row["cursoId"]: row["_count"]["_all"] for row in completed_rows}
         
         course_stats = []
         for course in courses:
-            # Contar inscripciones completadas
-            completed = await prisma.inscripcion.count(
-                where={
-                    "cursoId": course.id,
-                    "estado": "COMPLETADO"
-                }
-            )
-            
+            completed = completed_by_course.get(course.id, 0)
             course_stats.append({
                 "id": course.id,
                 "nombre": course.nombre,
@@ -217,9 +269,15 @@ async def get_course_metrics(current_user: UserResponse = Depends(get_current_us
                 "completed_enrollments": completed,
                 "completion_rate": round((completed / course._count.inscripciones * 100) if course._count.inscripciones > 0 else 0, 2)
             })
+
+        if sort:
+            course_stats.sort(key=lambda c: c[sort], reverse=(order == "desc"))
+        total = len(course_stats)
+        course_stats = course_stats[skip:skip + limit if limit is not None else None]
         
         return {
-            "courses": course_stats
+            "courses": course_stats,
+            "total": total
         }
     except Exception as e:
         print(f"Error getting course metrics: {str(e)}")
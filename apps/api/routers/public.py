@@ -4,7 +4,8 @@ No requiere autenticación.
 """
 import re
 import unicodedata
-from fastapi import APIRouter, HTTPException, status, Request
+from fastapi import APIRouter, HTTPException, status, Request, Response
+from fastapi.responses import JSONResponse
 from services.credential_validator import credential_validator
 from middleware.security import rate_limit_public
 from core.database import prisma
@@ -45,11 +46,18 @@ async def validate_credential(request: Request, numero: str):
     Endpoint público que permite verificar la validez de una credencial
     usando su número único (ej: VMP-2026-00001).
     
-    No requiere autenticación.
+    No requiere autenticación. Responde con ETag y Cache-Control para que
+    los escaneos repetidos los absorban los proxies (o un 304).
     """
     try:
-        result = await credential_validator.validate_credential(numero)
-        return result
+        validacion = await credential_validator.resolve(numero)
+        headers = {
+            "ETag": validacion.etag,
+            "Cache-Control": f"public, max-age={validacion.max_age}",
+        }
+        if validacion.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return JSONResponse(validacion.result, headers=headers)
     except Exception as e:
         print(f"Error validating credential: {str(e)}")
         raise HTTPException(
@@ -11,6 +11,7 @@ from schemas.sesiones import (
 )
 from auth.dependencies import get_current_user
 from core.database import prisma
+from services import metric_rollups
 
 router = APIRouter()
 
@@ -279,7 +280,7 @@ async def crear_sesion(
             where={"alumnoId_cursoId": {"alumnoId": al_id, "cursoId": data.cursoId}}
         )
         if not existing_insc:
-            await prisma.inscripcion.create(
+            inscripcion = await prisma.inscripcion.create(
                 data={
                     "alumnoId": al_id,
                     "cursoId": data.cursoId,
@@ -287,6 +288,7 @@ async def crear_sesion(
                     "estado": "NO_INICIADO"
                 }
             )
+            await metric_rollups.record(metric_rollups.ENROLLMENTS, inscripcion.createdAt, inscripcion.estado)
 
         # 2. Asistencia de la sesión
         await prisma.asistenciasesion.create(
@@ -6,11 +6,13 @@ from fastapi.responses import RedirectResponse
 from jose import JWTError, jwt as jose_jwt
 from pydantic import BaseModel, EmailStr
 
-from auth.jwt import create_access_token, hash_password
+from auth.jwt import create_access_token, build_token_claims, hash_password_async
+from auth.principal_cache import principal_cache
 from core.config import settings
 from core.database import prisma
 from middleware.security import rate_limit_login, rate_limit_public
 from services import sso_service
+from services.dni import normalizar_dni
 
 router = APIRouter()
 
@@ -143,22 +145,27 @@ async def sso_callback(request: Request, data: SsoCallbackRequest):
         user = await prisma.user.create(
             data={
                 "email": email,
-                "passwordHash": hash_password(secrets.token_urlsafe(32)),
+                "passwordHash": await hash_password_async(secrets.token_urlsafe(32)),
                 "nombre": claims.get("given_name") or "Usuario",
                 "apellido": claims.get("family_name") or "",
                 "dni": dni,
+                "dniNormalizado": normalizar_dni(dni),
                 "rol": "ALUMNO",
                 "empresaId": empresa.id,
                 "activo": True,
             }
         )
     elif not user.empresaId:
-        user = await prisma.user.update(where={"id": user.id}, data={"empresaId": empresa.id})
+        user = await prisma.user.update(
+            where={"id": user.id},
+            data={"empresaId": empresa.id, "tokenVersion": {"increment": 1}},
+        )
+        principal_cache.invalidate(user.id)
 
     if not user.activo:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="El usuario está inactivo")
 
-    access_token = create_access_token(data={"sub": user.id})
+    access_token = create_access_token(data=build_token_claims(user))
 
     return {
         "access_token": access_token,
@@ -5,9 +5,12 @@ from schemas.users import (
     CargaMasivaRequest, CargaMasivaResponse
 )
 from auth.dependencies import get_current_user, require_admin
+from auth.principal_cache import principal_cache
+from auth.revocation import token_revocations
 from core.database import prisma
-from auth.jwt import hash_password
-from services import storage_service
+from auth.jwt import hash_password_async
+from services import metric_rollups, storage_service
+from services.dni import normalizar_dni
 
 router = APIRouter()
 
@@ -37,6 +40,7 @@ async def subir_mi_firma(
         raise HTTPException(status_code=503, detail=str(e))
 
     await prisma.user.update(where={"id": current_user.id}, data={"firmaUrl": url})
+    principal_cache.invalidate(current_user.id)
 
     return {"exists": True, "url": url}
 
@@ -154,10 +158,11 @@ async def crear_usuario(data: CreateUserRequest, current_user=Depends(get_curren
     user = await prisma.user.create(
         data={
             "email": data.email,
-            "passwordHash": hash_password(data.password),
+            "passwordHash": await hash_password_async(data.password),
             "nombre": data.nombre,
             "apellido": data.apellido,
             "dni": data.dni,
+            "dniNormalizado": normalizar_dni(data.dni),
             "telefono": data.telefono,
             "rol": data.rol,
             "empresaId": data.empresaId,
@@ -206,19 +211,21 @@ async def crear_usuarios_masivo(data: CargaMasivaRequest, current_user=Depends(g
             nuevo_usuario = await prisma.user.create(
                 data={
                     "email": email,
-                    "passwordHash": hash_password(alumno.dni),
+                    "passwordHash": await hash_password_async(alumno.dni),
                     "nombre": alumno.nombre,
                     "apellido": alumno.apellido,
                     "dni": alumno.dni,
+                    "dniNormalizado": normalizar_dni(alumno.dni),
                     "rol": "ALUMNO",
                     "empresaId": empresa_objetivo,
                 }
             )
 
             if data.cursoId:
-                await prisma.inscripcion.create(
+                inscripcion = await prisma.inscripcion.create(
                     data={"alumnoId": nuevo_usuario.id, "cursoId": data.cursoId}
                 )
+                await metric_rollups.record(metric_rollups.ENROLLMENTS, inscripcion.createdAt, inscripcion.estado)
 
             creados += 1
         except Exception as e:
@@ -247,13 +254,27 @@ async def actualizar_usuario(id: str, data: UpdateUserRequest, current_user=Depe
         
     update_data = {k: v for k, v in data.dict().items() if v is not None}
     
+    # Cambios que deben invalidar los tokens ya emitidos
+    revoca_tokens = (
+        "password" in update_data
+        or update_data.get("activo") is False
+        or ("rol" in update_data and update_data["rol"] != existing.rol)
+        or ("empresaId" in update_data and update_data["empresaId"] != existing.empresaId)
+    )
+
     if "password" in update_data:
-        update_data["passwordHash"] = hash_password(update_data.pop("password"))
+        update_data["passwordHash"] = await hash_password_async(update_data.pop("password"))
+    if "dni" in update_data:
+        update_data["dniNormalizado"] = normalizar_dni(update_data["dni"])
+    if revoca_tokens:
+        update_data["tokenVersion"] = {"increment": 1}
         
     user = await prisma.user.update(
         where={"id": id},
         data=update_data
     )
+    principal_cache.invalidate(id)
+    token_revocations.record(id, user.tokenVersion, user.activo)
     
     return user
 
@@ -282,8 +303,15 @@ async def eliminar_usuario(id: str, current_user=Depends(get_current_user)):
 
     if inscripciones_count > 0 or cursos_count > 0 or sesiones_count > 0:
         # Desactivar en vez de eliminar
-        await prisma.user.update(where={"id": id}, data={"activo": False})
+        user = await prisma.user.update(
+            where={"id": id},
+            data={"activo": False, "tokenVersion": {"increment": 1}},
+        )
+        principal_cache.invalidate(id)
+        token_revocations.record(id, user.tokenVersion, user.activo)
         return {"message": "Usuario desactivado porque tiene datos asociados"}
 
     await prisma.user.delete(where={"id": id})
+    principal_cache.invalidate(id)
+    token_revocations.forget(id)
     return {"message": "Usuario eliminado exitosamente"}
@@ -110,6 +110,32 @@ class CompraResponse(CompraBase):
     items: List[CompraItemBase]
     createdAt: datetime
 
+# --- Importación masiva ---
+class ImportacionFila(SanitizedBaseModel):
+    fila: int                    # posición del comprobante en el archivo (desde 1)
+    numero: Optional[str] = None
+    estado: str                  # CREADO, VALIDO (dryRun) o ERROR
+    id: Optional[str] = None
+    motivo: Optional[str] = None
+
+class ImportacionResponse(SanitizedBaseModel):
+    total: int
+    creados: int
+    errores: int
+    dryRun: bool = False
+    resultados: List[ImportacionFila]
+
+# --- Cierre de períodos ---
+class CierrePeriodoRequest(SanitizedBaseModel):
+    period: str = Field(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$")  # YYYY-MM
+
+class PeriodoResponse(SanitizedBaseModel):
+    id: str
+    period: str
+    periodEnd: datetime
+    closedById: Optional[str] = None
+    createdAt: datetime
+
 # --- Caja ---
 class CajaMovimientoBase(SanitizedBaseModel):
     tipo: str # INGRESO, EGRESO
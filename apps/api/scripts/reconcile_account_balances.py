@@ -0,0 +1,50 @@
+"""
+Reconciliación de los totales acumulados de las cuentas contables.
+
+Recalcula Debe/Haber de cada cuenta desde ledger_entries y muestra las
+cuentas cuyos totales guardados (accounts.debit_total / credit_total) no
+coinciden. Con --fix además los corrige.
+
+Uso:
+    python scripts/reconcile_account_balances.py          # solo reporta
+    python scripts/reconcile_account_balances.py --fix    # reporta y corrige
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from core.database import prisma
+from services.ledger_service import reconcile
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fix", action="store_true", help="reemplaza los totales por los del libro mayor")
+    args = parser.parse_args()
+
+    load_dotenv()
+    await prisma.connect()
+    try:
+        diferencias = await reconcile(fix=args.fix)
+        if not diferencias:
+            print("✅ Los totales de todas las cuentas coinciden con el libro mayor")
+            return
+
+        print(f"{'cuenta':<12}{'debe guardado':>16}{'debe mayor':>14}{'haber guardado':>16}{'haber mayor':>14}")
+        for d in diferencias:
+            print(
+                f"{d['accountCode']:<12}{d['storedDebit']:>16.2f}{d['ledgerDebit']:>14.2f}"
+                f"{d['storedCredit']:>16.2f}{d['ledgerCredit']:>14.2f}  {d['accountName']}"
+            )
+        estado = "corregidas" if args.fix else "con diferencias (usar --fix para corregir)"
+        print(f"\n{len(diferencias)} cuentas {estado}")
+    finally:
+        await prisma.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
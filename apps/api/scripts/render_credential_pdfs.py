@@ -0,0 +1,81 @@
+"""
+Vuelve a generar los PDFs de credenciales que cambiaron.
+
+Para cada credencial con pdfDatos calcula la clave de contenido (datos,
+foto, firma y TEMPLATE_VERSION, ver services/credential_pdf.py) y dibuja y
+sube solo las que no coinciden con el PDF ya subido: después de subir
+TEMPLATE_VERSION se regeneran todas, después de cambiar fotos solo esas, y
+una segunda corrida no dibuja nada.
+
+Uso:
+    python scripts/render_credential_pdfs.py
+    python scripts/render_credential_pdfs.py --curso <curso_id> --concurrency 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from core.database import prisma
+from services import credential_pdf
+from services.asset_loader import asset_loader
+
+PAGINA = 200
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--curso", help="solo las credenciales de este curso")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    load_dotenv()
+    await prisma.connect()
+    dibujadas = reutilizadas = anteriores = fallidas = 0
+    en_vuelo = asyncio.Semaphore(max(1, args.concurrency))
+
+    async def procesar(credencial):
+        nonlocal dibujadas, reutilizadas, anteriores, fallidas
+        if not credencial.pdfDatos:
+            anteriores += 1
+            return
+        async with en_vuelo:
+            try:
+                _, dibujada = await credential_pdf.asegurar(credencial)
+            except Exception as e:
+                fallidas += 1
+                print(f"❌ {credencial.numero}: {e}")
+                return
+        if dibujada:
+            dibujadas += 1
+        else:
+            reutilizadas += 1
+
+    try:
+        where = {"cursoId": args.curso} if args.curso else {}
+        cursor = None
+        while True:
+            pagina = await prisma.credencial.find_many(
+                where=where,
+                take=PAGINA,
+                order={"id": "asc"},
+                **({"cursor": {"id": cursor}, "skip": 1} if cursor else {}),
+            )
+            if not pagina:
+                break
+            await asyncio.gather(*(procesar(c) for c in pagina))
+            cursor = pagina[-1].id
+
+        print(f"✅ {dibujadas} dibujadas, {reutilizadas} sin cambios, {anteriores} anteriores a pdfDatos (sin tocar)")
+        if fallidas:
+            print(f"⚠️  {fallidas} fallaron")
+    finally:
+        await asset_loader.aclose()
+        await prisma.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -40,6 +40,7 @@ async def run_seed():
                 "nombre": "Administrador",
                 "apellido": "VMP",
                 "dni": "00000000",
+                "dniNormalizado": "00000000",
                 "rol": "SUPER_ADMIN",
                 "activo": True
             }
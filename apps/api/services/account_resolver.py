@@ -0,0 +1,90 @@
+"""
+Resolución en memoria (por proceso) de cuentas contables por código.
+
+registrar_venta y registrar_compra hacían de 3 a 6 find_unique seguidos por
+códigos fijos (4.1.01, 2.1.05, 1.1.01/02, 1.1.05, 5.1.0x, 2.1.08/09) antes de
+abrir la transacción. El plan de cuentas es chico y casi no cambia, así que
+se carga entero una vez y los códigos se resuelven desde memoria.
+
+- crear_cuenta y /seed llaman a invalidate(): la próxima resolución recarga.
+- Un código que no está en memoria se busca una vez en la base antes de
+  darlo por faltante (cuentas creadas desde otro worker).
+- ensure() crea con upsert las cuentas que el sistema necesita (retenciones)
+  la primera vez y después las sirve desde memoria.
+- El TTL acota cuánto tarda en verse un cambio hecho desde otro worker.
+
+Solo se usan id, code, name y type de las cuentas cacheadas: los totales
+acumulados (debitTotal/creditTotal) hay que leerlos de la base.
+"""
+import asyncio
+import time
+from typing import Any, Optional
+
+from core.config import settings
+from core.database import prisma
+
+
+class AccountResolver:
+    def __init__(self, ttl_seconds: float, clock=time.monotonic) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._by_code: Optional[dict[str, Any]] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.lookups = 0
+
+    def _fresh(self) -> bool:
+        return self._by_code is not None and self._clock() - self._loaded_at < self.ttl_seconds
+
+    async def _ensure_loaded(self) -> dict[str, Any]:
+        if self._fresh():
+            return self._by_code
+        async with self._lock:
+            # Otro request pudo haber cargado mientras se esperaba el lock
+            if not self._fresh():
+                accounts = await prisma.account.find_many()
+                self._by_code = {a.code: a for a in accounts}
+                self._loaded_at = self._clock()
+                self.loads += 1
+        return self._by_code
+
+    async def get(self, code: str) -> Optional[Any]:
+        by_code = await self._ensure_loaded()
+        account = by_code.get(code)
+        if account is not None:
+            self.hits += 1
+            return account
+        self.lookups += 1
+        account = await prisma.account.find_unique(where={"code": code})
+        if account is not None:
+            by_code[code] = account
+        return account
+
+    async def ensure(self, code: str, data: dict) -> Any:
+        """Devuelve la cuenta `code`, creándola con `data` si no existe."""
+        account = await self.get(code)
+        if account is None:
+            account = await prisma.account.upsert(
+                where={"code": code},
+                data={"create": {"code": code, **data}, "update": {}},
+            )
+            if self._by_code is not None:
+                self._by_code[code] = account
+        return account
+
+    def invalidate(self) -> None:
+        self._by_code = None
+
+    def stats(self) -> dict:
+        return {
+            "accounts": len(self._by_code or {}),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "loads": self.loads,
+            "db_lookups": self.lookups,
+        }
+
+
+account_resolver = AccountResolver(ttl_seconds=settings.ACCOUNT_RESOLVER_TTL_SECONDS)
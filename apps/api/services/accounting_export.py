@@ -0,0 +1,213 @@
+"""
+Exportación del libro diario en CSV y XLSX por streaming.
+
+GET /journal devuelve todos los asientos con sus partidas y cuentas en una
+sola lista JSON: con un ejercicio completo se corta por timeout. Acá las
+partidas se leen en lotes de ACCOUNTING_EXPORT_BATCH_SIZE filas con
+paginación por keyset (fecha, asiento, partida) y cada lote se escribe y se
+entrega antes de leer el siguiente, así la memoria no depende del rango.
+
+El XLSX se arma sin dependencias: es un ZIP con una sola hoja en la que las
+filas se escriben a medida que llegan (celdas inlineStr, sin sharedStrings)
+y el ZIP se va vaciando hacia la respuesta después de cada lote.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from xml.sax.saxutils import escape
+
+from core.config import settings
+from core.database import prisma
+
+CSV = "csv"
+XLSX = "xlsx"
+
+COLUMNAS = [
+    "Fecha", "Concepto/Asiento", "Referencia", "Código Cuenta", "Nombre Cuenta",
+    "Descripción Movimiento", "Debe", "Haber",
+]
+
+
+async def _lotes(
+    desde: Optional[datetime], hasta: Optional[datetime], cuenta: Optional[str]
+) -> AsyncIterator[list[dict]]:
+    """Partidas del diario en orden cronológico, de a un lote por consulta."""
+    size = max(1, settings.ACCOUNTING_EXPORT_BATCH_SIZE)
+    ultimo = None
+    while True:
+        params: list = []
+
+        def add(value, cast: str = "") -> str:
+            params.append(value)
+            return f"${len(params)}{cast}"
+
+        condiciones = []
+        if desde:
+            condiciones.append(f'j."date" >= {add(desde.isoformat(), "::timestamp")}')
+        if hasta:
+            condiciones.append(f'j."date" <= {add(hasta.isoformat(), "::timestamp")}')
+        if cuenta:
+            condiciones.append(f'a."code" = {add(cuenta)}')
+        if ultimo:
+            condiciones.append(
+                f'(j."date", j."id", COALESCE(le."id", \'\')) > '
+                f'({add(_iso(ultimo["date"]), "::timestamp")}, {add(ultimo["journal_id"])}, {add(ultimo["entry_id"] or "")})'
+            )
+        where = f'WHERE {" AND ".join(condiciones)}' if condiciones else ""
+        filas = await prisma.query_raw(
+            f"""
+            SELECT j."id" AS journal_id, j."date", j."concept", j."reference",
+                   le."id" AS entry_id, le."description", le."debit", le."credit",
+                   a."code" AS account_code, a."name" AS account_name
+            FROM "journal_entries" j
+            LEFT JOIN "ledger_entries" le ON le."journal_id" = j."id"
+            LEFT JOIN "accounts" a ON a."id" = le."account_id"
+            {where}
+            ORDER BY j."date", j."id", COALESCE(le."id", '')
+            LIMIT {add(size)}
+            """,
+            *params,
+        )
+        if filas:
+            yield filas
+        if len(filas) < size:
+            return
+        ultimo = filas[-1]
+
+
+def _iso(value) -> str:
+    return value if isinstance(value, str) else value.isoformat()
+
+
+def _fecha(value) -> str:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value.strftime("%d/%m/%Y")
+
+
+def _importe(value) -> Optional[float]:
+    value = float(value or 0)
+    return value if value > 0 else None
+
+
+def _fila(f: dict) -> list:
+    return [
+        _fecha(f["date"]),
+        f["concept"] or "",
+        f["reference"] or "",
+        f["account_code"] or "",
+        f["account_name"] or "",
+        f["description"] or "",
+        _importe(f["debit"]),
+        _importe(f["credit"]),
+    ]
+
+
+async def diario_csv(
+    desde: Optional[datetime] = None, hasta: Optional[datetime] = None, cuenta: Optional[str] = None
+) -> AsyncIterator[bytes]:
+    """Mismo formato que el CSV del front: ';', coma decimal y BOM para Excel."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";", quoting=csv.QUOTE_ALL, lineterminator="\n")
+    writer.writerow(COLUMNAS)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+    async for lote in _lotes(desde, hasta, cuenta):
+        buffer.seek(0)
+        buffer.truncate()
+        for f in lote:
+            fila = _fila(f)
+            fila[6:] = ["" if v is None else f"{v:.2f}".replace(".", ",") for v in fila[6:]]
+            writer.writerow(fila)
+        yield buffer.getvalue().encode("utf-8")
+
+
+# --- XLSX ---
+
+class _Salida:
+    """Destino del ZIP sin seek: acumula lo escrito hasta que se vacía."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def vaciar(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+_XML_INVALIDO_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+</Types>"""
+
+_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="Libro Diario" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+</Relationships>"""
+
+_HOJA_INICIO = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>"""
+
+_HOJA_FIN = "</sheetData></worksheet>"
+
+
+def _celda(value) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, float):
+        return f"<c><v>{value!r}</v></c>"
+    texto = escape(_XML_INVALIDO_RE.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila_xml(valores: list) -> bytes:
+    return ("<row>" + "".join(_celda(v) for v in valores) + "</row>").encode("utf-8")
+
+
+async def diario_xlsx(
+    desde: Optional[datetime] = None, hasta: Optional[datetime] = None, cuenta: Optional[str] = None
+) -> AsyncIterator[bytes]:
+    salida = _Salida()
+    zf = zipfile.ZipFile(salida, "w", zipfile.ZIP_DEFLATED)
+    zf.writestr("[Content_Types].xml", _CONTENT_TYPES)
+    zf.writestr("_rels/.rels", _RELS)
+    zf.writestr("xl/workbook.xml", _WORKBOOK)
+    zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+
+    with zf.open("xl/worksheets/sheet1.xml", "w") as hoja:
+        hoja.write(_HOJA_INICIO.encode("utf-8"))
+        hoja.write(_fila_xml(COLUMNAS))
+        yield salida.vaciar()
+        async for lote in _lotes(desde, hasta, cuenta):
+            for f in lote:
+                hoja.write(_fila_xml(_fila(f)))
+            yield salida.vaciar()
+        hoja.write(_HOJA_FIN.encode("utf-8"))
+    zf.close()
+    yield salida.vaciar()
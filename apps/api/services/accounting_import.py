@@ -0,0 +1,286 @@
+"""
+Importación masiva de ventas y compras (cierre de mes).
+
+Recibe un archivo CSV o JSON con cientos de comprobantes y:
+1. valida TODO antes de escribir: esquema, reglas ARCA, cuentas contables,
+   empresas y números duplicados (en el archivo y ya cargados), con una
+   consulta por tipo de chequeo y no una por comprobante;
+2. registra los comprobantes válidos en lotes de ACCOUNTING_IMPORT_CHUNK_SIZE,
+   cada lote en UNA transacción con escrituras en bloque (create_many de
+   comprobantes, ítems, asientos y partidas, y un update por cuenta de los
+   totales del mayor);
+3. deja un único INSERT de auditoría con un registro por comprobante.
+
+Si un lote falla, se revierte entero y sus comprobantes se informan con error;
+los demás lotes siguen. El resultado trae el estado de cada comprobante.
+
+Formato CSV (separador , o ;): una fila por ítem. Las filas con el mismo
+número (ventas) o el mismo CUIT + número (compras) son un comprobante y sus
+datos se toman de la primera. Columnas del comprobante con los mismos nombres
+que en POST /ventas o /compras; ítems en item_descripcion, item_cantidad,
+item_precioUnit e item_subtotal. Sin columnas de ítem se genera un ítem único
+por el subtotal. Los importes aceptan coma decimal (1.234,56).
+
+Formato JSON: una lista de comprobantes como los de POST /ventas o /compras
+(o un objeto {"ventas": [...]} / {"compras": [...]}).
+"""
+import asyncio
+import csv
+import io
+import json
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from pydantic import ValidationError
+
+from core.config import settings
+from core.database import prisma
+from schemas.accounting import CreateCompraRequest, CreateVentaRequest
+from services import ledger_service
+from services.accounting_posting import (
+    PostingError, cuentas_compra, cuentas_venta, partidas_compra, partidas_venta, validar_compra
+)
+
+VENTAS = "ventas"
+COMPRAS = "compras"
+
+_MODELOS = {VENTAS: CreateVentaRequest, COMPRAS: CreateCompraRequest}
+_IMPORTES = {"subtotal", "iva", "percepciones", "total", "item_cantidad", "item_precioUnit", "item_subtotal"}
+
+
+class ImportFormatError(ValueError):
+    """El archivo no se puede leer como CSV/JSON de comprobantes."""
+
+
+@dataclass
+class Comprobante:
+    fila: int
+    raw: dict
+    data: Any = None
+    error: Optional[str] = None
+    id: Optional[str] = None
+    entries: list = field(default_factory=list)
+    concepto: str = ""
+
+    @property
+    def numero(self) -> Optional[str]:
+        return getattr(self.data, "numero", None) or self.raw.get("numero")
+
+
+# --- Lectura del archivo ---
+
+def _importe(value: str) -> str:
+    value = value.strip().replace("$", "").replace(" ", "")
+    if "," in value:
+        value = value.replace(".", "").replace(",", ".")
+    return value
+
+
+def _clave_csv(kind: str, row: dict, index: int):
+    numero = (row.get("numero") or "").strip()
+    if not numero:
+        return index  # compras sin número: cada fila es un comprobante
+    return numero if kind == VENTAS else ((row.get("cuit") or "").strip(), numero)
+
+
+def _leer_csv(kind: str, text: str) -> list[dict]:
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;")
+    except csv.Error:
+        dialect = csv.excel
+    documentos: dict[Any, dict] = {}
+    for index, row in enumerate(csv.DictReader(io.StringIO(text), dialect=dialect)):
+        row = {
+            k.strip(): (_importe(v) if k.strip() in _IMPORTES else v.strip())
+            for k, v in row.items() if k and v is not None and v.strip() != ""
+        }
+        if not row:
+            continue
+        item = {k[len("item_"):]: row.pop(k) for k in list(row) if k.startswith("item_")}
+        doc = documentos.setdefault(_clave_csv(kind, row, index), {**row, "items": []})
+        if item:
+            item.setdefault("cantidad", "1")
+            if "subtotal" not in item and "precioUnit" in item:
+                try:
+                    item["subtotal"] = str(float(item["precioUnit"]) * float(item["cantidad"]))
+                except ValueError:
+                    pass  # lo informa la validación del comprobante
+            doc["items"].append(item)
+
+    for doc in documentos.values():
+        if not doc["items"] and doc.get("subtotal"):
+            descripcion = f"Venta {doc.get('numero', '')}" if kind == VENTAS else f"Compra {doc.get('proveedor', '')}"
+            doc["items"] = [{
+                "descripcion": descripcion.strip(),
+                "cantidad": 1,
+                "precioUnit": doc["subtotal"],
+                "subtotal": doc["subtotal"],
+            }]
+    return list(documentos.values())
+
+
+def leer_archivo(kind: str, filename: str, content: bytes) -> list[dict]:
+    """Comprobantes crudos (dicts) del archivo, en el orden en que aparecen."""
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        text = content.decode("latin-1")
+
+    if (filename or "").lower().endswith(".json") or text.lstrip().startswith(("[", "{")):
+        try:
+            payload = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ImportFormatError(f"JSON inválido: {e}")
+        if isinstance(payload, dict):
+            payload = payload.get(kind)
+        if not isinstance(payload, list) or not all(isinstance(d, dict) for d in payload):
+            raise ImportFormatError(f"El JSON debe ser una lista de {kind}")
+        documentos = payload
+    else:
+        documentos = _leer_csv(kind, text)
+
+    if not documentos:
+        raise ImportFormatError("El archivo no contiene comprobantes")
+    if len(documentos) > settings.ACCOUNTING_IMPORT_MAX_DOCUMENTS:
+        raise ImportFormatError(
+            f"El archivo tiene {len(documentos)} comprobantes; el máximo por importación es {settings.ACCOUNTING_IMPORT_MAX_DOCUMENTS}"
+        )
+    return documentos
+
+
+# --- Validación ---
+
+def _motivo_validacion(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors()
+    )
+
+
+async def validar(kind: str, documentos: list[dict]) -> list[Comprobante]:
+    """Valida todos los comprobantes sin escribir (salvo crear una vez las
+    cuentas de retenciones que falten, como el alta individual)."""
+    comprobantes = [Comprobante(fila=i + 1, raw=raw) for i, raw in enumerate(documentos)]
+
+    for c in comprobantes:
+        try:
+            c.data = _MODELOS[kind].model_validate(c.raw)
+            if kind == COMPRAS:
+                validar_compra(c.data)
+        except ValidationError as e:
+            c.error = _motivo_validacion(e)
+        except PostingError as e:
+            c.error = str(e)
+
+    validos = [c for c in comprobantes if not c.error]
+    if kind == VENTAS:
+        await _validar_ventas(validos)
+    else:
+        await _validar_compras(validos)
+
+    # Cuentas y partidas (el plan de cuentas se resuelve en memoria)
+    for c in comprobantes:
+        if c.error:
+            continue
+        try:
+            if kind == VENTAS:
+                c.entries = partidas_venta(c.data, await cuentas_venta(c.data))
+            else:
+                c.entries = partidas_compra(c.data, await cuentas_compra(c.data))
+        except PostingError as e:
+            c.error = str(e)
+    return comprobantes
+
+
+async def _validar_ventas(comprobantes: list[Comprobante]) -> None:
+    if not comprobantes:
+        return
+    numeros = [c.data.numero for c in comprobantes]
+    ventas, empresas = await asyncio.gather(
+        prisma.venta.find_many(where={"numero": {"in": numeros}}),
+        prisma.company.find_many(where={"id": {"in": list({c.data.companyId for c in comprobantes})}}),
+    )
+    existentes = {v.numero for v in ventas}
+    nombres = {e.id: e.nombre for e in empresas}
+
+    vistos = set()
+    for c in comprobantes:
+        if c.data.numero in existentes:
+            c.error = f"La venta {c.data.numero} ya está registrada"
+        elif c.data.numero in vistos:
+            c.error = f"Número {c.data.numero} repetido en el archivo"
+        elif c.data.companyId not in nombres:
+            c.error = f"La empresa {c.data.companyId} no existe"
+        vistos.add(c.data.numero)
+        c.concepto = f"Venta {c.data.numero} - {nombres.get(c.data.companyId, c.data.companyId)}"
+
+
+async def _validar_compras(comprobantes: list[Comprobante]) -> None:
+    numeros = [c.data.numero for c in comprobantes if c.data.numero]
+    existentes = set()
+    if numeros:
+        rows = await prisma.compra.find_many(where={"numero": {"in": numeros}})
+        existentes = {(r.cuit, r.numero) for r in rows}
+
+    vistos = set()
+    for c in comprobantes:
+        c.concepto = f"Compra {c.data.numero} - {c.data.proveedor}"
+        if not c.data.numero:
+            continue
+        clave = (c.data.cuit, c.data.numero)
+        if clave in existentes:
+            c.error = f"La compra {c.data.numero} de {c.data.proveedor} ya está registrada"
+        elif clave in vistos:
+            c.error = f"Compra {c.data.numero} repetida en el archivo"
+        vistos.add(clave)
+
+
+# --- Registro en lotes ---
+
+async def _registrar_lote(kind: str, lote: list[Comprobante]) -> None:
+    for c in lote:
+        c.id = str(uuid.uuid4())
+    journal_ids = [str(uuid.uuid4()) for _ in lote]
+    fk = "ventaId" if kind == VENTAS else "compraId"
+
+    async with prisma.tx() as transaction:
+        modelo = transaction.venta if kind == VENTAS else transaction.compra
+        modelo_items = transaction.ventaitem if kind == VENTAS else transaction.compraitem
+        await modelo.create_many(data=[
+            {"id": c.id, **c.data.model_dump(exclude={"items"}, exclude_none=True)} for c in lote
+        ])
+        await modelo_items.create_many(data=[
+            {fk: c.id, **item.model_dump()} for c in lote for item in c.data.items
+        ])
+        await transaction.journalentry.create_many(data=[
+            {
+                "id": journal_id,
+                "concept": c.concepto,
+                "reference": c.data.numero,
+                "type": "SALES" if kind == VENTAS else "PURCHASES",
+            }
+            for c, journal_id in zip(lote, journal_ids)
+        ])
+        partidas = [
+            {"journalId": journal_id, **entry}
+            for c, journal_id in zip(lote, journal_ids) for entry in c.entries
+        ]
+        await transaction.ledgerentry.create_many(data=partidas)
+        await ledger_service.aplicar_movimientos(transaction, partidas)
+
+
+async def registrar(kind: str, comprobantes: list[Comprobante]) -> list[Comprobante]:
+    """Registra los comprobantes válidos; devuelve los que quedaron creados."""
+    validos = [c for c in comprobantes if not c.error]
+    creados = []
+    size = max(1, settings.ACCOUNTING_IMPORT_CHUNK_SIZE)
+    for start in range(0, len(validos), size):
+        lote = validos[start:start + size]
+        try:
+            await _registrar_lote(kind, lote)
+            creados.extend(lote)
+        except Exception as e:
+            for c in lote:
+                c.id = None
+                c.error = f"No se pudo registrar el lote: {e}"
+    return creados
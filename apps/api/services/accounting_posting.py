@@ -0,0 +1,110 @@
+"""
+Reglas de imputación contable de ventas y compras.
+
+Las usan tanto el alta individual (POST /ventas, POST /compras) como la
+importación masiva (services/accounting_import.py), así un comprobante
+genera el mismo asiento venga por donde venga.
+"""
+from typing import Any, Optional
+
+from services.account_resolver import account_resolver
+
+
+class PostingError(ValueError):
+    """Comprobante que no se puede registrar; el mensaje es para el usuario."""
+
+
+_CUENTAS_RETENCION = {
+    "2.1.08": {"name": "Retenciones IVA a Pagar", "type": "LIABILITY", "parentCode": "2.1", "level": 3},
+    "2.1.09": {"name": "Retenciones Ganancias a Pagar", "type": "LIABILITY", "parentCode": "2.1", "level": 3},
+}
+
+
+def validar_compra(data) -> None:
+    """Validaciones específicas de ARCA 2026"""
+    if data.tipoFactura == "A_CBU":
+        if not data.cbuProveedor or len(data.cbuProveedor) != 22 or not data.cbuProveedor.isdigit():
+            raise PostingError(
+                "Para comprobantes Clase A con Pago en CBU Informada, debe proporcionar una CBU del proveedor válida de 22 dígitos."
+            )
+
+
+async def cuentas_venta(data) -> dict[str, Any]:
+    """Cuentas del asiento de una venta; PostingError si falta alguna."""
+    # Cuenta de contrapartida (Caja o Banco)
+    pago_code = "1.1.01" if data.metodoPago == "EFECTIVO" else "1.1.02"
+    codes = {"ventas": "4.1.01", "iva_df": "2.1.05", "pago": pago_code}
+    cuentas = {key: await account_resolver.get(code) for key, code in codes.items()}
+    missing = [codes[key] for key, account in cuentas.items() if not account]
+    if missing:
+        raise PostingError(
+            f"Faltan cuentas contables configuradas: {', '.join(missing)}. Por favor, ejecute el seed de contabilidad."
+        )
+    return cuentas
+
+
+def partidas_venta(data, cuentas: dict[str, Any]) -> list[dict]:
+    entries = [
+        {"accountId": cuentas["pago"].id, "debit": data.total, "credit": 0, "description": f"Cobro Venta {data.numero}"},
+        {"accountId": cuentas["ventas"].id, "debit": 0, "credit": data.subtotal, "description": f"Venta {data.numero}"},
+        {"accountId": cuentas["iva_df"].id, "debit": 0, "credit": data.iva, "description": f"IVA DF Venta {data.numero}"}
+    ]
+    # Agregar percepciones si existen
+    if data.percepciones > 0:
+        # Usamos una cuenta genérica de pasivo por ahora o ajustamos contra Ventas
+        entries.append({"accountId": cuentas["iva_df"].id, "debit": 0, "credit": data.percepciones, "description": f"Percepciones Venta {data.numero}"})
+    return entries
+
+
+async def cuentas_compra(data) -> dict[str, Optional[Any]]:
+    """Cuentas del asiento de una compra; PostingError si falta alguna."""
+    gasto_code = "5.1.01" # Otros Gastos por defecto
+    if data.categoria == "SERVICIOS": gasto_code = "5.1.02"
+    elif data.categoria == "IMPUESTOS": gasto_code = "5.1.03"
+    elif data.categoria == "SUELDOS": gasto_code = "5.1.04"
+
+    # Si es Factura A Especial con Pago en CBU, forzar cuenta de Banco (1.1.02)
+    pago_code = "1.1.01" if data.metodoPago == "EFECTIVO" else "1.1.02"
+    if data.tipoFactura == "A_CBU":
+        pago_code = "1.1.02"  # Banco obligatorio para CBU
+
+    cuentas = {
+        "iva_cf": await account_resolver.get("1.1.05"), # IVA Crédito Fiscal
+        "gasto": await account_resolver.get(gasto_code),
+        "pago": await account_resolver.get(pago_code),
+        "ret_iva": None,
+        "ret_gan": None,
+    }
+    if not cuentas["gasto"] or not cuentas["pago"]:
+        raise PostingError("Faltan cuentas contables de egresos o caja/banco configuradas.")
+
+    # Si es Factura A con Retención, garantizar existencia de cuentas de retenciones (2.1.08 y 2.1.09)
+    if data.tipoFactura == "A_RETENCION":
+        cuentas["ret_iva"] = await account_resolver.ensure("2.1.08", _CUENTAS_RETENCION["2.1.08"])
+        cuentas["ret_gan"] = await account_resolver.ensure("2.1.09", _CUENTAS_RETENCION["2.1.09"])
+    return cuentas
+
+
+def partidas_compra(data, cuentas: dict[str, Optional[Any]]) -> list[dict]:
+    # Generar asientos contables según regulaciones
+    if data.tipoFactura == "A_RETENCION" and cuentas["ret_iva"] and cuentas["ret_gan"]:
+        # 100% de IVA y 6% de Ganancias sobre subtotal
+        ret_iva_amt = data.iva
+        ret_gan_amt = round(data.subtotal * 0.06, 2)
+        neto_amt = round(data.total - ret_iva_amt - ret_gan_amt, 2)
+
+        entries = [
+            {"accountId": cuentas["gasto"].id, "debit": data.subtotal, "credit": 0, "description": f"Gasto {data.categoria} - {data.proveedor}"},
+            {"accountId": cuentas["pago"].id, "debit": 0, "credit": neto_amt, "description": f"Pago Neto Compra {data.numero} (Retenciones aplicadas)"},
+            {"accountId": cuentas["ret_iva"].id, "debit": 0, "credit": ret_iva_amt, "description": f"Retención IVA 100% - Compra {data.numero}"},
+            {"accountId": cuentas["ret_gan"].id, "debit": 0, "credit": ret_gan_amt, "description": f"Retención Ganancias 6% - Compra {data.numero}"}
+        ]
+    else:
+        entries = [
+            {"accountId": cuentas["gasto"].id, "debit": data.subtotal, "credit": 0, "description": f"Gasto {data.categoria} - {data.proveedor}"},
+            {"accountId": cuentas["pago"].id, "debit": 0, "credit": data.total, "description": f"Pago Compra {data.numero}"}
+        ]
+
+    if data.iva > 0 and cuentas["iva_cf"]:
+        entries.append({"accountId": cuentas["iva_cf"].id, "debit": data.iva, "credit": 0, "description": f"IVA CF Compra {data.numero}"})
+    return entries
@@ -0,0 +1,186 @@
+"""
+Descarga y cache de las imágenes que van en las credenciales (foto del
+alumno, firma del instructor).
+
+create_credencial_pdf hacía requests.get síncronos dentro de una función
+async (bloqueando el event loop) y volvía a bajar la misma firma del
+instructor en cada credencial. Ahora:
+
+- Las descargas usan un httpx.AsyncClient compartido (pool de conexiones).
+- Los bytes quedan en un LRU acotado por tamaño total (ASSET_CACHE_MAX_BYTES)
+  por URL, junto con su ETag. Dentro de ASSET_CACHE_TTL_SECONDS se sirven
+  sin tocar la red; pasado ese tiempo se revalidan con If-None-Match (un 304
+  no vuelve a bajar la imagen).
+- Pedidos simultáneos de la misma URL comparten una sola descarga: un lote
+  de credenciales baja cada firma una vez.
+- Con ASSET_CACHE_DIR se guarda además una copia en disco que sobrevive a
+  reinicios y se usa si el storage no responde.
+
+Se guardan los bytes y no la imagen decodificada: así se pueden pasar tal
+cual al pool de procesos que dibuja los PDFs.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
+
+from core.config import settings
+
+logger = logging.getLogger("vmp-api.assets")
+
+
+class AssetLoader:
+    def __init__(self, max_bytes: int, ttl_seconds: float, disk_dir: str = "", clock=time.monotonic) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self._clock = clock
+        # url -> (etag, expires_at, data)
+        self._entries: "OrderedDict[str, tuple[Optional[str], float, bytes]]" = OrderedDict()
+        self._size = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.disk_hits = 0
+        self.errors = 0
+        self.evictions = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=5.0, follow_redirects=True, limits=httpx.Limits(max_connections=20)
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self, url: Optional[str], label: str = "image") -> Optional[bytes]:
+        """Bytes de la imagen en `url`; None si no hay URL o no se pudo bajar."""
+        if not url:
+            return None
+        entry = self._entries.get(url)
+        if entry is not None and entry[1] > self._clock():
+            self._entries.move_to_end(url)
+            self.hits += 1
+            return entry[2]
+
+        # Una sola descarga por URL aunque la pidan varios renders a la vez
+        pending = self._inflight.get(url)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[url] = future
+        try:
+            data = await self._fetch(url, entry, label)
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            del self._inflight[url]
+        future.set_result(data)
+        return data
+
+    async def _fetch(self, url: str, entry, label: str) -> Optional[bytes]:
+        self.misses += 1
+        if entry is None:
+            entry = self._leer_disco(url)
+        etag, data = (entry[0], entry[2]) if entry else (None, None)
+        try:
+            headers = {"If-None-Match": etag} if etag and data is not None else {}
+            resp = await self._get_client().get(url, headers=headers)
+            if resp.status_code == 304 and data is not None:
+                self.revalidated += 1
+            else:
+                resp.raise_for_status()
+                data, etag = resp.content, resp.headers.get("etag")
+                self._guardar_disco(url, etag, data)
+        except Exception as e:
+            self.errors += 1
+            if data is not None:
+                # Storage caído: mejor la copia anterior que una credencial sin imagen
+                logger.warning(f"Error loading {label}, using cached copy: {e}")
+                return data
+            logger.warning(f"Error loading {label}: {e}")
+            return None
+        self._put(url, etag, data)
+        return data
+
+    def _put(self, url: str, etag: Optional[str], data: bytes) -> None:
+        old = self._entries.pop(url, None)
+        if old is not None:
+            self._size -= len(old[2])
+        if len(data) > self.max_bytes:
+            return
+        self._entries[url] = (etag, self._clock() + self.ttl_seconds, data)
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    # --- Copia en disco (opcional) ---
+
+    def _ruta(self, url: str) -> str:
+        return os.path.join(self.disk_dir, hashlib.sha256(url.encode()).hexdigest())
+
+    def _leer_disco(self, url: str):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._ruta(url) + ".bin", "rb") as f:
+                data = f.read()
+            etag = None
+            if os.path.exists(self._ruta(url) + ".etag"):
+                with open(self._ruta(url) + ".etag", encoding="utf-8") as f:
+                    etag = f.read() or None
+        except OSError:
+            return None
+        self.disk_hits += 1
+        # Vencida a propósito: se revalida contra el storage antes de usarla
+        return (etag, 0.0, data)
+
+    def _guardar_disco(self, url: str, etag: Optional[str], data: bytes) -> None:
+        if not self.disk_dir:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp = self._ruta(url) + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._ruta(url) + ".bin")
+            with open(self._ruta(url) + ".etag", "w", encoding="utf-8") as f:
+                f.write(etag or "")
+        except OSError as e:
+            logger.warning(f"No se pudo guardar en disco la imagen cacheada: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "disk": bool(self.disk_dir),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "disk_hits": self.disk_hits,
+            "errors": self.errors,
+            "evictions": self.evictions,
+        }
+
+
+asset_loader = AssetLoader(
+    max_bytes=settings.ASSET_CACHE_MAX_BYTES,
+    ttl_seconds=settings.ASSET_CACHE_TTL_SECONDS,
+    disk_dir=settings.ASSET_CACHE_DIR,
+)
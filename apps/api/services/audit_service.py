@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from core.database import prisma
 from core.logger import logger
 import json
@@ -57,3 +57,39 @@ async def log_audit_action(
             }
         )
         return False
+
+
+async def log_audit_actions(events: List[dict]) -> bool:
+    """
+    Versión en lote de log_audit_action para operaciones masivas: un único
+    INSERT con un registro por evento. Cada evento es un dict con las claves
+    action, user_id, user_email, details, ip_address y request_id.
+    """
+    if not events:
+        return True
+    try:
+        await prisma.auditlog.create_many(
+            data=[
+                {
+                    "userId": e.get("user_id"),
+                    "userEmail": e.get("user_email"),
+                    "action": e["action"],
+                    "details": e.get("details"),
+                    "ipAddress": e.get("ip_address"),
+                    "requestId": e.get("request_id")
+                }
+                for e in events
+            ]
+        )
+        logger.info(
+            f"AUDIT_LOG [{events[0]['action']}] x{len(events)}: Usuario={events[0].get('user_email') or 'N/A'}, RequestID={events[0].get('request_id') or 'N/A'}",
+            extra={"extra_data": {"actions": len(events), "request_id": events[0].get("request_id")}}
+        )
+        return True
+    except Exception as e:
+        logger.error(
+            f"Fallo crítico al guardar {len(events)} logs de auditoría en lote: {str(e)}",
+            exc_info=e,
+            extra={"extra_data": {"request_id": events[0].get("request_id")}}
+        )
+        return False
@@ -1,5 +1,6 @@
 from io import BytesIO
 from services import storage_service
+from services.credencial_generator import draw_qr
 
 # qrcode/reportlab se importan recién dentro de las funciones que los usan,
 # ver services/credencial_generator.py para el motivo (memoria en el arranque).
@@ -8,27 +9,6 @@ def generate_credencial_number(year: int, sequential: int) -> str:
     """Generate unique credencial number: VMP-2026-00123"""
     return f"VMP-{year}-{sequential:05d}"
 
-def generate_qr_code(data: str) -> BytesIO:
-    """Generate QR code image"""
-    import qrcode
-
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=1,
-    )
-    qr.add_data(data)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    buffer = BytesIO()
-    img.save(buffer, format='PNG')
-    buffer.seek(0)
-    
-    return buffer
-
 def create_credencial_pdf(credencial_data: dict) -> bytes:
     """
     Create Credencial PDF in ID card format (85.60 x 53.98 mm)
@@ -94,8 +74,7 @@ def create_credencial_pdf(credencial_data: dict) -> bytes:
     c.drawString(5*mm, 3*mm, credencial_data['numero_credencial'])
     
     # QR Code (bottom-right)
-    qr_buffer = generate_qr_code(credencial_data['qr_url'])
-    c.drawImage(qr_buffer, 62*mm, 3*mm, 20*mm, 20*mm, mask='auto')
+    draw_qr(c, credencial_data['qr_url'], 62*mm, 3*mm, 20*mm)
     
     c.save()
     buffer.seek(0)
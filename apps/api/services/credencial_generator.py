@@ -1,6 +1,8 @@
+import asyncio
 from datetime import datetime
 from io import BytesIO
 from services import storage_service
+from services.asset_loader import asset_loader
 
 # qrcode/reportlab se importan recién dentro de las funciones que los usan:
 # son librerías pesadas (~50-80MB en memoria) que de otro modo se cargarían
@@ -33,6 +35,49 @@ def generate_qr_code(data: str) -> BytesIO:
     
     return buffer
 
+def qr_matrix(data: str) -> list[list[bool]]:
+    """Módulos del QR (con un módulo de borde)."""
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        border=1,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+def draw_qr(c, data: str, x: float, y: float, size: float) -> None:
+    """
+    Dibuja el QR como rectángulos vectoriales en el canvas de reportlab.
+
+    Antes se generaba un PNG con PIL y se volvía a decodificar con ImageReader
+    en cada credencial; así no hay imagen de por medio y el QR queda nítido a
+    cualquier zoom. Cada tramo horizontal de módulos negros es un solo rect.
+    """
+    matriz = qr_matrix(data)
+    modulo = size / len(matriz)
+
+    c.saveState()
+    c.setFillColorRGB(1, 1, 1)
+    c.rect(x, y, size, size, fill=1, stroke=0)
+    c.setFillColorRGB(0, 0, 0)
+    path = c.beginPath()
+    for i, fila in enumerate(matriz):
+        fila_y = y + size - (i + 1) * modulo
+        j = 0
+        while j < len(fila):
+            if not fila[j]:
+                j += 1
+                continue
+            inicio = j
+            while j < len(fila) and fila[j]:
+                j += 1
+            path.rect(x + inicio * modulo, fila_y, (j - inicio) * modulo, modulo)
+    c.drawPath(path, fill=1, stroke=0)
+    c.restoreState()
+
 async def create_credencial_pdf(credencial_data: dict, foto_url: str = None) -> bytes:
     """
     Create Credencial PDF in ID card format (85.60 x 53.98 mm)
@@ -51,7 +96,23 @@ async def create_credencial_pdf(credencial_data: dict, foto_url: str = None) ->
 
     foto_url: URL pública (S3) de la foto aprobada del alumno, si existe
     """
-    
+    # Descargas async y cacheadas: la firma del instructor se baja una vez
+    foto, firma = await asyncio.gather(
+        asset_loader.get(foto_url, "photo"),
+        asset_loader.get(credencial_data.get('instructor_firma_url'), "instructor signature"),
+    )
+    return render_credencial_pdf(credencial_data, foto, firma)
+
+# Versión del dibujo de la credencial: subirla al cambiar render_credencial_pdf
+# hace que los PDFs se vuelvan a generar (ver services/credential_pdf.py)
+TEMPLATE_VERSION = 2
+
+def render_credencial_pdf(credencial_data: dict, foto: bytes | None = None, firma: bytes | None = None) -> bytes:
+    """
+    Dibuja la credencial con las imágenes ya descargadas (foto del alumno y
+    firma del instructor). Es síncrona y sin I/O para poder correr en un pool
+    de procesos (emisión en lote, services/credential_batch.py).
+    """
     from reportlab.pdfgen import canvas
     from reportlab.lib.units import mm
     from reportlab.lib.utils import ImageReader
@@ -78,12 +139,9 @@ async def create_credencial_pdf(credencial_data: dict, foto_url: str = None) ->
     c.drawString(5*mm, 45*mm, "Credencial Profesional")
     
     # Student photo (if available) - top right
-    if foto_url:
+    if foto:
         try:
-            import requests
-            resp = requests.get(foto_url, timeout=5)
-            resp.raise_for_status()
-            foto_reader = ImageReader(BytesIO(resp.content))
+            foto_reader = ImageReader(BytesIO(foto))
             # Draw photo in top-right corner (20mm x 25mm)
             c.drawImage(foto_reader, 60*mm, 28*mm, 20*mm, 25*mm, mask='auto')
         except Exception as e:
@@ -117,13 +175,9 @@ async def create_credencial_pdf(credencial_data: dict, foto_url: str = None) ->
 
     # Firma del instructor que emite (imagen + nombre), en el espacio libre
     # entre el número de credencial y la fecha de vencimiento.
-    instructor_firma_url = credencial_data.get('instructor_firma_url')
-    if instructor_firma_url:
+    if firma:
         try:
-            import requests
-            resp = requests.get(instructor_firma_url, timeout=5)
-            resp.raise_for_status()
-            firma_reader = ImageReader(BytesIO(resp.content))
+            firma_reader = ImageReader(BytesIO(firma))
             c.drawImage(firma_reader, 5*mm, 6.5*mm, 16*mm, 5*mm, mask='auto')
             c.setFont("Helvetica", 4.5)
             c.drawString(5*mm, 5.5*mm, (credencial_data.get('instructor_nombre') or '')[:28])
@@ -131,9 +185,7 @@ async def create_credencial_pdf(credencial_data: dict, foto_url: str = None) ->
             print(f"Error loading instructor signature: {e}")
 
     # QR Code (bottom-right)
-    qr_buffer = generate_qr_code(credencial_data['qr_url'])
-    qr_image_reader = ImageReader(qr_buffer)
-    c.drawImage(qr_image_reader, 62*mm, 3*mm, 20*mm, 20*mm, mask='auto')
+    draw_qr(c, credencial_data['qr_url'], 62*mm, 3*mm, 20*mm)
     
     c.save()
     buffer.seek(0)
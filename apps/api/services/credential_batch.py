@@ -0,0 +1,246 @@
+"""
+Emisión de credenciales en lote para un curso (opcionalmente de una empresa).
+
+Emitir una cohorte de 120 choferes eran 120 llamadas a /generar-manual, cada
+una con sus consultas, la descarga de foto y firma, el PDF con reportlab y la
+subida a S3 en serie. El lote:
+
+1. trae en pocas consultas los inscriptos que completaron o aprobaron el
+   curso, las credenciales que ya tienen (se omiten), sus fotos aprobadas y
+   los datos del emisor;
+2. descarga la firma del emisor una sola vez (services/asset_loader.py);
+3. por alumno descarga la foto, dibuja el PDF en un pool de
+   PROCESOS (CREDENTIAL_BATCH_PROCESSES; cada proceso carga reportlab, ojo
+   con la memoria del plan) y lo sube a S3 (thread) bajo su clave de
+   contenido (services/credential_pdf.py), con hasta
+   CREDENTIAL_BATCH_UPLOAD_CONCURRENCY alumnos en vuelo a la vez.
+
+El job vive en credential_batch_jobs: el avance (procesadas, emitidas,
+omitidas, fallidas) se guarda a medida que se emite y se consulta con
+GET /credenciales/lotes/{id}. Un alumno que falla no corta el lote; un lote
+que no avanza en CREDENTIAL_BATCH_TIMEOUT_SECONDS se marca FAILED y se puede
+relanzar (las ya emitidas se omiten).
+"""
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from prisma import Json
+
+from core.config import settings
+from core.database import prisma
+from services import credential_pdf, metric_rollups, offline_manifest, storage_service
+from services.asset_loader import asset_loader
+from services.credencial_generator import render_credencial_pdf
+from services.credential_numbering import credential_numbers
+from services.credential_service import (
+    calcular_vencimiento, datos_instructor, datos_pdf, datos_registro, url_validacion
+)
+from services.credential_validator import credential_validator
+from services.webhook_service import emit, WebhookEvent
+
+logger = logging.getLogger("vmp-api.credentials")
+
+PENDING = "PENDING"
+PROCESSING = "PROCESSING"
+DONE = "DONE"
+FAILED = "FAILED"
+
+# Inscripciones que habilitan la credencial
+ESTADOS_HABILITANTES = ["COMPLETADO", "APROBADO"]
+
+# Cada cuántos alumnos se persiste el avance del job
+_AVANCE_CADA = 10
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_running: set[asyncio.Task] = set()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=settings.CREDENTIAL_BATCH_PROCESSES)
+    return _process_pool
+
+
+def shutdown() -> None:
+    """Cierra el pool de procesos (shutdown de la app)."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+    _process_pool = None
+
+
+async def submit(curso_id: str, empresa_id: Optional[str], emisor) -> Any:
+    """Crea el job del lote y lo procesa en background."""
+    job = await prisma.credentialbatchjob.create(
+        data={"cursoId": curso_id, "empresaId": empresa_id, "status": PENDING, "createdById": emisor.id}
+    )
+    task = asyncio.create_task(_procesar(job.id, curso_id, empresa_id, emisor))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return job
+
+
+async def _inscriptos(curso_id: str, empresa_id: Optional[str]) -> list:
+    where: dict = {"cursoId": curso_id, "estado": {"in": ESTADOS_HABILITANTES}}
+    if empresa_id:
+        where["alumno"] = {"is": {"empresaId": empresa_id}}
+    inscripciones = await prisma.inscripcion.find_many(
+        where=where, include={"alumno": {"include": {"empresa": True}}}
+    )
+    return [i.alumno for i in inscripciones]
+
+
+class _Avance:
+    """Contadores del job; se guardan cada _AVANCE_CADA alumnos."""
+
+    def __init__(self, job_id: str) -> None:
+        self.job_id = job_id
+        self.procesadas = self.emitidas = self.omitidas = self.fallidas = 0
+        self.resultados: list[dict] = []
+
+    def data(self) -> dict:
+        return {
+            "procesadas": self.procesadas,
+            "emitidas": self.emitidas,
+            "omitidas": self.omitidas,
+            "fallidas": self.fallidas,
+        }
+
+    async def registrar(self, resultado: dict) -> None:
+        self.resultados.append(resultado)
+        self.procesadas += 1
+        if resultado["estado"] == "EMITIDA":
+            self.emitidas += 1
+        elif resultado["estado"] == "OMITIDA":
+            self.omitidas += 1
+        else:
+            self.fallidas += 1
+        if self.procesadas % _AVANCE_CADA == 0:
+            await prisma.credentialbatchjob.update(where={"id": self.job_id}, data=self.data())
+
+
+async def _procesar(job_id: str, curso_id: str, empresa_id: Optional[str], emisor) -> None:
+    try:
+        curso = await prisma.curso.find_unique(where={"id": curso_id})
+        if not curso:
+            raise ValueError("Curso no encontrado")
+
+        # 1. Todo lo necesario en pocas consultas
+        alumnos = await _inscriptos(curso_id, empresa_id)
+        alumno_ids = [a.id for a in alumnos]
+        existentes, fotos, instructor = await asyncio.gather(
+            prisma.credencial.find_many(where={"cursoId": curso_id, "alumnoId": {"in": alumno_ids}}),
+            prisma.fotocredencial.find_many(where={"alumnoId": {"in": alumno_ids}, "estado": "APROBADA"}),
+            datos_instructor(emisor.id),
+        )
+        ya_emitidas = {c.alumnoId: c for c in existentes}
+        foto_por_alumno = {f.alumnoId: f.fotoUrl for f in fotos if f.fotoUrl}
+
+        await prisma.credentialbatchjob.update(
+            where={"id": job_id}, data={"status": PROCESSING, "total": len(alumnos)}
+        )
+        avance = _Avance(job_id)
+
+        loop = asyncio.get_running_loop()
+        # Alumnos en vuelo a la vez: acota descargas, subidas y PDFs en memoria
+        en_vuelo = asyncio.Semaphore(max(1, settings.CREDENTIAL_BATCH_UPLOAD_CONCURRENCY))
+        firma = await asset_loader.get(instructor["instructor_firma_url"], "instructor signature")
+
+        async def emitir(alumno) -> None:
+            previa = ya_emitidas.get(alumno.id)
+            if previa is not None:
+                await avance.registrar({"alumnoId": alumno.id, "numero": previa.numero, "estado": "OMITIDA"})
+                return
+            try:
+                async with en_vuelo:
+                    resultado = await emitir_uno(alumno)
+            except Exception as e:
+                logger.exception(f"Falló la credencial del alumno {alumno.id} (lote {job_id})")
+                resultado = {"alumnoId": alumno.id, "estado": "ERROR", "error": str(e)}
+            await avance.registrar(resultado)
+
+        async def emitir_uno(alumno) -> dict:
+            foto = await asset_loader.get(foto_por_alumno.get(alumno.id), "photo")
+            numero = await credential_numbers.numero(datetime.now().year)
+            ahora = datetime.now()
+            vencimiento = calcular_vencimiento(curso, ahora)
+            qr_url = url_validacion(numero)
+            pdf_data = datos_pdf(numero, alumno, curso, ahora, vencimiento, qr_url, instructor)
+            clave = credential_pdf.clave_render(pdf_data, foto, firma)
+
+            # CPU en el pool de procesos; la subida (boto3, bloqueante) en un thread
+            pdf_bytes = await loop.run_in_executor(
+                _get_process_pool(), render_credencial_pdf, pdf_data, foto, firma
+            )
+            pdf_url = await asyncio.to_thread(
+                storage_service.upload_bytes, pdf_bytes, credential_pdf.storage_key(clave), "application/pdf"
+            )
+            credencial = await prisma.credencial.create(data={
+                **datos_registro(numero, alumno, curso_id, pdf_url, qr_url, ahora, vencimiento),
+                "pdfDatos": Json(credential_pdf.receta(pdf_data, foto_por_alumno.get(alumno.id))),
+                "pdfHash": clave,
+            })
+            credential_validator.invalidate(credencial.numero)
+            await offline_manifest.registrar(credencial.numero, offline_manifest.ALTA)
+            await metric_rollups.record(metric_rollups.CREDENTIALS, credencial.fechaEmision)
+            await emit(WebhookEvent.CREDENTIAL_ISSUED, {
+                "credencial_id":     credencial.id,
+                "credencial_numero": credencial.numero,
+                "pdf_url":           pdf_url,
+                "alumno_id":         alumno.id,
+                "alumno_nombre":     f"{alumno.nombre} {alumno.apellido}",
+                "alumno_email":      alumno.email,
+                "alumno_telefono":   alumno.telefono,
+                "empresa_nombre":    alumno.empresa.nombre if alumno.empresa else None,
+                "curso_id":          curso_id,
+                "emitida_por":       emisor.email,
+            })
+            return {"alumnoId": alumno.id, "numero": numero, "estado": "EMITIDA", "pdfUrl": pdf_url}
+
+        await asyncio.gather(*(emitir(a) for a in alumnos))
+
+        await prisma.credentialbatchjob.update(
+            where={"id": job_id},
+            data={**avance.data(), "status": DONE, "resultados": Json(avance.resultados)},
+        )
+    except Exception as e:
+        logger.exception(f"Falló el lote de credenciales {job_id}")
+        try:
+            await prisma.credentialbatchjob.update(
+                where={"id": job_id}, data={"status": FAILED, "error": f"Error al emitir el lote: {e}"}
+            )
+        except Exception:
+            logger.exception(f"No se pudo marcar como fallido el lote {job_id}")
+
+
+async def get(job_id: str) -> Optional[Any]:
+    """El job; si dejó de avanzar (p. ej. se reinició el worker) queda FAILED."""
+    job = await prisma.credentialbatchjob.find_unique(where={"id": job_id})
+    limite = timedelta(seconds=settings.CREDENTIAL_BATCH_TIMEOUT_SECONDS)
+    if job is not None and job.status in (PENDING, PROCESSING) and datetime.utcnow() - job.updatedAt.replace(tzinfo=None) > limite:
+        job = await prisma.credentialbatchjob.update(
+            where={"id": job_id},
+            data={"status": FAILED, "error": "El lote dejó de avanzar. Vuelva a lanzarlo: se omiten las credenciales ya emitidas."},
+        )
+    return job
+
+
+def serializar(job) -> dict:
+    return {
+        "jobId": job.id,
+        "status": job.status,
+        "cursoId": job.cursoId,
+        "empresaId": job.empresaId,
+        "total": job.total,
+        "procesadas": job.procesadas,
+        "emitidas": job.emitidas,
+        "omitidas": job.omitidas,
+        "fallidas": job.fallidas,
+        "resultados": job.resultados,
+        "error": job.error,
+        "createdAt": job.createdAt,
+    }
@@ -0,0 +1,114 @@
+"""
+Numeración de credenciales VMP-YYYY-NNNNN con una secuencia atómica por año.
+
+Antes el número salía de leer la última credencial y sumar uno (o de
+count()+1): dos emisiones simultáneas leían lo mismo y chocaban contra el
+índice único de `numero`. Ahora cada año tiene una fila en
+credential_sequences y el número se reserva con un único
+UPDATE ... RETURNING, que la base serializa por fila sin leer credenciales.
+
+La primera reserva de un año crea su fila partiendo del mayor número ya
+emitido ese año, así no se repiten números si hubo emisiones previas.
+
+Con CREDENTIAL_NUMBER_BLOCK_SIZE > 1 cada worker reserva un bloque de números
+de una vez y los entrega desde memoria: menos escrituras en la fila
+compartida a cambio de huecos en la numeración si el worker se reinicia con
+números sin usar. Con 1 (por defecto) la numeración es correlativa.
+
+numero_canonico() es la clave con la que se busca una credencial
+(columna numero_canonico): el mismo número escrito de distintas formas da
+la misma clave.
+"""
+import asyncio
+import re
+
+from core.config import settings
+from core.database import prisma
+from services.credencial_generator import generate_credencial_number
+
+_VMP = re.compile(r"^VMP[-/]?([0-9]{4})[-/]?([0-9]+)$")
+_LEGACY = re.compile(r"^(?:BLT-?RT[-/]?)?([0-9]+)$")
+# Los códigos BLT-RT (y los códigos sueltos) son la serie VMP-2026
+_LEGACY_YEAR = 2026
+
+
+def numero_canonico(numero: str) -> str:
+    """
+    Clave de búsqueda de un número de credencial: VMP-2026-1294,
+    vmp 2026 01294, BLT-RT/1294 y 1294 dan todos VMP-2026-01294. Otros
+    formatos quedan en mayúsculas y sin espacios. Tiene que coincidir con la
+    carga inicial de database/migrations/add_credencial_numero_canonico.sql.
+    """
+    num = re.sub(r"\s", "", numero).upper()
+    match = _VMP.match(num)
+    if match:
+        return generate_credencial_number(int(match[1]), int(match[2]))
+    match = _LEGACY.match(num)
+    if match:
+        return generate_credencial_number(_LEGACY_YEAR, int(match[1]))
+    return num
+
+
+async def _reservar(year: int, cantidad: int) -> int:
+    """Suma `cantidad` a la secuencia del año y devuelve el último número reservado."""
+    rows = await prisma.query_raw(
+        """
+        UPDATE "credential_sequences" SET "last_value" = "last_value" + $2
+        WHERE "year" = $1
+        RETURNING "last_value"
+        """,
+        year, cantidad,
+    )
+    if rows:
+        return int(rows[0]["last_value"])
+
+    # Primera reserva del año: se parte del mayor número ya emitido. Si otro
+    # worker crea la fila a la vez, ON CONFLICT suma sobre la suya.
+    rows = await prisma.query_raw(
+        """
+        INSERT INTO "credential_sequences" ("year", "last_value")
+        SELECT $1, COALESCE(MAX(CAST(SUBSTRING("numero" FROM '^VMP-[0-9]{4}-([0-9]+)$') AS INTEGER)), 0) + $2
+        FROM "credenciales"
+        WHERE "numero" LIKE 'VMP-' || $1::text || '-%'
+        ON CONFLICT ("year") DO UPDATE
+        SET "last_value" = "credential_sequences"."last_value" + $2
+        RETURNING "last_value"
+        """,
+        year, cantidad,
+    )
+    return int(rows[0]["last_value"])
+
+
+class CredentialNumberAllocator:
+    def __init__(self, block_size: int = 1) -> None:
+        self.block_size = max(1, block_size)
+        # year -> (próximo número, último número del bloque reservado)
+        self._bloques: dict[int, tuple[int, int]] = {}
+        self._lock = asyncio.Lock()
+        self.reservas = 0
+
+    async def siguiente(self, year: int) -> int:
+        async with self._lock:
+            proximo, ultimo = self._bloques.get(year, (1, 0))
+            if proximo > ultimo:
+                ultimo = await _reservar(year, self.block_size)
+                proximo = ultimo - self.block_size + 1
+                self.reservas += 1
+            self._bloques[year] = (proximo + 1, ultimo)
+            return proximo
+
+    async def numero(self, year: int) -> str:
+        """Próximo número de credencial del año, ej. VMP-2026-00123."""
+        return generate_credencial_number(year, await self.siguiente(year))
+
+    def stats(self) -> dict:
+        return {
+            "block_size": self.block_size,
+            "reservas": self.reservas,
+            "disponibles": {
+                year: ultimo - proximo + 1 for year, (proximo, ultimo) in self._bloques.items()
+            },
+        }
+
+
+credential_numbers = CredentialNumberAllocator(block_size=settings.CREDENTIAL_NUMBER_BLOCK_SIZE)
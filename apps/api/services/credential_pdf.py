@@ -0,0 +1,118 @@
+"""
+PDFs de credenciales direccionados por contenido, redibujados solo si cambian.
+
+Antes cada emisión dibujaba y subía el PDF en el momento y
+/credenciales/regenerar lo volvía a dibujar aunque nada hubiera cambiado.
+Ahora:
+
+- La clave de un PDF es el hash de todo lo que entra en el dibujo: los datos
+  de la credencial, el contenido de la foto y de la firma (que el
+  asset_loader ya tiene cacheados y revalidados por ETag) y TEMPLATE_VERSION.
+  El objeto se sube a credenciales-pdf/{clave}.pdf.
+- Al emitir se dibuja y sube el PDF (dibujar()) antes de crear la fila, así
+  la URL que se devuelve y que va en el webhook ya existe; si el storage no
+  está configurado la emisión falla. Se guarda la receta del dibujo
+  (pdfDatos) y pdfHash, la clave que ya está subida.
+- asegurar() dibuja solo si la clave actual no es la subida. Lo usan la
+  descarga (GET /credenciales/{id}/pdf), /regenerar y
+  scripts/render_credential_pdfs.py. Subir TEMPLATE_VERSION vuelve a dibujar
+  todas; cambiar una foto, solo esa.
+
+Las credenciales anteriores (sin pdfDatos) conservan su PDF tal cual.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Optional
+
+from core.database import prisma
+from services import storage_service
+from services.asset_loader import asset_loader
+from services.credencial_generator import TEMPLATE_VERSION, render_credencial_pdf
+
+logger = logging.getLogger("vmp-api.credentials")
+
+_inflight: dict[str, asyncio.Future] = {}
+
+
+def receta(pdf_data: dict, foto_url: Optional[str]) -> dict:
+    """Lo que se guarda en pdfDatos: con esto se puede volver a dibujar el PDF."""
+    return {"datos": pdf_data, "fotoUrl": foto_url}
+
+
+def clave_render(pdf_data: dict, foto: Optional[bytes], firma: Optional[bytes]) -> str:
+    h = hashlib.sha256(f"plantilla:{TEMPLATE_VERSION}\n".encode())
+    h.update(json.dumps(pdf_data, sort_keys=True, default=str).encode())
+    for imagen in (foto, firma):
+        h.update(b"\n" + (hashlib.sha256(imagen).digest() if imagen else b"-"))
+    return h.hexdigest()
+
+
+def storage_key(clave: str) -> str:
+    return f"credenciales-pdf/{clave}.pdf"
+
+
+async def _imagenes(r: dict) -> tuple[Optional[bytes], Optional[bytes]]:
+    foto, firma = await asyncio.gather(
+        asset_loader.get(r.get("fotoUrl"), "photo"),
+        asset_loader.get(r["datos"].get("instructor_firma_url"), "instructor signature"),
+    )
+    return foto, firma
+
+
+async def _subir(pdf_data: dict, foto: Optional[bytes], firma: Optional[bytes], clave: str) -> str:
+    pdf_bytes = await asyncio.to_thread(render_credencial_pdf, pdf_data, foto, firma)
+    return await asyncio.to_thread(
+        storage_service.upload_bytes, pdf_bytes, storage_key(clave), "application/pdf"
+    )
+
+
+async def dibujar(pdf_data: dict, foto_url: Optional[str]) -> tuple[dict, str, str]:
+    """Dibuja y sube el PDF de una credencial nueva: (receta, url, clave)."""
+    r = receta(pdf_data, foto_url)
+    foto, firma = await _imagenes(r)
+    clave = clave_render(pdf_data, foto, firma)
+    return r, await _subir(pdf_data, foto, firma, clave), clave
+
+
+async def asegurar(credencial) -> tuple[str, bool]:
+    """URL del PDF vigente de la credencial y si hubo que dibujarlo."""
+    if not credencial.pdfDatos:
+        return credencial.pdfUrl, False
+    # Una descarga y el script de render de la misma credencial dibujan una sola vez
+    pending = _inflight.get(credencial.id)
+    if pending is not None:
+        return await asyncio.shield(pending)
+    future = asyncio.get_running_loop().create_future()
+    _inflight[credencial.id] = future
+    try:
+        resultado = await _asegurar(credencial)
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()
+        raise
+    except BaseException:
+        future.cancel()
+        raise
+    finally:
+        del _inflight[credencial.id]
+    future.set_result(resultado)
+    return resultado
+
+
+async def _asegurar(credencial) -> tuple[str, bool]:
+    r = credencial.pdfDatos
+    foto, firma = await _imagenes(r)
+    clave = clave_render(r["datos"], foto, firma)
+    if clave == credencial.pdfHash:
+        return credencial.pdfUrl, False
+    faltan = (r.get("fotoUrl") and foto is None) or (r["datos"].get("instructor_firma_url") and firma is None)
+    if faltan and credencial.pdfHash:
+        # Storage sin responder: mejor el PDF ya subido que uno sin foto o firma
+        logger.warning(f"Imágenes no disponibles, se conserva el PDF de {credencial.numero}")
+        return credencial.pdfUrl, False
+    pdf_url = await _subir(r["datos"], foto, firma, clave)
+    await prisma.credencial.update(where={"id": credencial.id}, data={"pdfUrl": pdf_url, "pdfHash": clave})
+    return pdf_url, True
+
@@ -8,13 +8,13 @@ import hashlib
 import json
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
+from prisma import Json
 from core.database import prisma
+from services import credential_pdf, metric_rollups
 from core.config import settings
-from services.credencial_generator import (
-    generate_credencial_number,
-    create_credencial_pdf,
-    save_credencial_pdf
-)
+from services.credential_numbering import credential_numbers, numero_canonico
+from services.credential_validator import credential_validator
+from services import offline_manifest
 
 
 def calculate_credential_signature(numero: str, alumno_id: str, curso_id: str, fecha_emision_str: str) -> str:
@@ -75,9 +75,69 @@ async def generate_credential_for_student(
             }
         # force=True: reemplazar la credencial anterior en vez de duplicarla
         await prisma.credencial.delete(where={"id": existing.id})
+        credential_validator.invalidate(existing.numero)
+        await offline_manifest.registrar(existing.numero, offline_manifest.BAJA)
     
-    # Buscar foto aprobada del alumno (su URL pública real en el storage S3)
-    foto_url = None
+    # Foto aprobada del alumno (su URL pública real en el storage S3)
+    foto_url = await foto_aprobada(alumno_id)
+    
+    # Generar número de credencial único (secuencia atómica por año)
+    numero_credencial = await credential_numbers.numero(datetime.now().year)
+    
+    ahora = datetime.now()
+    fecha_vencimiento = calcular_vencimiento(curso, ahora)
+    qr_url = url_validacion(numero_credencial)
+    instructor = await datos_instructor(emisor_id)
+    pdf_data = datos_pdf(numero_credencial, alumno, curso, ahora, fecha_vencimiento, qr_url, instructor)
+    
+    # Dibujar y subir el PDF (bajo su clave de contenido) antes de crear el registro
+    receta, pdf_url, clave = await credential_pdf.dibujar(pdf_data, foto_url)
+
+    # Crear registro en BD
+    credencial = await prisma.credencial.create(data={
+        **datos_registro(numero_credencial, alumno, curso_id, pdf_url, qr_url, ahora, fecha_vencimiento),
+        "pdfDatos": Json(receta),
+        "pdfHash": clave,
+    })
+    credential_validator.invalidate(credencial.numero)
+    await offline_manifest.registrar(credencial.numero, offline_manifest.ALTA)
+    await metric_rollups.record(metric_rollups.CREDENTIALS, credencial.fechaEmision)
+    
+    return {
+        "credencial": credencial,
+        "pdfUrl": pdf_url,
+        "already_existed": False
+    }
+
+
+async def regenerar_pdf(credencial, emisor_id: str | None) -> tuple[str, bool]:
+    """
+    Vuelve a armar el PDF de una credencial existente con los datos actuales
+    del alumno, el curso, la foto y el emisor (mismo número y fechas). Si no
+    cambió nada se reutiliza el PDF ya subido. Devuelve (url, si se dibujó).
+    """
+    alumno = await prisma.user.find_unique(where={"id": credencial.alumnoId}, include={"empresa": True})
+    curso = await prisma.curso.find_unique(where={"id": credencial.cursoId})
+    if not alumno or not curso:
+        raise ValueError("Alumno o curso no encontrado")
+    instructor = await datos_instructor(emisor_id)
+    pdf_data = datos_pdf(
+        credencial.numero, alumno, curso, credencial.fechaEmision, credencial.fechaVencimiento,
+        url_validacion(credencial.numero), instructor
+    )
+    receta = credential_pdf.receta(pdf_data, await foto_aprobada(alumno.id))
+    if receta != credencial.pdfDatos:
+        credencial = await prisma.credencial.update(where={"id": credencial.id}, data={"pdfDatos": Json(receta)})
+        # Si cambió el DNI o el curso, los escáneres offline lo reciben en el próximo delta
+        credential_validator.invalidate(credencial.numero)
+        await offline_manifest.registrar(credencial.numero, offline_manifest.ALTA)
+    return await credential_pdf.asegurar(credencial)
+
+
+# --- Piezas compartidas con la emisión en lote (services/credential_batch.py) ---
+
+async def foto_aprobada(alumno_id: str) -> str | None:
+    """URL pública (S3) de la foto aprobada del alumno, si tiene."""
     try:
         foto_credencial = await prisma.fotocredencial.find_first(
             where={
@@ -86,104 +146,80 @@ async def generate_credential_for_student(
             }
         )
         if foto_credencial and foto_credencial.fotoUrl:
-            foto_url = foto_credencial.fotoUrl
+            return foto_credencial.fotoUrl
     except Exception as e:
         print(f"Error buscando foto para credencial: {e}")
-        pass  # Si no hay foto, continuar sin ella
-    
-    # Generar número de credencial único
-    year = datetime.now().year
-    last_cred = await prisma.credencial.find_first(
-        order={"createdAt": "desc"}
-    )
-    seq = 1
-    if last_cred:
-        try:
-            seq = int(last_cred.numero.split("-")[-1]) + 1
-        except:
-            seq = await prisma.credencial.count() + 1
-    numero_credencial = generate_credencial_number(year, seq)
-    
-    # Calcular fecha de vencimiento
-    fecha_vencimiento = None
+    return None  # Si no hay foto, continuar sin ella
+
+
+def calcular_vencimiento(curso, ahora: datetime) -> datetime:
     if curso.vigenciaMeses:
-        fecha_vencimiento = datetime.now() + relativedelta(months=curso.vigenciaMeses)
-    else:
-        fecha_vencimiento = datetime.now() + relativedelta(years=2)  # Default: 2 años
-    
-    # Construir URL de verificación pública
+        return ahora + relativedelta(months=curso.vigenciaMeses)
+    return ahora + relativedelta(years=2)  # Default: 2 años
+
+
+def url_validacion(numero: str) -> str:
+    """URL de verificación pública que va en el QR."""
     frontend_url = os.getenv("ADMIN_URL", settings.FRONTEND_URL)
-    qr_url = f"{frontend_url}/validar/{numero_credencial}"
-    
-    # Obtener datos del instructor / emisor
-    instructor_nombre = "Pedro Orejas"
-    instructor_info = "Instructor VMP | Mat. N° 2206823"
-    instructor_id = emisor_id
-    instructor_firma_url = None
+    return f"{frontend_url}/validar/{numero}"
 
+
+async def datos_instructor(emisor_id: str | None) -> dict:
+    """Nombre, matrícula y firma del instructor / emisor."""
+    instructor = {
+        "instructor_nombre": "Pedro Orejas",
+        "instructor_info": "Instructor VMP | Mat. N° 2206823",
+        "instructor_id": emisor_id,
+        "instructor_firma_url": None,
+    }
     if emisor_id:
         try:
-            instructor = await prisma.user.find_unique(where={"id": emisor_id})
-            if instructor:
-                instructor_nombre = f"{instructor.nombre} {instructor.apellido}"
-                instructor_info = f"Instructor VMP | Mat. N° {instructor.dni or '2206823'}"
-                instructor_firma_url = instructor.firmaUrl
+            emisor = await prisma.user.find_unique(where={"id": emisor_id})
+            if emisor:
+                instructor["instructor_nombre"] = f"{emisor.nombre} {emisor.apellido}"
+                instructor["instructor_info"] = f"Instructor VMP | Mat. N° {emisor.dni or '2206823'}"
+                instructor["instructor_firma_url"] = emisor.firmaUrl
         except Exception as ex:
             print(f"Error fetching instructor: {ex}")
-            pass
+    return instructor
+
 
-    # Preparar datos del PDF
-    pdf_data = {
-        "numero_credencial": numero_credencial,
+def datos_pdf(numero: str, alumno, curso, ahora: datetime, fecha_vencimiento, qr_url: str, instructor: dict) -> dict:
+    return {
+        "numero_credencial": numero,
         "alumno_nombre": f"{alumno.nombre} {alumno.apellido}",
         "dni": alumno.dni,
         "curso_nombre": curso.nombre,
         "curso_codigo": curso.codigo,
-        "fecha_emision": datetime.now().strftime("%d/%m/%Y"),
+        "fecha_emision": ahora.strftime("%d/%m/%Y"),
         "fecha_vencimiento": fecha_vencimiento.strftime("%d/%m/%Y") if fecha_vencimiento else None,
         "puesto": alumno.puesto,
         "qr_url": qr_url,
-        "instructor_nombre": instructor_nombre,
-        "instructor_info": instructor_info,
-        "instructor_id": instructor_id,
-        "instructor_firma_url": instructor_firma_url,
+        **instructor,
         "empresa_nombre": alumno.empresa.nombre if alumno.empresa else "VMP - EDTECH"
     }
-    
-    # Generar PDF
-    pdf_bytes = await create_credencial_pdf(pdf_data, foto_url)
-    filename = f"{numero_credencial}.pdf"
-    pdf_url = await save_credencial_pdf(pdf_bytes, filename)
-    
-    # Calcular firma criptográfica
-    fecha_emision_now = datetime.now()
-    fecha_emision_str = fecha_emision_now.strftime("%Y-%m-%d")
-    firma = calculate_credential_signature(numero_credencial, alumno_id, curso_id, fecha_emision_str)
+
+
+def datos_registro(numero: str, alumno, curso_id: str, pdf_url: str, qr_url: str, ahora: datetime, fecha_vencimiento) -> dict:
+    """Fila de credenciales con su firma criptográfica."""
+    fecha_emision_str = ahora.strftime("%Y-%m-%d")
+    firma = calculate_credential_signature(numero, alumno.id, curso_id, fecha_emision_str)
     metadata = json.dumps({
-        "numero": numero_credencial,
-        "alumnoId": alumno_id,
+        "numero": numero,
+        "alumnoId": alumno.id,
         "cursoId": curso_id,
         "fechaEmision": fecha_emision_str
     })
-
-    # Crear registro en BD
-    credencial = await prisma.credencial.create(
-        data={
-            "numero": numero_credencial,
-            "alumnoId": alumno_id,
-            "cursoId": curso_id,
-            "pdfUrl": pdf_url,
-            "qrCodeUrl": qr_url,
-            "fechaEmision": fecha_emision_now,
-            "fechaVencimiento": fecha_vencimiento,
-            "puesto": alumno.puesto,
-            "firmaCriptografica": firma,
-            "metadataFirmada": metadata
-        }
-    )
-    
     return {
-        "credencial": credencial,
+        "numero": numero,
+        "numeroCanonico": numero_canonico(numero),
+        "alumnoId": alumno.id,
+        "cursoId": curso_id,
         "pdfUrl": pdf_url,
-        "already_existed": False
+        "qrCodeUrl": qr_url,
+        "fechaEmision": ahora,
+        "fechaVencimiento": fecha_vencimiento,
+        "puesto": alumno.puesto,
+        "firmaCriptografica": firma,
+        "metadataFirmada": metadata
     }
@@ -1,43 +1,125 @@
 """
 Servicio para validar credenciales públicamente.
+
+GET /public/validar/{numero} lo disparan los escaneos de QR en los controles,
+y es común que varios inspectores escaneen la misma credencial con segundos
+de diferencia. Cada validación es un find_first (por igualdad sobre
+numero_canonico, así no importa cómo se tipeó el número) con include de
+alumno, empresa y curso. Además:
+
+- Los resultados quedan en un LRU + TTL por worker, por número canónico,
+  también los "no encontrada" (con un TTL más corto, para que una
+  credencial recién emitida desde otro worker aparezca pronto).
+- Consultas simultáneas del mismo número comparten una sola ida a la base.
+- Una credencial válida no se cachea más allá de su vencimiento.
+- Emitir, regenerar o eliminar una credencial llama a invalidate(numero).
+
+El router usa el ETag y el TTL de cada resultado para responder con ETag /
+Cache-Control y que los proxies absorban los escaneos repetidos.
 """
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any
+from core.config import settings
 from core.database import prisma
+from services.credential_numbering import numero_canonico
+
+
+def vencimiento_utc(credencial) -> Optional[datetime]:
+    """Vencimiento de la credencial con zona horaria (None si no vence)."""
+    fecha = credencial.fechaVencimiento
+    if fecha is None:
+        return None
+    return fecha if fecha.tzinfo else fecha.replace(tzinfo=timezone.utc)
+
+
+@dataclass
+class Validacion:
+    result: Dict[str, Any]
+    etag: str
+    max_age: int
 
 
 class CredentialValidator:
     """Validador de credenciales públicas"""
-    
+
+    def __init__(self, max_entries: int, ttl_seconds: float, negative_ttl_seconds: float, clock=time.monotonic) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._clock = clock
+        # número canónico -> (expires_at, validación)
+        self._entries: "OrderedDict[str, tuple[float, Validacion]]" = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
     async def validate_credential(self, numero: str) -> Dict[str, Any]:
         """
         Valida una credencial por su número único.
-        
+
         Args:
             numero: Número de credencial (ej: VMP-2026-00001)
-            
+
         Returns:
             Dict con información pública de la credencial
         """
-        # Normalizar término de búsqueda
-        clean_num = numero.strip().upper()
-        raw_code = clean_num.replace('BLT-RT/', '').replace('BLT-RT-', '').replace('VMP-2026-', '').replace('BLT-RT', '')
-        
-        possible_numbers = [
-            clean_num,
-            f"BLT-RT/{raw_code}",
-            f"BLT-RT-{raw_code}",
-            f"VMP-2026-{raw_code}",
-            raw_code
-        ]
-        
+        return (await self.resolve(numero)).result
+
+    async def resolve(self, numero: str) -> Validacion:
+        """Como validate_credential, con el ETag y el max-age del resultado."""
+        clave = numero_canonico(numero)
+        entry = self._entries.get(clave)
+        if entry is not None:
+            if entry[0] > self._clock():
+                self._entries.move_to_end(clave)
+                self.hits += 1
+                return entry[1]
+            del self._entries[clave]
+
+        pending = self._inflight.get(clave)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[clave] = future
+        try:
+            validacion = await self._consultar(clave)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # los que esperaban ya la reciben; evita el warning de asyncio
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            # Si hubo un invalidate() durante la consulta ya no es la registrada
+            vigente = self._inflight.get(clave) is future
+            if vigente:
+                del self._inflight[clave]
+        if vigente:
+            self._put(clave, validacion)
+        future.set_result(validacion)
+        return validacion
+
+    async def _consultar(self, clave: str) -> Validacion:
         # Buscar credencial
         credencial = await prisma.credencial.find_first(
-            where={
-                "numero": {
-                    "in": possible_numbers
-                }
-            },
+            where={"numeroCanonico": clave},
             include={
                 "alumno": {
                     "include": {
@@ -47,23 +129,27 @@ class CredentialValidator:
                 "curso": True
             }
         )
-        
+
         if not credencial:
-            return {
+            return self._validacion({
                 "valid": False,
                 "status": "not_found",
                 "message": "Credencial no encontrada"
-            }
-        
+            }, self.negative_ttl_seconds)
+
         # Verificar expiración
         is_expired = False
-        if credencial.fechaVencimiento:
+        ttl = self.ttl_seconds
+        vencimiento = vencimiento_utc(credencial)
+        if vencimiento:
             now = datetime.now(timezone.utc)
-            vencimiento = credencial.fechaVencimiento if credencial.fechaVencimiento.tzinfo else credencial.fechaVencimiento.replace(tzinfo=timezone.utc)
             is_expired = now > vencimiento
-        
+            if not is_expired:
+                # Que no se siga mostrando como válida después de vencer
+                ttl = min(ttl, (vencimiento - now).total_seconds())
+
         # Preparar respuesta con datos públicos
-        return {
+        return self._validacion({
             "valid": not is_expired,
             "status": "expired" if is_expired else "valid",
             "credential": {
@@ -85,8 +171,56 @@ class CredentialValidator:
                     "cuit": credencial.alumno.empresa.cuit if credencial.alumno.empresa else None
                 } if credencial.alumno.empresa else None
             }
+        }, ttl)
+
+    @staticmethod
+    def _validacion(result: Dict[str, Any], ttl: float) -> Validacion:
+        body = json.dumps(result, sort_keys=True, ensure_ascii=False).encode()
+        return Validacion(result, f'"{hashlib.sha256(body).hexdigest()[:32]}"', max(0, int(ttl)))
+
+    def _put(self, clave: str, validacion: Validacion) -> None:
+        if not self.enabled or validacion.max_age <= 0:
+            return
+        self._entries[clave] = (self._clock() + validacion.max_age, validacion)
+        self._entries.move_to_end(clave)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, numero: str) -> None:
+        """
+        Descarta lo cacheado sobre `numero`, encontrado o no (llamar al
+        emitir, regenerar o eliminar una credencial). Una consulta que ya
+        estaba en curso no se cachea al terminar, y las siguientes no se
+        suman a ella: pudo leer la credencial antes del cambio.
+        """
+        clave = numero_canonico(numero)
+        self._inflight.pop(clave, None)
+        if self._entries.pop(clave, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "negative_ttl_seconds": self.negative_ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups * 100, 2) if lookups else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
         }
 
 
 # Instancia global del validador
-credential_validator = CredentialValidator()
+credential_validator = CredentialValidator(
+    max_entries=settings.CREDENTIAL_VALIDATION_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.CREDENTIAL_VALIDATION_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.CREDENTIAL_VALIDATION_NEGATIVE_TTL_SECONDS,
+)
@@ -0,0 +1,106 @@
+"""
+Verificación masiva de credenciales para auditores B2B.
+
+Las contratistas auditan cuadrillas enteras y llamaban a
+/public/validar/{numero} una vez por chofer, con lo que chocaban enseguida
+con el rate limit público. verificar() recibe miles de números de credencial
+o DNIs y los resuelve de a CREDENTIAL_VERIFY_CHUNK_SIZE con una consulta
+indexada por tanda (numero_canonico o users.dni_normalizado), devolviendo un estado
+compacto por ítem en el mismo orden en que llegaron.
+
+Es un generador: el router lo junta en un JSON o lo manda como NDJSON a
+medida que se resuelve cada tanda.
+"""
+from datetime import datetime, timezone
+from typing import AsyncIterator
+
+from core.config import settings
+from core.database import prisma
+from services.credential_numbering import numero_canonico
+from services.credential_validator import vencimiento_utc
+from services.dni import normalizar_dni
+
+_INCLUDE = {"alumno": True, "curso": True}
+
+
+def _tandas(items: list[str]):
+    tamanio = max(1, settings.CREDENTIAL_VERIFY_CHUNK_SIZE)
+    for i in range(0, len(items), tamanio):
+        yield items[i:i + tamanio]
+
+
+def _estado(credencial, ahora: datetime) -> str:
+    vencimiento = vencimiento_utc(credencial)
+    return "expired" if vencimiento and ahora > vencimiento else "valid"
+
+
+def _credencial(credencial, ahora: datetime) -> dict:
+    return {
+        "numero": credencial.numero,
+        "status": _estado(credencial, ahora),
+        "curso": credencial.curso.codigo,
+        "fechaVencimiento": credencial.fechaVencimiento.isoformat() if credencial.fechaVencimiento else None,
+    }
+
+
+async def _por_numero(numeros: list[str], ahora: datetime) -> list[dict]:
+    claves = [numero_canonico(n) for n in numeros]
+    filas = await prisma.credencial.find_many(
+        where={"numeroCanonico": {"in": list(set(claves))}}, include=_INCLUDE
+    )
+    por_clave = {c.numeroCanonico: c for c in filas}
+    resultados = []
+    for consulta, clave in zip(numeros, claves):
+        credencial = por_clave.get(clave)
+        if credencial is None:
+            resultados.append({"consulta": consulta, "tipo": "numero", "status": "not_found"})
+            continue
+        resultados.append({
+            "consulta": consulta,
+            "tipo": "numero",
+            **_credencial(credencial, ahora),
+            "dni": credencial.alumno.dni,
+            "alumno": f"{credencial.alumno.nombre} {credencial.alumno.apellido}",
+        })
+    return resultados
+
+
+async def _por_dni(dnis: list[str], ahora: datetime) -> list[dict]:
+    # Acepta 30.123.456, 30 123 456, etc., de los dos lados
+    normalizados = [normalizar_dni(d) for d in dnis]
+    filas = await prisma.credencial.find_many(
+        where={"alumno": {"is": {"dniNormalizado": {"in": list(set(normalizados))}}}},
+        include=_INCLUDE,
+        order={"fechaEmision": "desc"},
+    )
+    por_dni: dict[str, list] = {}
+    for credencial in filas:
+        por_dni.setdefault(credencial.alumno.dniNormalizado, []).append(credencial)
+    resultados = []
+    for consulta, dni in zip(dnis, normalizados):
+        credenciales = por_dni.get(dni)
+        if not credenciales:
+            resultados.append({"consulta": consulta, "tipo": "dni", "status": "not_found"})
+            continue
+        items = [_credencial(c, ahora) for c in credenciales]
+        resultados.append({
+            "consulta": consulta,
+            "tipo": "dni",
+            # Válido si tiene al menos una credencial vigente
+            "status": "valid" if any(i["status"] == "valid" for i in items) else "expired",
+            "dni": dni,
+            "alumno": f"{credenciales[0].alumno.nombre} {credenciales[0].alumno.apellido}",
+            "credenciales": items,
+        })
+    return resultados
+
+
+async def verificar(numeros: list[str], dnis: list[str]) -> AsyncIterator[dict]:
+    """Un resultado por número y por DNI, tanda por tanda."""
+    ahora = datetime.now(timezone.utc)
+    for tanda in _tandas(numeros):
+        for resultado in await _por_numero(tanda, ahora):
+            yield resultado
+    for tanda in _tandas(dnis):
+        for resultado in await _por_dni(tanda, ahora):
+            yield resultado
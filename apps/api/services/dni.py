@@ -0,0 +1,17 @@
+"""
+Clave de búsqueda del DNI de un usuario.
+
+users.dni se guarda tal como se cargó (30.123.456, 30 123 456, 30123456),
+así que buscar por igualdad sobre dni falla según cómo se tipeó. Los que
+crean o editan usuarios guardan además normalizar_dni() en
+users.dni_normalizado, y la verificación masiva busca por esa columna.
+"""
+import re
+
+
+def normalizar_dni(dni: str) -> str:
+    """
+    Sin puntos, espacios ni guiones y en mayúsculas. Tiene que coincidir con
+    la carga inicial de database/migrations/add_user_dni_normalizado.sql.
+    """
+    return re.sub(r"[^0-9A-Z]", "", dni.upper())
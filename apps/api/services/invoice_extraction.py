@@ -0,0 +1,327 @@
+"""
+Jobs de extracción de facturas PDF de compras.
+
+/compras/upload-pdf hacía en el event loop la lectura del PDF (pdfplumber),
+la llamada síncrona a Gemini y ~40 regex: cada factura bloqueaba el worker
+varios segundos. Ahora:
+
+- submit() guarda un job (tabla invoice_extraction_jobs) y lo procesa en
+  background: texto + parseo local en un pool de PROCESOS (CPU, fuera del
+  GIL) y la llamada a Gemini en un pool de threads (I/O bloqueante).
+- El cliente consulta el job con get() hasta que queda DONE o FAILED. El job
+  vive en la base, así que cualquier worker puede responder la consulta.
+- Cache por sha256 del PDF: si el mismo archivo ya se extrajo (o se está
+  extrayendo) se devuelve ese job sin volver a procesar.
+
+Un job que no terminó en INVOICE_JOB_TIMEOUT_SECONDS (p. ej. el worker se
+reinició) se marca FAILED al consultarlo.
+
+ingest_zip() procesa un ZIP de facturas de un proveedor: recorre las
+entradas en memoria (sin extraer a disco), parsea los PDFs en paralelo en
+el mismo pool de procesos con la lectura local (sin IA) y deja un lote de
+jobs (batchId) con los borradores de Compra para revisar antes de cargarlos
+(p. ej. con POST /compras/import en JSON).
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Optional
+
+from prisma import Json
+
+from core.config import settings
+from core.database import prisma
+from services import invoice_parser
+
+logger = logging.getLogger("vmp-api.invoices")
+
+PENDING = "PENDING"
+PROCESSING = "PROCESSING"
+DONE = "DONE"
+FAILED = "FAILED"
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_ai_executor: Optional[ThreadPoolExecutor] = None
+# Referencias a los jobs en curso para que el GC no cancele las tareas
+_running: set[asyncio.Task] = set()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=settings.INVOICE_PARSE_PROCESSES)
+    return _process_pool
+
+
+def _get_ai_executor() -> ThreadPoolExecutor:
+    global _ai_executor
+    if _ai_executor is None:
+        _ai_executor = ThreadPoolExecutor(
+            max_workers=settings.INVOICE_AI_THREADS, thread_name_prefix="invoice-ai"
+        )
+    return _ai_executor
+
+
+def shutdown() -> None:
+    """Cierra los pools (shutdown de la app)."""
+    global _process_pool, _ai_executor
+    for pool in (_process_pool, _ai_executor):
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+    _process_pool = _ai_executor = None
+
+
+def _vencido(job) -> bool:
+    limite = timedelta(seconds=settings.INVOICE_JOB_TIMEOUT_SECONDS)
+    return job.status in (PENDING, PROCESSING) and datetime.utcnow() - job.updatedAt.replace(tzinfo=None) > limite
+
+
+async def submit(contents: bytes, filename: Optional[str], user_id: Optional[str]) -> Any:
+    """Crea (o reutiliza por sha256) el job de extracción de un PDF."""
+    digest = hashlib.sha256(contents).hexdigest()
+    previo = await prisma.invoiceextractionjob.find_first(
+        where={"sha256": digest, "status": {"in": [DONE, PENDING, PROCESSING]}},
+        order={"createdAt": "desc"},
+    )
+    if previo and not _vencido(previo):
+        return previo
+
+    job = await prisma.invoiceextractionjob.create(
+        data={"sha256": digest, "filename": filename, "status": PENDING, "createdById": user_id}
+    )
+    task = asyncio.create_task(_procesar(job.id, contents))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return job
+
+
+async def _procesar(job_id: str, contents: bytes) -> None:
+    loop = asyncio.get_running_loop()
+    try:
+        await prisma.invoiceextractionjob.update(where={"id": job_id}, data={"status": PROCESSING})
+
+        # Texto + lectura tradicional (CPU) en el pool de procesos
+        full_text, datos = await loop.run_in_executor(
+            _get_process_pool(), invoice_parser.extraer_local, contents
+        )
+        source = "local"
+
+        # Con Gemini configurado manda su resultado; la llamada es bloqueante
+        gemini_key = os.environ.get("GEMINI_API_KEY")
+        if gemini_key:
+            try:
+                datos_ia = await loop.run_in_executor(
+                    _get_ai_executor(), invoice_parser.extraer_con_gemini, contents, full_text, gemini_key
+                )
+            except Exception as e:
+                raise RuntimeError(f"Error AI: {e}") from e
+            if datos_ia:
+                datos, source = datos_ia, "gemini"
+
+        await prisma.invoiceextractionjob.update(
+            where={"id": job_id},
+            data={"status": DONE, "source": source, "result": Json(datos)},
+        )
+    except Exception as e:
+        logger.exception(f"Falló la extracción de la factura (job {job_id})")
+        try:
+            await prisma.invoiceextractionjob.update(
+                where={"id": job_id},
+                data={"status": FAILED, "error": f"Error al procesar PDF de factura: {e}"},
+            )
+        except Exception:
+            logger.exception(f"No se pudo marcar como fallido el job {job_id}")
+
+
+async def get(job_id: str) -> Optional[Any]:
+    job = await prisma.invoiceextractionjob.find_unique(where={"id": job_id})
+    if job is not None and _vencido(job):
+        job = await prisma.invoiceextractionjob.update(
+            where={"id": job_id},
+            data={"status": FAILED, "error": "La extracción no terminó a tiempo. Vuelva a subir el PDF."},
+        )
+    return job
+
+
+async def wait(job_id: str, timeout: float, interval: float = 0.25) -> Optional[Any]:
+    """Espera (sin bloquear el loop) a que el job termine o venza `timeout`."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        job = await get(job_id)
+        if job is None or job.status in (DONE, FAILED) or asyncio.get_running_loop().time() >= deadline:
+            return job
+        await asyncio.sleep(interval)
+
+
+def serializar(job) -> dict:
+    return {
+        "jobId": job.id,
+        "status": job.status,
+        "source": job.source,
+        "result": job.result,
+        "error": job.error,
+        "filename": job.filename,
+        "createdAt": job.createdAt,
+    }
+
+
+# --- ZIP de facturas ---
+
+class ZipIngestError(ValueError):
+    """El archivo no es un ZIP de facturas procesable."""
+
+
+def _entradas_pdf(zf: zipfile.ZipFile) -> list[zipfile.ZipInfo]:
+    entradas = [
+        info for info in zf.infolist()
+        if not info.is_dir()
+        and info.filename.lower().endswith(".pdf")
+        and not info.filename.startswith("__MACOSX/")
+        and not os.path.basename(info.filename).startswith(".")
+    ]
+    if not entradas:
+        raise ZipIngestError("El ZIP no contiene facturas PDF")
+    if len(entradas) > settings.INVOICE_ZIP_MAX_FILES:
+        raise ZipIngestError(
+            f"El ZIP tiene {len(entradas)} PDFs; el máximo por lote es {settings.INVOICE_ZIP_MAX_FILES}"
+        )
+    return entradas
+
+
+def _sha256_entrada(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> str:
+    digest = hashlib.sha256()
+    with zf.open(info) as entry:
+        for chunk in iter(lambda: entry.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _abrir_zip(fileobj: BinaryIO) -> tuple[zipfile.ZipFile, list[zipfile.ZipInfo], set[str], dict[str, str]]:
+    """Abre el ZIP, elige los PDFs y calcula el hash de cada uno (bloqueante)."""
+    try:
+        zf = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise ZipIngestError("El archivo no es un ZIP válido")
+    try:
+        entradas = _entradas_pdf(zf)
+        grandes = {
+            info.filename for info in entradas
+            if info.file_size > settings.INVOICE_ZIP_MAX_FILE_BYTES
+        }
+        hashes = {
+            info.filename: _sha256_entrada(zf, info)
+            for info in entradas if info.filename not in grandes
+        }
+    except BaseException:
+        zf.close()
+        raise
+    return zf, entradas, grandes, hashes
+
+
+async def ingest_zip(fileobj: BinaryIO, user_id: Optional[str]) -> dict:
+    """Parsea en paralelo los PDFs de un ZIP y guarda el lote de borradores."""
+    # 1ª pasada, en un thread: leer y hashear todo el ZIP no bloquea el loop
+    zf, entradas, grandes, hashes = await asyncio.to_thread(_abrir_zip, fileobj)
+
+    with zf:
+        # Un solo lookup del cache para todos los hashes
+        cacheados = {}
+        if hashes:
+            previos = await prisma.invoiceextractionjob.find_many(
+                where={"sha256": {"in": list(set(hashes.values()))}, "status": DONE}
+            )
+            cacheados = {job.sha256: job for job in previos}
+
+        # 2ª pasada: parseo en el pool de procesos de los PDFs no cacheados.
+        # El semáforo limita cuántos PDFs hay en memoria a la vez.
+        loop = asyncio.get_running_loop()
+        en_vuelo = asyncio.Semaphore(max(1, settings.INVOICE_PARSE_PROCESSES) * 2)
+
+        async def parsear(info: zipfile.ZipInfo) -> dict:
+            nombre = info.filename
+            base = {"id": str(uuid.uuid4()), "filename": nombre, "sha256": hashes.get(nombre, "")}
+            if nombre in grandes:
+                return {**base, "status": FAILED, "error": "El PDF supera el tamaño máximo permitido"}
+            previo = cacheados.get(base["sha256"])
+            if previo is not None:
+                return {**base, "status": DONE, "source": previo.source, "result": previo.result, "cache": True}
+            async with en_vuelo:
+                try:
+                    contents = await asyncio.to_thread(zf.read, info)
+                    _, datos = await loop.run_in_executor(
+                        _get_process_pool(), invoice_parser.extraer_local, contents
+                    )
+                    return {**base, "status": DONE, "source": "local", "result": datos}
+                except Exception as e:
+                    return {**base, "status": FAILED, "error": f"Error al procesar PDF de factura: {e}"}
+
+        filas = await asyncio.gather(*(parsear(info) for info in entradas))
+
+    batch_id = str(uuid.uuid4())
+    await prisma.invoiceextractionjob.create_many(data=[
+        {
+            "id": f["id"],
+            "sha256": f["sha256"],
+            "filename": f["filename"],
+            "batchId": batch_id,
+            "status": f["status"],
+            "source": f.get("source"),
+            "result": Json(f["result"]) if f.get("result") is not None else None,
+            "error": f.get("error"),
+            "createdById": user_id,
+        }
+        for f in filas
+    ])
+    lote = await _armar_lote(batch_id, filas)
+    lote["desdeCache"] = sum(1 for f in filas if f.get("cache"))
+    return lote
+
+
+async def get_batch(batch_id: str) -> Optional[dict]:
+    jobs = await prisma.invoiceextractionjob.find_many(
+        where={"batchId": batch_id}, order={"filename": "asc"}
+    )
+    if not jobs:
+        return None
+    filas = [
+        {
+            "id": j.id, "filename": j.filename, "sha256": j.sha256, "status": j.status,
+            "source": j.source, "result": j.result, "error": j.error,
+        }
+        for j in jobs
+    ]
+    return await _armar_lote(batch_id, filas)
+
+
+async def _armar_lote(batch_id: str, filas: list[dict]) -> dict:
+    """Borradores de Compra del lote, marcando los que ya están cargados."""
+    numeros = [f["result"].get("numero") for f in filas if f.get("result") and f["result"].get("numero")]
+    cargadas = set()
+    if numeros:
+        compras = await prisma.compra.find_many(where={"numero": {"in": numeros}})
+        cargadas = {(c.cuit or "", c.numero) for c in compras}
+
+    borradores = []
+    for f in filas:
+        datos = f.get("result") or None
+        borradores.append({
+            "jobId": f["id"],
+            "archivo": f["filename"],
+            "sha256": f["sha256"],
+            "estado": f["status"],
+            "error": f.get("error"),
+            "duplicada": bool(datos and ((datos.get("cuit") or ""), datos.get("numero")) in cargadas),
+            "compra": {**datos, "tipoFactura": datos.get("tipoFactura", "A")} if datos else None,
+        })
+    return {
+        "batchId": batch_id,
+        "total": len(borradores),
+        "procesadas": sum(1 for b in borradores if b["estado"] == DONE),
+        "errores": sum(1 for b in borradores if b["estado"] == FAILED),
+        "borradores": borradores,
+    }
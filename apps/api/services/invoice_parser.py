@@ -0,0 +1,344 @@
+"""
+Extracción de datos de facturas PDF de proveedores (AFIP / ARCA).
+
+Funciones puras, sin base de datos ni event loop: corren en el pool de
+procesos de services/invoice_extraction.py (texto + parseo local) y en un
+thread aparte (llamada a Gemini).
+
+- extraer_texto(): texto del PDF con pdfplumber (o pypdf si no está).
+- parsear_factura(): lectura tradicional por expresiones regulares.
+- extraer_local(): las dos anteriores en un solo paso (un viaje al pool).
+- extraer_con_gemini(): extracción con Google Gemini a partir del texto o,
+  si el PDF es escaneado, del PDF entero (OCR multimodal).
+"""
+import io
+import json
+import re
+from datetime import datetime
+from typing import Optional
+
+GEMINI_PROMPT = """
+Eres un auditor contable experto. Tu única tarea es extraer los datos reales de esta factura a partir del documento adjunto o del texto proporcionado.
+REGLA CRÍTICA DE ORO: ¡NO INVENTES NINGÚN DATO! Si un dato no está explícitamente en el documento, usa un string vacío "" (o 0 para números). NUNCA uses nombres genéricos como "Librería" o "Proveedor" si no aparecen.
+
+Extrae los datos en este formato JSON exacto:
+{
+    "proveedor": "Nombre o Razón Social exacta del emisor",
+    "cuit": "CUIT del emisor con guiones (XX-XXXXXXXX-X)",
+    "numero": "Punto de Venta y Número (Ej: 00001-00001234)",
+    "fecha": "Fecha en formato YYYY-MM-DD",
+    "subtotal": Importe Neto Gravado (Float, usa 0 si no existe),
+    "iva": Total de impuestos IVA (Float, usa 0 si no existe),
+    "total": Importe Total de la factura (Float, usa 0 si no existe),
+    "categoria": Clasifica obligatoriamente como "SERVICIOS", "IMPUESTOS", "SUELDOS" u "OTROS",
+    "metodoPago": "TRANSFERENCIA" o "EFECTIVO",
+    "items": [
+        {
+            "descripcion": "Descripción exacta del artículo o servicio",
+            "cantidad": Numero Float,
+            "precioUnit": Numero Float,
+            "subtotal": Numero Float
+        }
+    ]
+}
+IMPORTANTE: Extrae TODOS los ítems detallados de la factura dentro del array 'items'. Si no hay ítems detallados, devuelve un array vacío [].
+"""
+
+
+# Expresiones regulares compiladas una sola vez al importar el módulo (cada
+# proceso del pool las compila al arrancar, no en cada factura)
+_DECIMAL_COMA_RE = re.compile(r',\d{2}$')
+_DECIMAL_PUNTO_RE = re.compile(r'\.\d{2}$')
+_CUIT_RE = re.compile(r'\b(20|23|24|27|30|33)-?(\d{8})-?(\d)\b')
+_NUMERO_RE = re.compile(
+    r'(?:Punto de Venta|Pt\. Vta|Vta)[:\s]*(\d{4,5})\s*(?:Comp\.?\s*Nro|Nro|N°|Nro\.?|Comp\.?|Nro\. Comprobante)[:\s]*(\d{8})',
+    re.IGNORECASE,
+)
+_NUMERO_SUELTO_RE = re.compile(r'\b(\d{4,5})[ -](\d{8})\b')
+_FECHA_RE = re.compile(r'\b(\d{2})[/-](\d{2})[/-](\d{4})\b')
+_IMPORTE_RE = re.compile(r'\b\d{1,3}(?:\.\d{3})*,\d{2}\b|\b\d+\.\d{2}\b')
+_UNIDADES_RE = re.compile(r'\b(unidades|u|kg|lts|hs|horas)\b', re.IGNORECASE)
+_CODIGO_INICIAL_RE = re.compile(r'^[A-Z0-9-]+\s+')
+_NUMERO_SUELTO_DESC_RE = re.compile(r'\d+(?:[,.]\d+)?')
+_ESPACIOS_RE = re.compile(r'\s+')
+
+_TOTAL_RES = [re.compile(p, re.IGNORECASE) for p in (
+    r'(?:Importe Total|Total|TOTAL|Total Facturado)(?:\s*[:$]?\s*)(\d{1,3}(?:\.\d{3})*(?:,\d{2}))',
+    r'(?:Importe Total|Total|TOTAL|Total Facturado)(?:\s*[:$]?\s*)(\d+[,.]\d{2})',
+    r'TOTAL\s+\$?\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2}))',
+    r'Importe Total\s+\$?\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2}))',
+)]
+_SUBTOTAL_RES = [re.compile(p, re.IGNORECASE) for p in (
+    r'(?:Importe Neto Gravado|Neto Gravado|Neto|Subtotal)(?:\s*[:$]?\s*)(\d{1,3}(?:\.\d{3})*(?:,\d{2}))',
+    r'(?:Importe Neto Gravado|Neto Gravado|Neto|Subtotal)(?:\s*[:$]?\s*)(\d+[,.]\d{2})',
+    r'Neto\s+\$?\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2}))',
+)]
+_IVA_RES = [re.compile(p, re.IGNORECASE) for p in (
+    r'(?:IVA\s*(?:21|10\.5|27)%\s*:?\s*\$?)\s*(\d{1,3}(?:\.\d{3})*(?:,\d{2}))',
+    r'(?:IVA\s*(?:21|10\.5|27)%\s*:?\s*\$?)\s*(\d+[,.]\d{2})',
+)]
+
+
+def clean_amount(val_str: str) -> float:
+    val_str = val_str.strip()
+    if _DECIMAL_COMA_RE.search(val_str):
+        val_str = val_str.replace(".", "").replace(",", ".")
+    elif _DECIMAL_PUNTO_RE.search(val_str):
+        if "," in val_str:
+            val_str = val_str.replace(",", "")
+    else:
+        if "." in val_str and "," in val_str:
+            if val_str.find(",") > val_str.find("."):
+                val_str = val_str.replace(".", "").replace(",", ".")
+            else:
+                val_str = val_str.replace(",", "")
+        elif "," in val_str:
+            parts = val_str.split(",")
+            if len(parts[-1]) != 3:
+                val_str = val_str.replace(",", ".")
+            else:
+                val_str = val_str.replace(",", "")
+    try:
+        return float(val_str)
+    except ValueError:
+        return 0.0
+
+
+def _ultimo_importe(patterns: list, text: str) -> float:
+    for pattern in patterns:
+        matches = pattern.findall(text)
+        if matches:
+            return clean_amount(matches[-1])
+    return 0.0
+
+
+def extraer_texto(contents: bytes) -> str:
+    """Texto del PDF, página por página"""
+    pdf_file = io.BytesIO(contents)
+    full_text = ""
+    try:
+        import pdfplumber
+        with pdfplumber.open(pdf_file) as pdf:
+            for page in pdf.pages:
+                text = page.extract_text(layout=True)
+                if text:
+                    full_text += text + "\n"
+    except ImportError:
+        from pypdf import PdfReader
+        reader = PdfReader(pdf_file)
+        for page in reader.pages:
+            full_text += page.extract_text() or ""
+    return full_text
+
+
+def parsear_factura(full_text: str) -> dict:
+    """Extracción tradicional (sin IA) de los datos de la factura a partir del texto"""
+    # Parse CUIT
+    cuit_match = _CUIT_RE.search(full_text)
+    cuit = ""
+    if cuit_match:
+        cuit = f"{cuit_match.group(1)}-{cuit_match.group(2)}-{cuit_match.group(3)}"
+
+    # Parse Invoice Number (AFIP specific Pt Vta + Comp Nro or standard fallback)
+    num_match = _NUMERO_RE.search(full_text)
+    numero = ""
+    if num_match:
+        numero = f"{num_match.group(1).zfill(5)}-{num_match.group(2)}"
+    else:
+        num_match_fallback = _NUMERO_SUELTO_RE.search(full_text)
+        if num_match_fallback:
+            numero = f"{num_match_fallback.group(1).zfill(5)}-{num_match_fallback.group(2)}"
+
+    # Parse Date (DD/MM/YYYY)
+    date_match = _FECHA_RE.search(full_text)
+    fecha = datetime.now().strftime("%Y-%m-%d")
+    if date_match:
+        day, month, year = date_match.groups()
+        fecha = f"{year}-{month}-{day}"
+
+    # Extract Items from Table (AFIP standard format)
+    # Usually looks like: Código  Producto/Servicio  Cantidad  U.Medida  Precio Unit.  % Bonf  Subtotal
+    items_extraidos = []
+    lines = [l.strip() for l in full_text.split('\n') if l.strip()]
+
+    in_table = False
+    for i, line in enumerate(lines):
+        # Detectar el inicio de la tabla de items
+        line_lower = line.lower()
+        if "producto/servicio" in line_lower or "descripción" in line_lower or "codigo" in line_lower:
+            in_table = True
+            continue
+
+        # Si estamos en la tabla y encontramos "Subtotal" o "Importe Otros Tributos", la tabla terminó
+        if in_table and ("subtotal" in line_lower and "importe" not in line_lower.replace(" ", "")):
+            # Algunos PDFs de AFIP dicen "Subtotal: $ xxx", pero si empieza con Subtotal, probablemente terminamos
+            if line_lower.startswith("subtotal"):
+                in_table = False
+                continue
+        if in_table and ("importe otros tributos" in line_lower or "importe neto gravado" in line_lower or "iva" in line_lower):
+            in_table = False
+            continue
+
+        if in_table:
+            # Buscar filas que tengan formato de ítem: texto largo seguido de varios números separados por espacios
+            # Ejemplo AFIP: 1  Limpieza oficina  1,00  unidades  1000,00  0,00  1000,00
+            # Regex busca: [Cantidad (opcional)] [Descripcion] [Cantidad] [Precio] [Subtotal]
+            # Por simplicidad, buscaremos una línea que termine con importes (números con decimales)
+            importes = _IMPORTE_RE.findall(line)
+
+            if len(importes) >= 2: # Al menos Precio Unitario y Subtotal
+                # Extraer el último importe como subtotal, y el antepenúltimo o penúltimo como precio
+                subt_str = importes[-1]
+                precio_str = importes[-2] if len(importes) > 2 else importes[0]
+
+                subt = clean_amount(subt_str)
+                precio = clean_amount(precio_str)
+
+                # Tratar de encontrar la cantidad (usualmente un número entero o decimal pequeño)
+                cant_match = re.search(r'\b(\d+(?:[,.]\d{1,2})?)\s+(?:unidades|u|kg|lts|hs|horas)?\s+'+re.escape(precio_str), line, re.IGNORECASE)
+                cantidad = 1.0
+                if cant_match:
+                    cantidad = clean_amount(cant_match.group(1))
+                else:
+                    # Si subtotal > precio, inferir cantidad
+                    if precio > 0 and subt > precio:
+                        cantidad = round(subt / precio, 2)
+
+                # La descripción suele ser todo el texto al principio de la línea antes de los números
+                # Quitamos todos los importes encontrados
+                desc = line
+                for imp in importes:
+                    desc = desc.replace(imp, "")
+                # Limpiamos unidades y códigos de barras si existen
+                desc = _UNIDADES_RE.sub('', desc)
+                desc = _CODIGO_INICIAL_RE.sub('', desc) # Quitar código al inicio
+                desc = _NUMERO_SUELTO_DESC_RE.sub('', desc) # Quitar otros números sueltos
+                desc = _ESPACIOS_RE.sub(' ', desc).strip()
+
+                if len(desc) < 3:
+                    desc = "Artículo/Servicio"
+
+                items_extraidos.append({
+                    "descripcion": desc,
+                    "cantidad": cantidad,
+                    "precioUnit": precio,
+                    "subtotal": subt
+                })
+
+    # Look for Total amount / Subtotal (Net Amount) / IVA: el último match del primer patrón que encuentre
+    total = _ultimo_importe(_TOTAL_RES, full_text)
+    subtotal = _ultimo_importe(_SUBTOTAL_RES, full_text)
+    iva = _ultimo_importe(_IVA_RES, full_text)
+
+    # Check if items matched anything, if not fallback to subtotal
+    if not items_extraidos:
+        if subtotal == 0.0:
+            subtotal = total
+        items_extraidos = [{
+            "descripcion": "Carga rápida desde factura PDF",
+            "cantidad": 1,
+            "precioUnit": subtotal,
+            "subtotal": subtotal
+        }]
+    else:
+        # Reconcile subtotal if we extracted items
+        calc_subtotal = sum(float(i.get("subtotal", 0.0)) for i in items_extraidos)
+        if subtotal == 0.0:
+            subtotal = calc_subtotal
+        if total == 0.0:
+            total = subtotal + iva
+
+    # Parse Provider Name
+    proveedor = ""
+    for line in lines:
+        if "Razón Social:" in line or "Razon Social:" in line:
+            proveedor = line.split(":", 1)[1].strip()
+            break
+
+    if not proveedor and len(lines) > 0:
+        for line in lines:
+            if "Razón Social:" in line or "Razon Social:" in line or "Nombre / Razón Social" in line or "Nombre/Razón Social" in line:
+                parts = line.split(":")
+                if len(parts) > 1:
+                    proveedor = parts[-1].strip()
+                    break
+
+    if not proveedor and len(lines) > 0:
+        for l in lines[:5]:
+            if not any(k in l.lower() for k in ["factura", "cuit", "fecha", "punto de venta", "pág", "pag", "original", "duplicado", "comprobante"]):
+                proveedor = l
+                break
+
+    if not proveedor:
+        proveedor = "Proveedor Desconocido"
+
+    if cuit and cuit in proveedor:
+        proveedor = proveedor.replace(cuit, "").strip()
+    proveedor = _ESPACIOS_RE.sub(' ', proveedor).strip()
+    proveedor = proveedor.replace("Apellido y Nombre /", "").replace("Razón Social:", "").replace("Razon Social:", "").strip()
+
+    # Determine category based on keywords
+    categoria = "OTROS"
+    full_text_lower = full_text.lower()
+    if any(k in full_text_lower for k in ["honorarios", "servicios", "abono", "asesoramiento", "mensual", "alquiler", "limpieza", "seguridad"]):
+        categoria = "SERVICIOS"
+    elif any(k in full_text_lower for k in ["impuesto", "tasa", "afip", "rentas", "iibb", "municipalidad"]):
+        categoria = "IMPUESTOS"
+    elif any(k in full_text_lower for k in ["sueldo", "recibo", "jornal", "sac", "vacaciones"]):
+        categoria = "SUELDOS"
+
+    return {
+        "proveedor": proveedor,
+        "cuit": cuit,
+        "numero": numero,
+        "fecha": fecha,
+        "subtotal": subtotal,
+        "iva": iva,
+        "total": total,
+        "categoria": categoria,
+        "metodoPago": "TRANSFERENCIA" if categoria == "SERVICIOS" else "EFECTIVO",
+        "items": items_extraidos
+    }
+
+
+def extraer_local(contents: bytes) -> tuple[str, dict]:
+    """(texto, datos parseados localmente). Pensada para el pool de procesos."""
+    full_text = extraer_texto(contents)
+    return full_text, parsear_factura(full_text)
+
+
+def extraer_con_gemini(contents: bytes, full_text: str, api_key: str) -> Optional[dict]:
+    """Datos de la factura según Gemini, o None si la respuesta no sirve.
+
+    Es bloqueante (llamada HTTP síncrona del SDK): correrla fuera del event loop.
+    """
+    import google.generativeai as genai
+
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel('gemini-3.6-flash')
+
+    # OPTIMIZACIÓN DE VELOCIDAD: Si el PDF es digital (tiene texto), enviamos texto.
+    # Esto evita el costoso OCR multimodal de Gemini que demora 4-6 segundos extra.
+    if len(full_text.strip()) > 100:
+        payload = [
+            f"TEXTO EXTRAÍDO DE LA FACTURA:\n\n{full_text}",
+            GEMINI_PROMPT
+        ]
+    else:
+        # Fallback para imágenes/facturas escaneadas (usa multimodal OCR)
+        payload = [
+            {"mime_type": "application/pdf", "data": contents},
+            GEMINI_PROMPT
+        ]
+
+    response = model.generate_content(
+        payload,
+        generation_config=genai.types.GenerationConfig(
+            response_mime_type="application/json"
+        )
+    )
+    data = json.loads(response.text.strip())
+    # Validaciones básicas del output de Gemini
+    if "proveedor" in data and "items" in data:
+        return data
+    return None
@@ -0,0 +1,219 @@
+"""
+Totales acumulados de Debe/Haber por cuenta contable.
+
+Cada Account guarda debitTotal/creditTotal, que se actualizan con un
+increment atómico dentro de la MISMA transacción que crea o borra el
+asiento. Así el balance de sumas y saldos es una sola lectura de la tabla
+accounts en lugar de traer todos los ledger_entries a memoria.
+
+libro_mayor() pagina el mayor de una cuenta por keyset (fecha del asiento)
+y calcula el saldo de apertura de cada página con un agregado SQL.
+
+Si alguna vez los totales se desincronizan (un asiento cargado a mano en la
+base, un bug), reconcile() los recalcula desde el libro mayor y devuelve las
+diferencias; scripts/reconcile_account_balances.py lo expone por terminal.
+"""
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Optional
+
+from core.database import prisma
+
+# Diferencias menores (redondeo de floats) no se reportan
+TOLERANCIA = 0.005
+
+
+def _sumar_por_cuenta(entries: Iterable) -> dict[str, tuple[float, float]]:
+    totales: dict[str, list[float]] = defaultdict(lambda: [0.0, 0.0])
+    for entry in entries:
+        if not isinstance(entry, dict):
+            entry = {"accountId": entry.accountId, "debit": entry.debit, "credit": entry.credit}
+        if entry["accountId"] is None:
+            continue
+        totales[entry["accountId"]][0] += entry["debit"] or 0
+        totales[entry["accountId"]][1] += entry["credit"] or 0
+    return {k: (v[0], v[1]) for k, v in totales.items()}
+
+
+async def aplicar_movimientos(transaction, entries: Iterable, signo: int = 1) -> None:
+    """Suma (signo=1) o resta (signo=-1) las partidas a los totales de sus cuentas.
+
+    `entries` acepta los dicts que se pasan a journalentry.create o los
+    LedgerEntry ya guardados. Llamar con la transacción del asiento.
+    """
+    for account_id, (debit, credit) in _sumar_por_cuenta(entries).items():
+        await transaction.account.update(
+            where={"id": account_id},
+            data={
+                "debitTotal": {"increment": signo * debit},
+                "creditTotal": {"increment": signo * credit},
+            },
+        )
+
+
+async def eliminar_asiento(transaction, journal_id: str) -> None:
+    """Borra un asiento y descuenta sus partidas de los totales, en la transacción dada."""
+    entries = await transaction.ledgerentry.find_many(where={"journalId": journal_id})
+    await aplicar_movimientos(transaction, entries, signo=-1)
+    await transaction.journalentry.delete(where={"id": journal_id})
+
+
+def saldo(account_type: str, debit: float, credit: float) -> float:
+    """Saldo según la naturaleza de la cuenta (deudora o acreedora)."""
+    if account_type in ["ASSET", "EXPENSE"]:
+        return debit - credit
+    return credit - debit
+
+
+# Orden del libro mayor: fecha del asiento, alta de la partida y id como desempate.
+# El cursor de paginación es el id de la última partida de la página anterior.
+_ORDEN_MAYOR = '(j."date", le."created_at", le."id")'
+_DESDE_MAYOR = 'FROM "ledger_entries" le JOIN "journal_entries" j ON j."id" = le."journal_id"'
+
+
+def _clave_cursor(param: str) -> str:
+    return f"""(
+        SELECT j2."date", l2."created_at", l2."id"
+        FROM "ledger_entries" l2 JOIN "journal_entries" j2 ON j2."id" = l2."journal_id"
+        WHERE l2."id" = {param}
+    )"""
+
+
+class _Params(list):
+    """Acumula parámetros de query_raw y devuelve su placeholder ($n)"""
+
+    def add(self, value, cast: str = "") -> str:
+        self.append(value)
+        return f"${len(self)}{cast}"
+
+
+async def libro_mayor(
+    account,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = 200,
+) -> dict:
+    """Una página del libro mayor de una cuenta con saldo corrido.
+
+    El saldo anterior a la página (todo lo previo al cursor o, en la primera
+    página, a `desde`) y el saldo al cierre de la ventana salen de un único
+    agregado SQL, así que ninguna página carga la historia de la cuenta.
+    Levanta ValueError si el cursor no corresponde a ninguna partida.
+    """
+    # Página: partidas de la ventana posteriores al cursor
+    p = _Params()
+    condiciones = [f'le."account_id" = {p.add(account.id)}']
+    if desde:
+        condiciones.append(f'j."date" >= {p.add(desde.isoformat(), "::timestamp")}')
+    if hasta:
+        condiciones.append(f'j."date" <= {p.add(hasta.isoformat(), "::timestamp")}')
+    if cursor:
+        condiciones.append(f"{_ORDEN_MAYOR} > {_clave_cursor(p.add(cursor))}")
+    pagina = prisma.query_raw(
+        f"""
+        SELECT le."id", j."date", j."concept", j."reference", j."type",
+               le."description", le."debit", le."credit"
+        {_DESDE_MAYOR}
+        WHERE {" AND ".join(condiciones)}
+        ORDER BY j."date", le."created_at", le."id"
+        LIMIT {p.add(limit + 1)}
+        """,
+        *p,
+    )
+
+    # Saldos de apertura (antes de la página) y de cierre (fin de la ventana)
+    q = _Params()
+    cuenta = q.add(account.id)
+    encontrado = "false"
+    if cursor:
+        param_cursor = q.add(cursor)
+        antes = f"{_ORDEN_MAYOR} <= {_clave_cursor(param_cursor)}"
+        encontrado = f'le."id" = {param_cursor}'
+    elif desde:
+        antes = f'j."date" < {q.add(desde.isoformat(), "::timestamp")}'
+    else:
+        antes = "false"
+    cierre = f'j."date" <= {q.add(hasta.isoformat(), "::timestamp")}' if hasta else "true"
+    saldos = prisma.query_raw(
+        f"""
+        SELECT
+            COALESCE(SUM(le."debit") FILTER (WHERE {antes}), 0) AS opening_debit,
+            COALESCE(SUM(le."credit") FILTER (WHERE {antes}), 0) AS opening_credit,
+            COALESCE(SUM(le."debit") FILTER (WHERE {cierre}), 0) AS closing_debit,
+            COALESCE(SUM(le."credit") FILTER (WHERE {cierre}), 0) AS closing_credit,
+            COUNT(*) FILTER (WHERE {encontrado}) AS cursor_found
+        {_DESDE_MAYOR}
+        WHERE le."account_id" = {cuenta}
+        """,
+        *q,
+    )
+
+    filas, totales = await asyncio.gather(pagina, saldos)
+    totales = totales[0]
+    if cursor and not int(totales["cursor_found"]):
+        raise ValueError("cursor inválido")
+
+    has_more = len(filas) > limit
+    saldo_inicial = saldo(account.type, float(totales["opening_debit"]), float(totales["opening_credit"]))
+    saldo_corrido = saldo_inicial
+    movimientos = []
+    for fila in filas[:limit]:
+        debit, credit = float(fila["debit"]), float(fila["credit"])
+        saldo_corrido += saldo(account.type, debit, credit)
+        movimientos.append({
+            "id": fila["id"],
+            "date": fila["date"],
+            "concept": fila["concept"],
+            "reference": fila["reference"],
+            "type": fila["type"],
+            "description": fila["description"] or fila["concept"],
+            "debit": debit,
+            "credit": credit,
+            "balance": saldo_corrido,
+        })
+
+    return {
+        "openingBalance": saldo_inicial,
+        "balance": saldo(account.type, float(totales["closing_debit"]), float(totales["closing_credit"])),
+        "entries": movimientos,
+        "nextCursor": movimientos[-1]["id"] if has_more else None,
+    }
+
+
+async def reconcile(fix: bool = False) -> list[dict]:
+    """Compara los totales guardados con la suma real del libro mayor.
+
+    Devuelve una fila por cuenta con diferencias; con fix=True además
+    reemplaza los totales guardados por los recalculados.
+    """
+    accounts = await prisma.account.find_many(order={"code": "asc"})
+    rows = await prisma.ledgerentry.group_by(
+        by=["accountId"],
+        sum={"debit": True, "credit": True},
+    )
+    reales = {
+        row["accountId"]: (row["_sum"]["debit"] or 0.0, row["_sum"]["credit"] or 0.0)
+        for row in rows
+    }
+
+    diferencias = []
+    for account in accounts:
+        debit, credit = reales.get(account.id, (0.0, 0.0))
+        if abs(debit - account.debitTotal) <= TOLERANCIA and abs(credit - account.creditTotal) <= TOLERANCIA:
+            continue
+        diferencias.append({
+            "accountCode": account.code,
+            "accountName": account.name,
+            "storedDebit": account.debitTotal,
+            "ledgerDebit": debit,
+            "storedCredit": account.creditTotal,
+            "ledgerCredit": credit,
+        })
+        if fix:
+            await prisma.account.update(
+                where={"id": account.id},
+                data={"debitTotal": debit, "creditTotal": credit},
+            )
+    return diferencias
@@ -0,0 +1,155 @@
+"""
+Rollups diarios de métricas (tabla metric_rollups_daily).
+
+Cada fila es (día, métrica, dimensión) -> cantidad, por ejemplo
+(2026-03-02, "leads", "converted") -> 4. Los dashboards leen estas filas en
+vez de recorrer las tablas de origen: una ventana de 365 días son a lo sumo
+365 * dimensiones filas, sin importar cuántas cotizaciones o inscripciones
+haya.
+
+Métricas (día de la fila / dimensión):
+    leads        cotizaciones.created_at / status
+    enrollments  inscripciones.created_at / estado
+    credentials  credenciales.fecha_emision / ""
+    exams        examenes.realizado_at / aprobado | reprobado | pendiente
+
+Se mantienen de dos formas:
+- Hooks de escritura (record / move): suman o restan 1 apenas se crea un
+  registro o cambia su estado, para que el dashboard se vea al día.
+- refresh_recent() (worker cada pocos minutos): recalcula exacto los días
+  de los registros modificados recientemente (updated_at), lo que corrige
+  escrituras sin hook, como los cambios de estado de inscripciones que
+  hacen varios routers. rebuild_all() (una vez por día) recalcula todo y
+  además limpia lo que quedó de registros borrados.
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+from core.database import prisma
+
+logger = logging.getLogger("vmp-api.rollups")
+
+LEADS = "leads"
+ENROLLMENTS = "enrollments"
+CREDENTIALS = "credentials"
+EXAMS = "exams"
+
+# métrica -> (tabla, expresión del día, expresión de la dimensión, columna de cambios)
+_SOURCES = {
+    LEADS: ('"cotizaciones"', "created_at", "status", "updated_at"),
+    ENROLLMENTS: ('"inscripciones"', "created_at", "estado::text", "updated_at"),
+    CREDENTIALS: ('"credenciales"', "fecha_emision", "''", "created_at"),
+    EXAMS: (
+        '"examenes"',
+        "realizado_at",
+        "CASE aprobado WHEN true THEN 'aprobado' WHEN false THEN 'reprobado' ELSE 'pendiente' END",
+        "realizado_at",
+    ),
+}
+
+
+def exam_dimension(aprobado: Optional[bool]) -> str:
+    if aprobado is None:
+        return "pendiente"
+    return "aprobado" if aprobado else "reprobado"
+
+
+def _day(value: datetime | date) -> str:
+    return (value.date() if isinstance(value, datetime) else value).isoformat()
+
+
+async def record(metric: str, day: datetime | date, dimension: str = "", delta: int = 1) -> None:
+    """Hook de escritura: suma `delta` al contador del día. Nunca falla el request."""
+    await _apply([(metric, day, dimension, delta)])
+
+
+async def move(metric: str, day: datetime | date, old_dimension: str, new_dimension: str) -> None:
+    """Hook de cambio de estado: pasa una unidad de una dimensión a otra."""
+    if old_dimension == new_dimension:
+        return
+    await _apply([(metric, day, old_dimension, -1), (metric, day, new_dimension, 1)])
+
+
+async def _apply(deltas: list[tuple[str, datetime | date, str, int]]) -> None:
+    values = []
+    params = []
+    for i, (metric, day, dimension, delta) in enumerate(deltas):
+        n = i * 4
+        values.append(f"(${n + 1}::date, ${n + 2}::text, ${n + 3}::text, ${n + 4}::int)")
+        # Los enums de prisma (estado) se guardan por su valor
+        params.extend([_day(day), metric, str(getattr(dimension, "value", dimension)), delta])
+    try:
+        await prisma.execute_raw(
+            f"""
+            INSERT INTO "metric_rollups_daily" (day, metric, dimension, count)
+            VALUES {", ".join(values)}
+            ON CONFLICT (day, metric, dimension)
+            DO UPDATE SET count = "metric_rollups_daily".count + EXCLUDED.count
+            """,
+            *params,
+        )
+    except Exception as e:
+        # El worker corrige el rollup en la próxima pasada
+        logger.warning(f"No se pudo actualizar el rollup de métricas: {e}")
+
+
+async def _rebuild(metric: str, days: Optional[Iterable[str]]) -> None:
+    """Recalcula exacto los días indicados (o todos si days es None)."""
+    table, day_expr, dimension_expr, _ = _SOURCES[metric]
+    if days is None:
+        rollup_filter = source_filter = ""
+        params = [metric]
+    else:
+        days = sorted(set(days))
+        if not days:
+            return
+        days_param = "ANY(string_to_array($2, ',')::date[])"
+        rollup_filter = f"AND day = {days_param}"
+        source_filter = f"WHERE ({day_expr})::date = {days_param}"
+        params = [metric, ",".join(days)]
+
+    async with prisma.tx() as transaction:
+        await transaction.execute_raw(
+            f'DELETE FROM "metric_rollups_daily" WHERE metric = $1::text {rollup_filter}',
+            *params,
+        )
+        await transaction.execute_raw(
+            f"""
+            INSERT INTO "metric_rollups_daily" (day, metric, dimension, count)
+            SELECT ({day_expr})::date, $1::text, {dimension_expr}, COUNT(*)
+            FROM {table}
+            {source_filter}
+            GROUP BY 1, 3
+            """,
+            *params,
+        )
+
+
+async def refresh_recent(lookback: timedelta) -> dict:
+    """Recalcula los días de los registros creados o modificados en `lookback`.
+
+    Devuelve cuántos días se recalcularon por métrica.
+    """
+    since = (datetime.utcnow() - lookback).isoformat()
+    rebuilt = {}
+    for metric, (table, day_expr, _, changed_column) in _SOURCES.items():
+        rows = await prisma.query_raw(
+            f"""
+            SELECT DISTINCT ({day_expr})::date::text AS day
+            FROM {table}
+            WHERE {changed_column} >= $1::timestamp
+            """,
+            since,
+        )
+        days = [row["day"] for row in rows]
+        await _rebuild(metric, days)
+        rebuilt[metric] = len(days)
+    return rebuilt
+
+
+async def rebuild_all() -> None:
+    """Recalcula todos los rollups desde las tablas de origen."""
+    for metric in _SOURCES:
+        await _rebuild(metric, None)
+    logger.info("Rollups de métricas recalculados completos")
@@ -0,0 +1,187 @@
+"""
+Manifiesto firmado de credenciales vigentes para escáneres sin conexión.
+
+En muchos controles de Patagonia no hay señal y el QR no se puede validar
+contra la API. El escáner baja (cuando tiene conexión) un manifiesto con
+todas las credenciales vigentes y valida localmente: una búsqueda por número
+en un dict.
+
+- Cada entrada es numero -> [hash del DNI, código de curso, vencimiento en
+  epoch UTC o null]. El hash es sha256("numero:dni")[:16]: el escáner lo
+  calcula con el número del QR y el DNI del documento que tiene enfrente.
+  Los DNI tienen poca entropía, así que es un control, no un secreto.
+- Está firmado con Ed25519. La clave privada sale de la misma semilla que
+  firma las credenciales (JWT_SECRET, o OFFLINE_MANIFEST_SIGNING_KEY),
+  derivada como en sso_crypto; los escáneres solo llevan la clave pública
+  (GET /credenciales/manifiesto/clave), que no sirve para firmar.
+- Cada alta o baja de credencial queda en credential_manifest_log y su id es
+  la versión del manifiesto. Con `desde` se devuelve solo lo que cambió desde
+  esa versión (altas a agregar y números a borrar), así el escáner sincroniza
+  con pocos bytes.
+- El id sale de una secuencia y dos inserts concurrentes pueden commitear en
+  otro orden: si el escáner se quedara con N+1 mientras N todavía no es
+  visible, nunca recibiría N. Por eso la versión publicada es el mayor id con
+  más de OFFLINE_MANIFEST_VERSION_LAG_SECONDS de antigüedad; lo más nuevo se
+  vuelve a mandar en el próximo delta.
+
+El JSON firmado viaja como string: el escáner verifica la firma sobre esos
+bytes exactos y recién después lo parsea.
+"""
+import base64
+import hashlib
+import json
+import time
+from functools import lru_cache
+from typing import Optional
+
+from core.config import settings
+from core.database import prisma
+from services.credential_numbering import numero_canonico
+
+ALTA = "ALTA"
+BAJA = "BAJA"
+
+# El manifiesto completo se recalcula si cambió la versión o pasó este tiempo
+_COMPLETO_TTL_SECONDS = 3600
+_completo: Optional[tuple[int, float, dict]] = None
+
+_SELECT = """
+    SELECT c."numero_canonico" AS numero, u."dni" AS dni, cu."codigo" AS curso,
+           CAST(EXTRACT(EPOCH FROM c."fecha_vencimiento") AS BIGINT) AS vence
+    FROM "credenciales" c
+    JOIN "users" u ON u."id" = c."alumno_id"
+    JOIN "cursos" cu ON cu."id" = c."curso_id"
+    WHERE (c."fecha_vencimiento" IS NULL OR c."fecha_vencimiento" > (now() AT TIME ZONE 'UTC'))
+"""
+
+
+@lru_cache(maxsize=1)
+def _clave_privada():
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+    semilla = settings.OFFLINE_MANIFEST_SIGNING_KEY or f"offline-manifest:{settings.JWT_SECRET}"
+    return Ed25519PrivateKey.from_private_bytes(hashlib.sha256(semilla.encode("utf-8")).digest())
+
+
+def clave_publica() -> dict:
+    """Clave pública (raw, base64) con la que los escáneres verifican."""
+    from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+    raw = _clave_privada().public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+    return {
+        "algoritmo": "Ed25519",
+        "claveId": hashlib.sha256(raw).hexdigest()[:16],
+        "clave": base64.b64encode(raw).decode("ascii"),
+    }
+
+
+def hash_dni(numero: str, dni: str) -> str:
+    return hashlib.sha256(f"{numero}:{dni}".encode("utf-8")).hexdigest()[:16]
+
+
+async def registrar(numero: str, accion: str) -> None:
+    """Anota un alta o baja para los deltas (llamar al emitir o eliminar)."""
+    await prisma.credentialmanifestentry.create(
+        data={"numero": numero_canonico(numero), "accion": accion}
+    )
+
+
+async def _version_actual() -> int:
+    rows = await prisma.query_raw(
+        """
+        SELECT COALESCE(MAX("version"), 0) AS version FROM "credential_manifest_log"
+        WHERE "created_at" <= LOCALTIMESTAMP - make_interval(secs => $1)
+        """,
+        settings.OFFLINE_MANIFEST_VERSION_LAG_SECONDS,
+    )
+    return int(rows[0]["version"])
+
+
+def _entradas(rows: list) -> dict:
+    return {r["numero"]: [hash_dni(r["numero"], r["dni"]), r["curso"], r["vence"]] for r in rows}
+
+
+def _firmar(payload: dict) -> dict:
+    manifiesto = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    firma = _clave_privada().sign(manifiesto.encode("utf-8"))
+    return {
+        "manifiesto": manifiesto,
+        "firma": base64.b64encode(firma).decode("ascii"),
+        **clave_publica(),
+    }
+
+
+async def _completo_firmado(version: int) -> dict:
+    global _completo
+    if _completo is not None and _completo[0] == version and time.monotonic() - _completo[1] < _COMPLETO_TTL_SECONDS:
+        return _completo[2]
+    rows = await prisma.query_raw(_SELECT)
+    respuesta = _firmar({
+        "tipo": "completo",
+        "version": version,
+        "desde": None,
+        "generado": int(time.time()),
+        "credenciales": _entradas(rows),
+        "bajas": [],
+    })
+    _completo = (version, time.monotonic(), respuesta)
+    return respuesta
+
+
+async def generar(desde: Optional[int] = None) -> dict:
+    """
+    Manifiesto firmado. Sin `desde` (o si `desde` no corresponde a esta base)
+    es el completo; si no, el delta desde esa versión.
+    """
+    # La versión se lee antes que las credenciales y va atrasada: lo que se
+    # emita en el medio o siga dentro de la ventana aparece también en el
+    # próximo delta (aplicarlo dos veces no cambia nada).
+    version = await _version_actual()
+    if desde is None or desde < 0 or desde > version:
+        return await _completo_firmado(version)
+
+    cambios = await prisma.query_raw(
+        """
+        SELECT DISTINCT ON ("numero") "numero", "accion"
+        FROM "credential_manifest_log"
+        WHERE "version" > $1 AND "version" <= $2
+        ORDER BY "numero", "version" DESC
+        """,
+        desde, version,
+    )
+    altas = {c["numero"] for c in cambios if c["accion"] == ALTA}
+    rows = await prisma.query_raw(
+        _SELECT + """
+        AND c."numero_canonico" IN (
+            SELECT "numero" FROM "credential_manifest_log" WHERE "version" > $1 AND "version" <= $2
+        )
+        """,
+        desde, version,
+    ) if altas else []
+    credenciales = {n: e for n, e in _entradas(rows).items() if n in altas}
+    # Bajas explícitas, y altas que ya no están (eliminadas o vencidas)
+    bajas = sorted({c["numero"] for c in cambios} - set(credenciales))
+    return _firmar({
+        "tipo": "delta",
+        "version": version,
+        "desde": desde,
+        "generado": int(time.time()),
+        "credenciales": credenciales,
+        "bajas": bajas,
+    })
+
+
+def verificar(respuesta: dict, clave: str) -> dict:
+    """
+    Lo que hace el escáner: verifica la firma con la clave pública (base64) y
+    devuelve el manifiesto parseado. ValueError si la firma no es válida.
+    """
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+
+    publica = Ed25519PublicKey.from_public_bytes(base64.b64decode(clave))
+    try:
+        publica.verify(base64.b64decode(respuesta["firma"]), respuesta["manifiesto"].encode("utf-8"))
+    except InvalidSignature:
+        raise ValueError("Firma del manifiesto inválida")
+    return json.loads(respuesta["manifiesto"])
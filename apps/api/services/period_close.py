@@ -0,0 +1,131 @@
+"""
+Cierre de períodos contables (mensual) y saldos a una fecha.
+
+Pedir el balance "al 31/03" obligaba a sumar todo ledger_entries hasta esa
+fecha. Al cerrar un mes se congela en account_balance_snapshots el Debe/Haber
+ACUMULADO de cada cuenta hasta el fin del mes (desde el primer asiento, no
+solo el movimiento del mes). Un balance a una fecha es entonces el último
+cierre anterior más un agregado SQL de los asientos posteriores a ese cierre.
+
+- Solo se cierran meses terminados; el cierre se calcula desde el cierre
+  anterior (si existe) más los asientos del medio.
+- Un mes cerrado no admite asientos nuevos ni borrados con fecha dentro de
+  él (verificar_abierto): si cambiara, los cierres dejarían de coincidir con
+  el mayor. Para corregirlo hay que reabrir, lo que borra ese cierre y los
+  posteriores.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+from core.database import prisma
+
+# Un período es un mes: "YYYY-MM"
+FORMATO_PERIODO = "%Y-%m"
+
+
+class PeriodoError(ValueError):
+    """Cierre inválido u operación sobre un período cerrado; el mensaje es para el usuario."""
+
+
+def fin_de_periodo(period: str) -> datetime:
+    """Primer instante del mes siguiente (límite exclusivo del período)."""
+    inicio = datetime.strptime(period, FORMATO_PERIODO)
+    return (inicio + timedelta(days=32)).replace(day=1)
+
+
+def limite_al(as_of: datetime) -> datetime:
+    """Límite exclusivo de un saldo "al" día `as_of` (incluye todo ese día)."""
+    return datetime(as_of.year, as_of.month, as_of.day) + timedelta(days=1)
+
+
+async def _movimientos(desde: Optional[datetime], hasta: datetime) -> dict[str, tuple[float, float]]:
+    """Debe/Haber por cuenta de los asientos con fecha en [desde, hasta)."""
+    params = [hasta.isoformat()]
+    condicion = 'j."date" < $1::timestamp'
+    if desde is not None:
+        params.append(desde.isoformat())
+        condicion += ' AND j."date" >= $2::timestamp'
+    rows = await prisma.query_raw(
+        f"""
+        SELECT le."account_id", COALESCE(SUM(le."debit"), 0) AS debit, COALESCE(SUM(le."credit"), 0) AS credit
+        FROM "ledger_entries" le JOIN "journal_entries" j ON j."id" = le."journal_id"
+        WHERE {condicion} AND le."account_id" IS NOT NULL
+        GROUP BY le."account_id"
+        """,
+        *params,
+    )
+    return {r["account_id"]: (float(r["debit"]), float(r["credit"])) for r in rows}
+
+
+async def _ultimo_cierre(hasta: datetime):
+    """Último cierre con fin de período <= `hasta`, o None."""
+    return await prisma.accountingperiod.find_first(
+        where={"periodEnd": {"lte": hasta}}, order={"periodEnd": "desc"}
+    )
+
+
+async def _acumulados(hasta: datetime) -> dict[str, tuple[float, float]]:
+    """Debe/Haber acumulado por cuenta de todo lo anterior a `hasta`."""
+    cierre = await _ultimo_cierre(hasta)
+    if cierre is None:
+        return await _movimientos(None, hasta)
+
+    snapshots = await prisma.accountbalancesnapshot.find_many(where={"periodId": cierre.id})
+    totales = {s.accountId: (s.debit, s.credit) for s in snapshots}
+    fin_cierre = cierre.periodEnd.replace(tzinfo=None)
+    if fin_cierre < hasta:
+        for account_id, (debit, credit) in (await _movimientos(fin_cierre, hasta)).items():
+            base_debit, base_credit = totales.get(account_id, (0.0, 0.0))
+            totales[account_id] = (base_debit + debit, base_credit + credit)
+    return totales
+
+
+async def saldos_al(as_of: datetime) -> dict[str, tuple[float, float]]:
+    """Debe/Haber acumulado por cuenta al cierre del día `as_of`."""
+    return await _acumulados(limite_al(as_of))
+
+
+async def cerrar_periodo(period: str, user_id: Optional[str] = None):
+    """Congela los saldos acumulados al fin de `period` ("YYYY-MM")."""
+    try:
+        fin = fin_de_periodo(period)
+    except ValueError:
+        raise PeriodoError("Período inválido. Debe ser YYYY-MM")
+    if fin > datetime.now():
+        raise PeriodoError(f"El período {period} todavía no terminó")
+    if await prisma.accountingperiod.find_unique(where={"period": period}):
+        raise PeriodoError(f"El período {period} ya está cerrado")
+
+    totales = await _acumulados(fin)
+    async with prisma.tx() as transaction:
+        cierre = await transaction.accountingperiod.create(
+            data={"period": period, "periodEnd": fin, "closedById": user_id}
+        )
+        if totales:
+            await transaction.accountbalancesnapshot.create_many(data=[
+                {"periodId": cierre.id, "accountId": account_id, "debit": debit, "credit": credit}
+                for account_id, (debit, credit) in totales.items()
+            ])
+    return cierre
+
+
+async def reabrir_periodo(period: str) -> int:
+    """Borra el cierre de `period` y los posteriores; devuelve cuántos borró."""
+    cierre = await prisma.accountingperiod.find_unique(where={"period": period})
+    if cierre is None:
+        return 0
+    # Los snapshots se borran en cascada
+    return await prisma.accountingperiod.delete_many(where={"periodEnd": {"gte": cierre.periodEnd}})
+
+
+async def listar_periodos() -> list:
+    return await prisma.accountingperiod.find_many(order={"periodEnd": "desc"})
+
+
+async def verificar_abierto(fecha: datetime) -> None:
+    """PeriodoError si `fecha` cae dentro de un período cerrado."""
+    ultimo = await prisma.accountingperiod.find_first(order={"periodEnd": "desc"})
+    if ultimo is not None and fecha.replace(tzinfo=None) < ultimo.periodEnd.replace(tzinfo=None):
+        raise PeriodoError(
+            f"La fecha {fecha:%d/%m/%Y} corresponde a un período cerrado (hasta {ultimo.period}). Reabra el período para modificarlo."
+        )
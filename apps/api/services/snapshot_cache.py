@@ -0,0 +1,111 @@
+"""
+Cache de "snapshots" de resultados caros (agregados del dashboard, etc.).
+
+Cada clave guarda el último valor calculado y cuándo se calculó. Mientras el
+valor tiene menos de ttl_seconds se devuelve tal cual; entre ttl_seconds y
+max_stale_seconds se devuelve el valor viejo y se recalcula en background;
+pasado max_stale_seconds (o si no hay valor) el request espera el cálculo.
+Hay un solo cálculo en curso por clave: los requests concurrentes esperan
+el mismo resultado en vez de lanzar la misma consulta N veces.
+
+El cache es por proceso y compartido por todas las sesiones del worker. El
+llamador recibe la edad del snapshot para poder mostrarla en la UI.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger("vmp-api.snapshots")
+
+
+@dataclass
+class Snapshot:
+    value: Any
+    generated_at: datetime
+    age_seconds: float
+
+
+class SnapshotCache:
+    def __init__(self, ttl_seconds: float, max_stale_seconds: float, clock=time.monotonic) -> None:
+        self._clock = clock
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        # key -> (value, generated_monotonic, generated_at)
+        self._entries: dict[str, tuple[Any, float, datetime]] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]], force: bool = False) -> Snapshot:
+        entry = self._entries.get(key)
+        now = self._clock()
+
+        if entry is not None and not force:
+            value, generated, generated_at = entry
+            age = now - generated
+            if age < self.ttl_seconds:
+                self.hits += 1
+                return Snapshot(value, generated_at, age)
+            if age < self.max_stale_seconds:
+                self.stale_hits += 1
+                self._refresh(key, loader)
+                return Snapshot(value, generated_at, age)
+
+        self.misses += 1
+        # shield: si este request se cancela (cliente desconectado) la carga
+        # compartida sigue para los demás que la esperan. Se usa el resultado
+        # de la tarea y no _entries, que un invalidate() pudo vaciar.
+        value, generated, generated_at = await asyncio.shield(self._refresh(key, loader))
+        return Snapshot(value, generated_at, self._clock() - generated)
+
+    def _refresh(self, key: str, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader))
+            # Una sola vez por tarea: los stale hits que llegan mientras corre la reutilizan
+            task.add_done_callback(self._log_background_error)
+            self._inflight[key] = task
+        return task
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> tuple[Any, float, datetime]:
+        try:
+            value = await loader()
+            entry = (value, self._clock(), datetime.utcnow())
+            self._entries[key] = entry
+            return entry
+        finally:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def _log_background_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"No se pudo refrescar el snapshot: {task.exception()}")
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        now = self._clock()
+        return {
+            "keys": len(self._entries),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "oldest_age_seconds": round(max((now - e[1] for e in self._entries.values()), default=0), 1),
+        }
+
+
+def snapshot_meta(snapshot: Snapshot) -> dict:
+    """Bloque "snapshot" que se agrega a las respuestas cacheadas"""
+    return {
+        "generatedAt": snapshot.generated_at.isoformat() + "Z",
+        "ageSeconds": round(snapshot.age_seconds, 1),
+    }
@@ -49,6 +49,11 @@ def _public_base_url() -> str:
     return base.rstrip("/")
 
 
+def public_url(key: str) -> str:
+    """URL pública que tendrá (o tiene) el objeto `key` en el bucket."""
+    return f"{_public_base_url()}/{key}"
+
+
 def upload_bytes(data: bytes, key: str, content_type: str) -> str:
     """Sube un archivo al bucket configurado y devuelve su URL pública."""
     if not is_configured():
@@ -64,7 +69,7 @@ def upload_bytes(data: bytes, key: str, content_type: str) -> str:
         Body=data,
         ContentType=content_type,
     )
-    return f"{_public_base_url()}/{key}"
+    return public_url(key)
 
 
 def delete_by_url(url: str) -> bool:
@@ -0,0 +1,67 @@
+"""
+Tests del resolvedor de cuentas contables en memoria.
+"""
+from types import SimpleNamespace
+import pytest
+from services import account_resolver as resolver_module
+from services.account_resolver import AccountResolver
+
+
+class FakeAccountModel:
+    def __init__(self, codes):
+        self.rows = {c: SimpleNamespace(id=f"id-{c}", code=c) for c in codes}
+        self.calls = 0
+
+    async def find_many(self):
+        self.calls += 1
+        return list(self.rows.values())
+
+    async def find_unique(self, where):
+        self.calls += 1
+        return self.rows.get(where["code"])
+
+    async def upsert(self, where, data):
+        self.calls += 1
+        return self.rows.setdefault(where["code"], SimpleNamespace(id=f"id-{where['code']}", **data["create"]))
+
+
+@pytest.fixture
+def accounts(monkeypatch):
+    model = FakeAccountModel(["4.1.01", "2.1.05", "1.1.01", "1.1.02"])
+    monkeypatch.setattr(resolver_module, "prisma", SimpleNamespace(account=model))
+    return model
+
+
+@pytest.mark.asyncio
+class TestAccountResolver:
+    async def test_un_solo_viaje_para_varios_codigos(self, accounts):
+        """Los códigos de una venta se resuelven con una única carga del plan"""
+        resolver = AccountResolver(ttl_seconds=60)
+        for _ in range(3):
+            for code in ("4.1.01", "2.1.05", "1.1.01"):
+                assert (await resolver.get(code)).id == f"id-{code}"
+        assert accounts.calls == 1
+
+    async def test_invalidate_recarga(self, accounts):
+        """Después de crear una cuenta la próxima resolución la ve"""
+        resolver = AccountResolver(ttl_seconds=60)
+        await resolver.get("4.1.01")
+        accounts.rows["5.1.02"] = SimpleNamespace(id="id-5.1.02", code="5.1.02")
+        resolver.invalidate()
+        assert (await resolver.get("5.1.02")).id == "id-5.1.02"
+        assert accounts.calls == 2
+
+    async def test_ensure_crea_una_sola_vez(self, accounts):
+        """La cuenta de retenciones faltante se crea la primera vez y queda en memoria"""
+        resolver = AccountResolver(ttl_seconds=60)
+        datos = {"name": "Retenciones IVA a Pagar", "type": "LIABILITY"}
+        primera = await resolver.ensure("2.1.08", datos)
+        llamadas = accounts.calls
+        segunda = await resolver.ensure("2.1.08", datos)
+        assert primera is segunda
+        assert accounts.calls == llamadas
+
+    async def test_faltante_no_se_inventa(self, accounts):
+        """Un código inexistente devuelve None"""
+        resolver = AccountResolver(ttl_seconds=60)
+        assert await resolver.get("9.9.99") is None
@@ -0,0 +1,106 @@
+"""
+Tests de los totales acumulados por cuenta (services/ledger_service.py).
+"""
+from types import SimpleNamespace
+import pytest
+from services import ledger_service
+
+
+class FakeAccounts:
+    """Imita transaction.account.update con increments"""
+
+    def __init__(self):
+        self.totals = {}
+
+    async def update(self, where, data):
+        debit, credit = self.totals.get(where["id"], (0.0, 0.0))
+        self.totals[where["id"]] = (
+            debit + data["debitTotal"]["increment"],
+            credit + data["creditTotal"]["increment"],
+        )
+
+
+@pytest.mark.asyncio
+class TestAccountTotals:
+    async def test_aplicar_agrupa_por_cuenta(self):
+        """Varias partidas de la misma cuenta se aplican en un solo update"""
+        transaction = SimpleNamespace(account=FakeAccounts())
+        entries = [
+            {"accountId": "caja", "debit": 121.0, "credit": 0},
+            {"accountId": "ventas", "debit": 0, "credit": 100.0},
+            {"accountId": "iva", "debit": 0, "credit": 21.0},
+            {"accountId": "caja", "debit": 5.0, "credit": 0},
+        ]
+        await ledger_service.aplicar_movimientos(transaction, entries)
+        assert transaction.account.totals == {
+            "caja": (126.0, 0.0),
+            "ventas": (0.0, 100.0),
+            "iva": (0.0, 21.0),
+        }
+
+    async def test_eliminar_revierte(self):
+        """Aplicar y luego restar las mismas partidas deja los totales en cero"""
+        transaction = SimpleNamespace(account=FakeAccounts())
+        guardadas = [
+            SimpleNamespace(accountId="caja", debit=50.0, credit=0.0),
+            SimpleNamespace(accountId="proveedores", debit=0.0, credit=50.0),
+        ]
+        await ledger_service.aplicar_movimientos(transaction, guardadas)
+        await ledger_service.aplicar_movimientos(transaction, guardadas, signo=-1)
+        assert transaction.account.totals == {"caja": (0.0, 0.0), "proveedores": (0.0, 0.0)}
+
+    async def test_saldo_segun_naturaleza(self):
+        """Activo y gasto son deudoras; el resto, acreedoras"""
+        assert ledger_service.saldo("ASSET", 100, 30) == 70
+        assert ledger_service.saldo("EXPENSE", 10, 0) == 10
+        assert ledger_service.saldo("LIABILITY", 10, 40) == 30
+        assert ledger_service.saldo("INCOME", 0, 25) == 25
+
+
+class FakeLedgerPrisma:
+    """query_raw falso: primero la página, después los saldos"""
+
+    def __init__(self, filas, totales):
+        self.respuestas = {"SELECT le": filas, "COALESCE": [totales]}
+        self.queries = []
+
+    async def query_raw(self, sql, *params):
+        self.queries.append((sql, params))
+        return next(v for k, v in self.respuestas.items() if k in sql)
+
+
+@pytest.mark.asyncio
+class TestLibroMayor:
+    def _fila(self, id, debit, credit):
+        return {
+            "id": id, "date": "2026-03-01T00:00:00", "concept": "Cobro", "reference": None,
+            "type": "GENERAL", "description": None, "debit": debit, "credit": credit,
+        }
+
+    async def test_saldo_corrido_parte_del_saldo_anterior(self, monkeypatch):
+        """La página arranca del saldo de apertura y trae el cursor siguiente"""
+        fake = FakeLedgerPrisma(
+            [self._fila("a", 100, 0), self._fila("b", 0, 30), self._fila("c", 5, 0)],
+            {"opening_debit": 1000, "opening_credit": 400, "closing_debit": 1500,
+             "closing_credit": 500, "cursor_found": 1},
+        )
+        monkeypatch.setattr(ledger_service, "prisma", fake)
+        account = SimpleNamespace(id="caja", type="ASSET")
+
+        mayor = await ledger_service.libro_mayor(account, cursor="z", limit=2)
+
+        assert mayor["openingBalance"] == 600
+        assert [e["balance"] for e in mayor["entries"]] == [700, 670]
+        assert mayor["nextCursor"] == "b"
+        assert mayor["balance"] == 1000
+        # Se pide una fila de más para saber si hay otra página
+        pagina_sql, pagina_params = fake.queries[0]
+        assert pagina_params[-1] == 3 and "ORDER BY" in pagina_sql
+
+    async def test_cursor_inexistente(self, monkeypatch):
+        """Un cursor que no es de la cuenta se rechaza"""
+        fake = FakeLedgerPrisma([], {"opening_debit": 0, "opening_credit": 0, "closing_debit": 0,
+                                     "closing_credit": 0, "cursor_found": 0})
+        monkeypatch.setattr(ledger_service, "prisma", fake)
+        with pytest.raises(ValueError):
+            await ledger_service.libro_mayor(SimpleNamespace(id="caja", type="ASSET"), cursor="otro")
@@ -0,0 +1,71 @@
+"""
+Tests de la exportación del libro diario por streaming (services/accounting_export.py).
+"""
+import io
+import zipfile
+from xml.etree import ElementTree
+import pytest
+from core.config import settings
+from services import accounting_export
+
+
+def _partida(n, debit=0.0, credit=0.0):
+    return {
+        "journal_id": f"j{n // 2}", "date": f"2026-03-0{n // 2 + 1}T10:00:00.000Z",
+        "concept": f"Asiento {n // 2}", "reference": None,
+        "entry_id": f"e{n}", "description": "Mov; con \"comillas\" & <xml>",
+        "debit": debit, "credit": credit,
+        "account_code": "1.1.01", "account_name": "Caja",
+    }
+
+
+class FakeExportPrisma:
+    """query_raw falso que pagina una lista fija respetando el LIMIT"""
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.queries = []
+
+    async def query_raw(self, sql, *params):
+        self.queries.append(params)
+        inicio = 0
+        if len(params) > 1:  # con cursor: (fecha, asiento, partida, limit)
+            inicio = next(i for i, f in enumerate(self.filas) if f["entry_id"] == params[-2]) + 1
+        return self.filas[inicio:inicio + params[-1]]
+
+
+@pytest.fixture
+def filas(monkeypatch):
+    monkeypatch.setattr(settings, "ACCOUNTING_EXPORT_BATCH_SIZE", 2)
+    data = [_partida(0, debit=121.5), _partida(1, credit=121.5), _partida(2, debit=10.0)]
+    fake = FakeExportPrisma(data)
+    monkeypatch.setattr(accounting_export, "prisma", fake)
+    return fake
+
+
+@pytest.mark.asyncio
+class TestExportDiario:
+    async def test_csv_por_lotes(self, filas):
+        """Un chunk por lote y el cursor de keyset es la última partida del lote anterior"""
+        chunks = [c async for c in accounting_export.diario_csv()]
+        assert len(chunks) == 3  # cabecera + 2 lotes
+        texto = b"".join(chunks).decode("utf-8")
+        assert texto.startswith("\ufeff\"Fecha\";")
+        lineas = texto.strip().split("\n")
+        assert len(lineas) == 4
+        assert lineas[1].startswith('"01/03/2026";"Asiento 0"')
+        assert lineas[1].endswith('"121,50";""')
+        assert filas.queries[1][:3] == ("2026-03-01T10:00:00.000Z", "j0", "e1")
+
+    async def test_xlsx_valido(self, filas):
+        """El XLSX generado por partes es un ZIP con una hoja XML bien formada"""
+        contenido = b"".join([c async for c in accounting_export.diario_xlsx()])
+        with zipfile.ZipFile(io.BytesIO(contenido)) as zf:
+            assert zf.testzip() is None
+            hoja = ElementTree.fromstring(zf.read("xl/worksheets/sheet1.xml"))
+        ns = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+        rows = hoja.findall(".//s:row", ns)
+        assert len(rows) == 4
+        celdas = rows[1].findall("s:c", ns)
+        assert celdas[5].find(".//s:t", ns).text == "Mov; con \"comillas\" & <xml>"
+        assert celdas[6].find("s:v", ns).text == "121.5"
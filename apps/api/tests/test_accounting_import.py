@@ -0,0 +1,132 @@
+"""
+Tests de la importación masiva de ventas y compras.
+"""
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+import pytest
+from services import accounting_import, account_resolver as resolver_module
+from services.account_resolver import account_resolver
+
+
+CODIGOS = ["1.1.01", "1.1.02", "1.1.05", "2.1.05", "4.1.01", "5.1.01", "5.1.02"]
+
+
+class FakeModel:
+    def __init__(self, rows=None):
+        self.rows = rows or []
+        self.created = []
+        self.create_many_calls = 0
+
+    async def find_many(self, where=None):
+        if not where:
+            return self.rows
+        (campo, filtro), = where.items()
+        return [r for r in self.rows if getattr(r, campo) in filtro["in"]]
+
+    async def create_many(self, data):
+        self.create_many_calls += 1
+        self.created.extend(data)
+        return len(data)
+
+    async def update(self, where, data):
+        self.created.append((where, data))
+
+
+class FakePrisma:
+    def __init__(self):
+        self.account = FakeModel([SimpleNamespace(id=f"id-{c}", code=c) for c in CODIGOS])
+        self.venta = FakeModel([SimpleNamespace(numero="0001-00000001")])
+        self.company = FakeModel([SimpleNamespace(id="emp-1", nombre="Acme")])
+        self.compra = FakeModel()
+        self.ventaitem = FakeModel()
+        self.compraitem = FakeModel()
+        self.journalentry = FakeModel()
+        self.ledgerentry = FakeModel()
+        self.transactions = 0
+
+    @asynccontextmanager
+    async def tx(self):
+        self.transactions += 1
+        yield self
+
+
+@pytest.fixture
+def fake_prisma(monkeypatch):
+    fake = FakePrisma()
+    monkeypatch.setattr(accounting_import, "prisma", fake)
+    monkeypatch.setattr(resolver_module, "prisma", fake)
+    monkeypatch.setattr(accounting_import.settings, "ACCOUNTING_IMPORT_CHUNK_SIZE", 2)
+    account_resolver.invalidate()
+    yield fake
+    account_resolver.invalidate()
+
+
+class TestLecturaArchivo:
+    def test_csv_agrupa_items_por_numero(self):
+        """Las filas con el mismo número son un comprobante; acepta ; y coma decimal"""
+        csv_text = (
+            "numero;companyId;subtotal;iva;total;item_descripcion;item_cantidad;item_precioUnit\n"
+            "0001-00000010;emp-1;1.000,00;210,00;1.210,00;Curso A;2;300,00\n"
+            "0001-00000010;;;;;Curso B;1;400,00\n"
+            "0001-00000011;emp-1;500;105;605;;;\n"
+        )
+        docs = accounting_import.leer_archivo("ventas", "ventas.csv", csv_text.encode())
+        assert len(docs) == 2
+        assert docs[0]["subtotal"] == "1000.00"
+        assert [i["descripcion"] for i in docs[0]["items"]] == ["Curso A", "Curso B"]
+        assert docs[0]["items"][0]["subtotal"] == "600.0"
+        # Sin columnas de ítem se genera uno por el subtotal
+        assert docs[1]["items"][0]["subtotal"] == "500"
+
+    def test_json_y_limite(self, monkeypatch):
+        """Acepta {"compras": [...]} y rechaza archivos por encima del máximo"""
+        docs = accounting_import.leer_archivo("compras", "c.json", b'{"compras": [{"proveedor": "X"}]}')
+        assert docs == [{"proveedor": "X"}]
+        monkeypatch.setattr(accounting_import.settings, "ACCOUNTING_IMPORT_MAX_DOCUMENTS", 1)
+        with pytest.raises(accounting_import.ImportFormatError):
+            accounting_import.leer_archivo("compras", "c.json", b'[{}, {}]')
+
+
+def _venta(numero, company="emp-1"):
+    return {
+        "numero": numero, "companyId": company, "subtotal": 100, "iva": 21, "total": 121,
+        "items": [{"descripcion": "Curso", "cantidad": 1, "precioUnit": 100, "subtotal": 100}],
+    }
+
+
+@pytest.mark.asyncio
+class TestImportacionVentas:
+    async def test_valida_todo_antes_de_escribir(self, fake_prisma):
+        """Repetidos, ya cargados, empresas inexistentes y esquema se informan por fila"""
+        docs = [
+            _venta("0001-00000020"),
+            _venta("0001-00000020"),
+            _venta("0001-00000001"),
+            _venta("0001-00000021", company="no-existe"),
+            {"numero": "0001-00000022"},
+        ]
+        comprobantes = await accounting_import.validar("ventas", docs)
+        errores = [c.error for c in comprobantes]
+        assert errores[0] is None
+        assert "repetido" in errores[1]
+        assert "ya está registrada" in errores[2]
+        assert "no existe" in errores[3]
+        assert "companyId" in errores[4]
+        assert fake_prisma.transactions == 0
+
+    async def test_registra_en_lotes(self, fake_prisma):
+        """5 ventas con lotes de 2 son 3 transacciones con escrituras en bloque"""
+        docs = [_venta(f"0001-0000010{i}") for i in range(5)]
+        comprobantes = await accounting_import.validar("ventas", docs)
+        creados = await accounting_import.registrar("ventas", comprobantes)
+
+        assert len(creados) == 5
+        assert fake_prisma.transactions == 3
+        assert fake_prisma.venta.create_many_calls == 3
+        assert len(fake_prisma.journalentry.created) == 5
+        # Cobro, venta e IVA por comprobante, todas ligadas a su asiento
+        assert len(fake_prisma.ledgerentry.created) == 15
+        journal_ids = {j["id"] for j in fake_prisma.journalentry.created}
+        assert {e["journalId"] for e in fake_prisma.ledgerentry.created} == journal_ids
+        # Totales del mayor: un update por cuenta y por lote
+        assert len(fake_prisma.account.created) == 9
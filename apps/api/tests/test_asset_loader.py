@@ -0,0 +1,80 @@
+"""
+Tests del cache de fotos y firmas de credenciales (services/asset_loader.py).
+"""
+import asyncio
+import httpx
+import pytest
+from services.asset_loader import AssetLoader
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _loader(handler, tmp_path=None, max_bytes=1024, clock=None):
+    loader = AssetLoader(max_bytes=max_bytes, ttl_seconds=60, disk_dir=str(tmp_path or ""), clock=clock or Clock())
+    loader._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return loader
+
+
+@pytest.mark.asyncio
+class TestAssetLoader:
+    async def test_una_descarga_para_pedidos_simultaneos(self):
+        """Un lote que pide la misma firma 50 veces la baja una sola vez"""
+        requests = []
+
+        async def handler(request):
+            requests.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, content=b"firma", headers={"etag": '"v1"'})
+
+        loader = _loader(handler)
+        firmas = await asyncio.gather(*(loader.get("https://s3/firma.png") for _ in range(50)))
+        assert firmas == [b"firma"] * 50
+        assert len(requests) == 1
+        assert await loader.get("https://s3/firma.png") == b"firma"
+        assert len(requests) == 1 and loader.hits == 1
+
+    async def test_revalida_con_etag(self):
+        """Vencido el TTL se pregunta con If-None-Match y un 304 reutiliza los bytes"""
+        clock = Clock()
+        vistos = []
+
+        def handler(request):
+            vistos.append(request.headers.get("if-none-match"))
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, content=b"foto", headers={"etag": '"v1"'})
+
+        loader = _loader(handler, clock=clock)
+        assert await loader.get("https://s3/foto.jpg") == b"foto"
+        clock.now = 120
+        assert await loader.get("https://s3/foto.jpg") == b"foto"
+        assert vistos == [None, '"v1"'] and loader.revalidated == 1
+
+    async def test_lru_por_tamanio(self):
+        loader = _loader(lambda request: httpx.Response(200, content=b"x" * 400), max_bytes=1000)
+        for n in range(3):
+            await loader.get(f"https://s3/{n}.png")
+        assert loader.stats()["entries"] == 2 and loader.stats()["bytes"] == 800
+        assert loader.evictions == 1
+
+    async def test_error_devuelve_none(self):
+        loader = _loader(lambda request: httpx.Response(404))
+        assert await loader.get("https://s3/no-existe.png") is None
+        assert await loader.get(None) is None
+
+    async def test_copia_en_disco(self, tmp_path):
+        """La copia en disco sobrevive al proceso y se usa si el storage no responde"""
+        await _loader(lambda request: httpx.Response(200, content=b"firma"), tmp_path).get("https://s3/f.png")
+
+        def caido(request):
+            raise httpx.ConnectError("sin red")
+
+        nuevo = _loader(caido, tmp_path)
+        assert await nuevo.get("https://s3/f.png") == b"firma"
+        assert nuevo.disk_hits == 1
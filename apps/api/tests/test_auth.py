@@ -96,3 +96,101 @@ class TestAuth:
         assert response.status_code == 200
         data = response.json()
         assert "message" in data
+
+
+class TestPasswordRehash:
+    """Costo de bcrypt y rehash transparente en el login"""
+
+    def test_hash_rounds(self):
+        """Se lee el costo del prefijo del hash"""
+        from auth.jwt import hash_rounds
+
+        assert hash_rounds("$2b$12$" + "a" * 53) == 12
+        assert hash_rounds("no-es-bcrypt") is None
+
+    def test_needs_rehash_on_any_other_cost(self, monkeypatch):
+        """Se rehashean los hashes con otro costo, más alto o más bajo"""
+        from auth import jwt as auth_jwt
+
+        monkeypatch.setattr(auth_jwt, "_bcrypt_rounds", 11)
+        assert auth_jwt.needs_rehash("$2b$10$" + "a" * 53)
+        assert not auth_jwt.needs_rehash("$2b$11$" + "a" * 53)
+        assert auth_jwt.needs_rehash("$2b$12$" + "a" * 53)
+
+    @pytest.mark.asyncio
+    async def test_workers_share_one_calibration(self, monkeypatch):
+        """El primer worker calibra y guarda el costo; los demás usan ese aunque midan otro"""
+        from auth import jwt as auth_jwt
+
+        class FakeDB:
+            rounds = None
+
+            async def query_raw(self, sql):
+                return [{"rounds": self.rounds}] if self.rounds is not None else []
+
+            async def execute_raw(self, sql, rounds):
+                if self.rounds is None:  # ON CONFLICT DO NOTHING
+                    self.rounds = rounds
+
+        db = FakeDB()
+        monkeypatch.setattr(auth_jwt, "_bcrypt_rounds", 12)
+        assert await auth_jwt.use_shared_bcrypt_rounds(db, 0, 4, 6) == 4
+        assert await auth_jwt.use_shared_bcrypt_rounds(db, 10_000, 4, 6) == 4
+        assert auth_jwt.get_bcrypt_rounds() == 4
+
+    @pytest.mark.asyncio
+    async def test_shared_calibration_unavailable_keeps_configured(self, monkeypatch):
+        """Sin la tabla se queda con BCRYPT_ROUNDS, no con una medición propia"""
+        from auth import jwt as auth_jwt
+
+        class SinTabla:
+            async def query_raw(self, sql):
+                raise RuntimeError('relation "bcrypt_calibration" does not exist')
+
+        monkeypatch.setattr(auth_jwt, "_bcrypt_rounds", 12)
+        assert await auth_jwt.use_shared_bcrypt_rounds(SinTabla(), 0, 4, 6) == 12
+
+    def test_calibrate_respects_bounds(self):
+        """La calibración nunca sale del rango MIN..MAX"""
+        from auth import jwt as auth_jwt
+
+        original = auth_jwt.get_bcrypt_rounds()
+        try:
+            assert auth_jwt.calibrate_bcrypt_rounds(0, 4, 6) == 4
+            assert auth_jwt.calibrate_bcrypt_rounds(10_000, 4, 6) == 6
+        finally:
+            auth_jwt._bcrypt_rounds = original
+
+    @pytest.mark.asyncio
+    async def test_login_rehashes_old_cost(self, client: AsyncClient, test_user):
+        """Un hash con otro costo se regenera con el costo actual tras el login"""
+        import bcrypt
+        from auth.jwt import get_bcrypt_rounds, hash_rounds
+        from core.database import prisma
+
+        old_hash = bcrypt.hashpw(b"testpass123", bcrypt.gensalt(rounds=4)).decode()
+        await prisma.user.update(where={"id": test_user.id}, data={"passwordHash": old_hash})
+
+        response = await client.post(
+            "/api/auth/login",
+            json={"email": "test@example.com", "password": "testpass123"}
+        )
+        assert response.status_code == 200
+
+        user = await prisma.user.find_unique(where={"id": test_user.id})
+        assert hash_rounds(user.passwordHash) == get_bcrypt_rounds()
+
+    @pytest.mark.asyncio
+    async def test_rehash_does_not_overwrite_password_change(self, db, test_user):
+        """Si la contraseña cambió entre el login y el rehash, el rehash no la pisa"""
+        import bcrypt
+        from routers.auth import _rehash_password
+
+        old_hash = bcrypt.hashpw(b"testpass123", bcrypt.gensalt(rounds=4)).decode()
+        new_hash = bcrypt.hashpw(b"otra-clave", bcrypt.gensalt(rounds=4)).decode()
+        await db.user.update(where={"id": test_user.id}, data={"passwordHash": new_hash})
+
+        await _rehash_password(test_user.id, old_hash, "testpass123")
+
+        user = await db.user.find_unique(where={"id": test_user.id})
+        assert user.passwordHash == new_hash
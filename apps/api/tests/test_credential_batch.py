@@ -0,0 +1,124 @@
+"""
+Tests de la emisión de credenciales en lote (services/credential_batch.py).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import pytest
+from services import credential_batch, credential_service
+
+
+def _alumno(n, empresa="Transportes Sur"):
+    return SimpleNamespace(
+        id=f"a{n}", nombre=f"Chofer{n}", apellido="Test", dni=f"{n}", puesto=None,
+        email=f"a{n}@x.com", telefono=None, empresa=SimpleNamespace(nombre=empresa),
+    )
+
+
+class FakeModel:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.calls = []
+
+    async def find_many(self, where, include=None):
+        self.calls.append(where)
+        return self.rows
+
+
+class FakeJobs:
+    def __init__(self):
+        self.updates = []
+
+    async def update(self, where, data):
+        self.updates.append(data)
+
+
+class FakeCredenciales(FakeModel):
+    def __init__(self, rows=()):
+        super().__init__(rows)
+        self.created = []
+
+    async def create(self, data):
+        self.created.append(data)
+        return SimpleNamespace(id=f"c{len(self.created)}", numero=data["numero"], fechaEmision=data["fechaEmision"])
+
+
+class FakeNumeros:
+    def __init__(self):
+        self.n = 0
+
+    async def numero(self, year):
+        self.n += 1
+        return f"VMP-{year}-{self.n:05d}"
+
+
+@pytest.fixture
+def lote(monkeypatch):
+    alumnos = [_alumno(n) for n in range(1, 5)]
+    fake = SimpleNamespace(
+        curso=SimpleNamespace(find_unique=_async(SimpleNamespace(id="curso1", nombre="Manejo", codigo="MD-1", vigenciaMeses=12))),
+        inscripcion=FakeModel([SimpleNamespace(alumno=a) for a in alumnos]),
+        credencial=FakeCredenciales([SimpleNamespace(alumnoId="a2", numero="VMP-2025-00007")]),
+        fotocredencial=FakeModel([SimpleNamespace(alumnoId="a1", fotoUrl="https://s3/foto-a1.jpg")]),
+        credentialbatchjob=FakeJobs(),
+    )
+    monkeypatch.setattr(credential_batch, "prisma", fake)
+    monkeypatch.setattr(credential_service, "prisma", SimpleNamespace(user=SimpleNamespace(find_unique=_async(None))))
+    monkeypatch.setattr(credential_batch, "Json", lambda value: value)
+    monkeypatch.setattr(credential_batch, "credential_numbers", FakeNumeros())
+    monkeypatch.setattr(credential_batch.metric_rollups, "record", _async(None))
+    monkeypatch.setattr(credential_batch, "emit", _async(None))
+    monkeypatch.setattr(credential_batch.offline_manifest, "registrar", _async(None))
+
+    descargas = []
+    async def get(url, label):
+        descargas.append(url)
+        return b"img" if url else None
+
+    monkeypatch.setattr(credential_batch, "asset_loader", SimpleNamespace(get=get))
+    monkeypatch.setattr(credential_batch, "render_credencial_pdf", lambda data, foto, firma: f"{data['numero_credencial']}:{foto}".encode())
+
+    def upload(data, key, content_type):
+        if b"-00003:" in data:
+            raise RuntimeError("S3 caído")
+        return f"https://s3/{key}"
+
+    monkeypatch.setattr(credential_batch.storage_service, "upload_bytes", upload)
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(credential_batch, "_get_process_pool", lambda: pool)
+    yield fake, descargas
+    pool.shutdown()
+
+
+def _async(value):
+    async def fn(*args, **kwargs):
+        return value
+    return fn
+
+
+@pytest.mark.asyncio
+class TestLoteCredenciales:
+    async def test_emite_omite_y_sigue_ante_errores(self, lote):
+        """Se omiten las ya emitidas y un alumno que falla no corta el lote"""
+        fake, descargas = lote
+        emisor = SimpleNamespace(id="instr", email="instr@x.com")
+        await credential_batch._procesar("job1", "curso1", None, emisor)
+
+        final = fake.credentialbatchjob.updates[-1]
+        assert final["status"] == credential_batch.DONE
+        assert (final["emitidas"], final["omitidas"], final["fallidas"]) == (2, 1, 1)
+        estados = {r["alumnoId"]: r["estado"] for r in final["resultados"]}
+        assert estados["a2"] == "OMITIDA"
+        assert sorted(estados.values()) == ["EMITIDA", "EMITIDA", "ERROR", "OMITIDA"]
+
+        # Las credenciales se guardan firmadas y con su PDF por contenido
+        assert all(c["firmaCriptografica"] for c in fake.credencial.created)
+        assert all(c["pdfUrl"] == f"https://s3/credenciales-pdf/{c['pdfHash']}.pdf" for c in fake.credencial.created)
+        # Prefetch: una consulta de credenciales y una de fotos para todo el lote
+        assert len(fake.credencial.calls) == 1 and len(fake.fotocredencial.calls) == 1
+        assert "https://s3/foto-a1.jpg" in descargas
+
+    async def test_curso_inexistente(self, lote):
+        fake, _ = lote
+        fake.curso.find_unique = _async(None)
+        await credential_batch._procesar("job1", "nope", None, SimpleNamespace(id="x", email="x"))
+        assert fake.credentialbatchjob.updates[-1]["status"] == credential_batch.FAILED
@@ -0,0 +1,77 @@
+"""
+Tests de la numeración de credenciales (services/credential_numbering.py).
+"""
+import asyncio
+import pytest
+from services import credential_numbering
+from services.credential_numbering import CredentialNumberAllocator, numero_canonico
+
+
+class FakeSequences:
+    """Imita la fila de credential_sequences con UPDATE/INSERT ... RETURNING"""
+
+    def __init__(self, emitidos_por_anio=None):
+        self.rows = {}
+        self.emitidos = emitidos_por_anio or {}
+        self.queries = 0
+
+    async def query_raw(self, sql, year, cantidad):
+        self.queries += 1
+        await asyncio.sleep(0)  # cede el loop como una consulta real
+        if sql.lstrip().startswith("UPDATE"):
+            if year not in self.rows:
+                return []
+            self.rows[year] += cantidad
+        else:
+            self.rows[year] = self.rows.get(year, self.emitidos.get(year, 0)) + cantidad
+        return [{"last_value": self.rows[year]}]
+
+
+@pytest.mark.asyncio
+class TestCredentialNumbers:
+    async def test_concurrentes_sin_repetir(self, monkeypatch):
+        """Emisiones simultáneas reciben números distintos y correlativos"""
+        monkeypatch.setattr(credential_numbering, "prisma", FakeSequences())
+        numeros = CredentialNumberAllocator()
+        obtenidos = await asyncio.gather(*(numeros.numero(2026) for _ in range(20)))
+        assert sorted(obtenidos) == [f"VMP-2026-{n:05d}" for n in range(1, 21)]
+
+    async def test_continua_desde_lo_emitido(self, monkeypatch):
+        """La primera reserva del año parte del mayor número ya emitido"""
+        monkeypatch.setattr(credential_numbering, "prisma", FakeSequences({2026: 891}))
+        numeros = CredentialNumberAllocator()
+        assert await numeros.numero(2026) == "VMP-2026-00892"
+        assert await numeros.numero(2027) == "VMP-2027-00001"
+
+    async def test_bloques_por_worker(self, monkeypatch):
+        """Con bloques, cada worker reserva una vez cada N números y no se pisan"""
+        fake = FakeSequences()
+        monkeypatch.setattr(credential_numbering, "prisma", fake)
+        worker_a, worker_b = CredentialNumberAllocator(block_size=10), CredentialNumberAllocator(block_size=10)
+
+        a = [await worker_a.siguiente(2026) for _ in range(3)]
+        b = [await worker_b.siguiente(2026) for _ in range(3)]
+        a += [await worker_a.siguiente(2026) for _ in range(9)]
+        assert a == list(range(1, 11)) + [21, 22]
+        assert b == [11, 12, 13]
+        assert not set(a) & set(b)
+        assert worker_a.reservas == 2 and worker_b.reservas == 1
+
+
+class TestNumeroCanonico:
+    @pytest.mark.parametrize("tipeado", [
+        "VMP-2026-01294", "VMP-2026-1294", "vmp 2026 01294", "VMP2026-1294",
+        "BLT-RT/1294", "BLT-RT-1294", "BLT-RT1294", "1294", " 01294 ",
+    ])
+    def test_mismo_numero_misma_clave(self, tipeado):
+        """Cualquier forma de tipear el número da la misma clave de búsqueda"""
+        assert numero_canonico(tipeado) == "VMP-2026-01294"
+
+    def test_respeta_el_anio(self):
+        """El año no queda fijo en 2026"""
+        assert numero_canonico("VMP-2027-1") == "VMP-2027-00001"
+        assert numero_canonico("VMP-2025-00001") != numero_canonico("VMP-2026-00001")
+
+    def test_otros_formatos_tal_cual(self):
+        """Números con otro formato se comparan en mayúsculas y sin espacios"""
+        assert numero_canonico("vmp-2026-test001") == "VMP-2026-TEST001"
@@ -0,0 +1,175 @@
+"""
+Tests de los PDFs de credenciales por contenido (services/credential_pdf.py).
+"""
+import asyncio
+from types import SimpleNamespace
+import pytest
+from services import credential_pdf
+
+DATOS = {"numero_credencial": "VMP-2026-00001", "alumno_nombre": "Juan Pérez", "instructor_firma_url": "https://s3/firma.png"}
+
+
+class FakeCredenciales:
+    def __init__(self):
+        self.updates = []
+
+    async def update(self, where, data):
+        self.updates.append(data)
+
+
+@pytest.fixture
+def entorno(monkeypatch):
+    imagenes = {"https://s3/foto.jpg": b"foto", "https://s3/firma.png": b"firma"}
+    renders, subidas = [], []
+
+    async def get(url, label):
+        return imagenes.get(url)
+
+    def render(datos, foto, firma):
+        renders.append(datos["numero_credencial"])
+        return b"%PDF"
+
+    def upload(data, key, content_type):
+        subidas.append(key)
+        return f"https://s3/{key}"
+
+    fake = FakeCredenciales()
+    monkeypatch.setattr(credential_pdf, "prisma", SimpleNamespace(credencial=fake))
+    monkeypatch.setattr(credential_pdf, "asset_loader", SimpleNamespace(get=get))
+    monkeypatch.setattr(credential_pdf, "render_credencial_pdf", render)
+    monkeypatch.setattr(credential_pdf.storage_service, "upload_bytes", upload)
+    return SimpleNamespace(imagenes=imagenes, renders=renders, subidas=subidas, db=fake)
+
+
+def _credencial(url, pdf_hash=None):
+    return SimpleNamespace(
+        id="c1", numero="VMP-2026-00001", pdfUrl=url, pdfHash=pdf_hash,
+        pdfDatos=credential_pdf.receta(DATOS, "https://s3/foto.jpg"),
+    )
+
+
+class TestClaveRender:
+    def test_cambia_solo_si_cambia_lo_que_se_dibuja(self, monkeypatch):
+        """La clave depende de los datos, las imágenes y la versión de la plantilla"""
+        base = credential_pdf.clave_render(DATOS, b"foto", b"firma")
+        assert credential_pdf.clave_render(dict(reversed(DATOS.items())), b"foto", b"firma") == base
+        assert credential_pdf.clave_render({**DATOS, "alumno_nombre": "Juan Perez"}, b"foto", b"firma") != base
+        assert credential_pdf.clave_render(DATOS, b"otra foto", b"firma") != base
+        assert credential_pdf.clave_render(DATOS, b"foto", None) != base
+        monkeypatch.setattr(credential_pdf, "TEMPLATE_VERSION", credential_pdf.TEMPLATE_VERSION + 1)
+        assert credential_pdf.clave_render(DATOS, b"foto", b"firma") != base
+
+
+@pytest.mark.asyncio
+class TestAsegurar:
+    async def test_emision_sube_y_despues_reutiliza(self, entorno):
+        """Al emitir ya queda subido; con la misma clave no se vuelve a dibujar"""
+        receta, url, clave = await credential_pdf.dibujar(DATOS, "https://s3/foto.jpg")
+        assert entorno.subidas == [credential_pdf.storage_key(clave)]
+        assert url == f"https://s3/{credential_pdf.storage_key(clave)}"
+
+        credencial = _credencial(url, clave)
+        assert await credential_pdf.asegurar(credencial) == (url, False)
+        assert len(entorno.renders) == 1
+
+    async def test_emision_sin_storage_falla(self, entorno, monkeypatch):
+        """Sin storage configurado la emisión falla en vez de guardar una URL sin objeto"""
+        def sin_storage(data, key, content_type):
+            raise RuntimeError("Almacenamiento de archivos no configurado")
+
+        monkeypatch.setattr(credential_pdf.storage_service, "upload_bytes", sin_storage)
+        with pytest.raises(RuntimeError):
+            await credential_pdf.dibujar(DATOS, "https://s3/foto.jpg")
+
+    async def test_dibuja_si_no_esta_subido(self, entorno):
+        """Sin pdfHash (o con otra clave) se dibuja y se guarda la nueva URL"""
+        credencial = _credencial("https://s3/viejo.pdf")
+        url, dibujada = await credential_pdf.asegurar(credencial)
+        assert dibujada and url != "https://s3/viejo.pdf"
+        assert entorno.db.updates[-1] == {"pdfUrl": url, "pdfHash": url.split("/")[-1].removesuffix(".pdf")}
+
+    async def test_cambio_de_foto_genera_otro_objeto(self, entorno):
+        """Si cambió la foto se dibuja de nuevo bajo otra clave"""
+        _, url, clave = await credential_pdf.dibujar(DATOS, "https://s3/foto.jpg")
+        credencial = _credencial(url, clave)
+
+        entorno.imagenes["https://s3/foto.jpg"] = b"foto nueva"
+        nueva_url, dibujada = await credential_pdf.asegurar(credencial)
+        assert dibujada and nueva_url != url
+        assert entorno.db.updates[-1]["pdfUrl"] == nueva_url
+
+    async def test_storage_caido_conserva_el_pdf(self, entorno):
+        """Si la foto no se pudo bajar no se reemplaza el PDF por uno sin foto"""
+        _, url, clave = await credential_pdf.dibujar(DATOS, "https://s3/foto.jpg")
+        credencial = _credencial(url, clave)
+
+        del entorno.imagenes["https://s3/foto.jpg"]
+        assert await credential_pdf.asegurar(credencial) == (url, False)
+        assert len(entorno.renders) == 1
+
+    async def test_descargas_simultaneas_dibujan_una_vez(self, entorno):
+        """Varias descargas simultáneas de la misma credencial comparten el dibujo"""
+        credencial = _credencial("https://s3/viejo.pdf")
+        resultados = await asyncio.gather(*(credential_pdf.asegurar(credencial) for _ in range(5)))
+        assert len(entorno.renders) == 1
+        assert len({r[0] for r in resultados}) == 1
+
+    async def test_credenciales_anteriores_sin_tocar(self, entorno):
+        """Sin pdfDatos se devuelve el PDF que ya tenía"""
+        credencial = SimpleNamespace(id="c0", pdfUrl="https://s3/credenciales-pdf/VMP-2025-00001.pdf", pdfDatos=None)
+        assert await credential_pdf.asegurar(credencial) == (credencial.pdfUrl, False)
+        assert entorno.renders == []
+
+
+@pytest.mark.asyncio
+class TestRegenerar:
+    async def test_solo_registra_en_el_manifiesto_si_cambio(self, entorno, monkeypatch):
+        """Regenerar sin cambios no toca nada; con otro DNI actualiza el manifiesto offline"""
+        from datetime import datetime
+        from services import credential_service
+
+        alumno = SimpleNamespace(id="a1", nombre="Juan", apellido="Pérez", dni="30123456", puesto=None, empresa=None)
+        curso = SimpleNamespace(id="k1", nombre="Manejo defensivo", codigo="MD-01")
+
+        async def find_user(where, include=None):
+            return alumno
+
+        async def find_curso(where):
+            return curso
+
+        async def find_foto(where):
+            return None
+
+        async def update(where, data):
+            # Como el cliente real: el campo Json vuelve como dict
+            credencial.pdfDatos = data["pdfDatos"].data
+            return credencial
+
+        registrados = []
+
+        async def registrar(numero, accion):
+            registrados.append((numero, accion))
+
+        monkeypatch.setattr(credential_service, "prisma", SimpleNamespace(
+            user=SimpleNamespace(find_unique=find_user),
+            curso=SimpleNamespace(find_unique=find_curso),
+            fotocredencial=SimpleNamespace(find_first=find_foto),
+            credencial=SimpleNamespace(update=update),
+        ))
+        monkeypatch.setattr(credential_service.offline_manifest, "registrar", registrar)
+
+        credencial = SimpleNamespace(
+            id="c1", numero="VMP-2026-00001", alumnoId="a1", cursoId="k1",
+            fechaEmision=datetime(2026, 3, 1), fechaVencimiento=None,
+            pdfUrl=None, pdfHash=None, pdfDatos=None,
+        )
+        await credential_service.regenerar_pdf(credencial, None)
+        assert registrados == [("VMP-2026-00001", "ALTA")]
+
+        credencial.pdfHash = entorno.db.updates[-1]["pdfHash"]
+        assert (await credential_service.regenerar_pdf(credencial, None))[1] is False
+        assert len(registrados) == 1
+
+        alumno.dni = "30999999"
+        assert (await credential_service.regenerar_pdf(credencial, None))[1] is True
+        assert len(registrados) == 2
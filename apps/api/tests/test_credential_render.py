@@ -0,0 +1,33 @@
+"""
+Tests del QR vectorial de las credenciales (services/credencial_generator.py).
+"""
+import qrcode
+from services.credencial_generator import qr_matrix, render_credencial_pdf
+
+
+DATOS = {
+    "numero_credencial": "VMP-2026-00001",
+    "alumno_nombre": "Juan Pérez",
+    "dni": "30123456",
+    "curso_nombre": "Manejo defensivo",
+    "curso_codigo": "MD-01",
+    "fecha_emision": "01/03/2026",
+    "fecha_vencimiento": None,
+    "qr_url": "https://vmp.example.com/validar/VMP-2026-00001",
+}
+
+
+class TestQrVectorial:
+    def test_matriz_igual_a_la_de_qrcode(self):
+        """La matriz es la misma que genera qrcode"""
+        qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, border=1)
+        qr.add_data(DATOS["qr_url"])
+        qr.make(fit=True)
+
+        assert qr_matrix(DATOS["qr_url"]) == qr.get_matrix()
+
+    def test_pdf_sin_imagenes(self):
+        """Sin foto ni firma el PDF no lleva ninguna imagen: el QR es vectorial"""
+        pdf = render_credencial_pdf(DATOS)
+        assert pdf.startswith(b"%PDF")
+        assert b"/Subtype /Image" not in pdf
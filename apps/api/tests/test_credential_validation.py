@@ -51,6 +51,7 @@ class TestCredentialValidation:
         credencial = await prisma.credencial.create(
             data={
                 "numero": "VMP-2026-TEST001",
+                "numeroCanonico": "VMP-2026-TEST001",
                 "alumnoId": alumno.id,
                 "cursoId": curso.id,
                 "pdfUrl": "https://example.com/credential.pdf",
@@ -112,6 +113,7 @@ class TestCredentialValidation:
         credencial = await prisma.credencial.create(
             data={
                 "numero": "VMP-2026-TEST002",
+                "numeroCanonico": "VMP-2026-TEST002",
                 "alumnoId": alumno.id,
                 "cursoId": curso.id,
                 "pdfUrl": "https://example.com/credential.pdf",
@@ -178,6 +180,7 @@ class TestCredentialValidation:
         credencial = await prisma.credencial.create(
             data={
                 "numero": "VMP-2026-TEST003",
+                "numeroCanonico": "VMP-2026-TEST003",
                 "alumnoId": alumno.id,
                 "cursoId": curso.id,
                 "pdfUrl": "https://example.com/credential.pdf",
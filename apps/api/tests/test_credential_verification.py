@@ -0,0 +1,87 @@
+"""
+Tests de la verificación masiva de credenciales
+(services/credential_verification.py).
+"""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from services import credential_verification
+from services.credential_numbering import numero_canonico
+from services.dni import normalizar_dni
+
+AHORA = datetime.now(timezone.utc)
+
+
+def _credencial(numero, dni, vencimiento=None):
+    return SimpleNamespace(
+        numero=numero,
+        numeroCanonico=numero_canonico(numero),
+        fechaEmision=AHORA,
+        fechaVencimiento=vencimiento,
+        alumno=SimpleNamespace(nombre="Chofer", apellido=dni, dni=dni, dniNormalizado=normalizar_dni(dni)),
+        curso=SimpleNamespace(codigo="MD-01"),
+    )
+
+
+class FakeCredenciales:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    async def find_many(self, where, include=None, order=None):
+        self.queries.append(where)
+        if "numeroCanonico" in where:
+            claves = where["numeroCanonico"]["in"]
+            return [c for c in self.rows if c.numeroCanonico in claves]
+        dnis = where["alumno"]["is"]["dniNormalizado"]["in"]
+        return [c for c in self.rows if c.alumno.dniNormalizado in dnis]
+
+
+@pytest.fixture
+def credenciales(monkeypatch):
+    fake = FakeCredenciales([
+        _credencial("VMP-2026-00001", "30111111"),
+        _credencial("VMP-2026-00002", "30222222", AHORA - timedelta(days=1)),
+        _credencial("VMP-2027-00001", "30222222", AHORA + timedelta(days=300)),
+        _credencial("VMP-2026-00003", "30.333.333"),
+    ])
+    monkeypatch.setattr(credential_verification, "prisma", SimpleNamespace(credencial=fake))
+    return fake
+
+
+async def _verificar(numeros=(), dnis=()):
+    return [r async for r in credential_verification.verificar(list(numeros), list(dnis))]
+
+
+@pytest.mark.asyncio
+class TestVerificacionMasiva:
+    async def test_estado_por_numero_en_orden(self, credenciales):
+        """Un resultado por número, en el orden recibido y con cualquier formato"""
+        resultados = await _verificar(["VMP-2026-00002", "vmp 2026 1", "VMP-2026-09999"])
+        assert [r["status"] for r in resultados] == ["expired", "valid", "not_found"]
+        assert resultados[1]["consulta"] == "vmp 2026 1"
+        assert resultados[1]["numero"] == "VMP-2026-00001"
+        assert resultados[1]["dni"] == "30111111"
+        assert len(credenciales.queries) == 1
+
+    async def test_por_dni_agrupa_sus_credenciales(self, credenciales):
+        """Un DNI con una credencial vigente y otra vencida figura como válido"""
+        resultados = await _verificar(dnis=["30.222.222", "40000000"])
+        assert resultados[0]["status"] == "valid"
+        assert {c["status"] for c in resultados[0]["credenciales"]} == {"valid", "expired"}
+        assert resultados[1]["status"] == "not_found"
+
+    async def test_dni_guardado_con_puntos(self, credenciales):
+        """Un DNI cargado como 30.333.333 se encuentra con cualquier formato"""
+        resultados = await _verificar(dnis=["30333333", "30 333 333"])
+        assert [r["status"] for r in resultados] == ["valid", "valid"]
+        assert resultados[0]["credenciales"][0]["numero"] == "VMP-2026-00003"
+
+    async def test_una_consulta_por_tanda(self, credenciales, monkeypatch):
+        """Miles de números se resuelven con una consulta por tanda"""
+        monkeypatch.setattr(credential_verification.settings, "CREDENTIAL_VERIFY_CHUNK_SIZE", 500)
+        numeros = [f"VMP-2026-{i:05d}" for i in range(1, 1201)]
+        resultados = await _verificar(numeros, ["30111111"])
+        assert len(resultados) == 1201
+        assert len(credenciales.queries) == 4  # 3 tandas de números + 1 de DNIs
+        assert sum(r["status"] != "not_found" for r in resultados) == 4
@@ -0,0 +1,85 @@
+"""
+Tests de la lectura en lote de facturas desde un ZIP.
+"""
+import io
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import pytest
+from services import invoice_extraction, invoice_parser
+
+
+class FakeJobs:
+    def __init__(self, previos=()):
+        self.previos = list(previos)
+        self.created = []
+
+    async def find_many(self, where, order=None):
+        if "batchId" in where:
+            return [SimpleNamespace(**j) for j in self.created if j["batchId"] == where["batchId"]]
+        return [j for j in self.previos if j.sha256 in where["sha256"]["in"]]
+
+    async def create_many(self, data):
+        self.created.extend(data)
+        return len(data)
+
+
+class FakeCompras:
+    async def find_many(self, where):
+        return [SimpleNamespace(cuit="30-71234567-8", numero="00003-00000001")]
+
+
+def _zip(files: dict) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def fake_env(monkeypatch):
+    jobs = FakeJobs()
+    monkeypatch.setattr(invoice_extraction, "prisma", SimpleNamespace(invoiceextractionjob=jobs, compra=FakeCompras()))
+    monkeypatch.setattr(invoice_extraction, "Json", lambda value: value)
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(invoice_extraction, "_get_process_pool", lambda: pool)
+    # El "PDF" de prueba es el número de comprobante en texto plano
+    monkeypatch.setattr(invoice_parser, "extraer_local", lambda contents: (
+        "", {"cuit": "30-71234567-8", "numero": contents.decode(), "items": []}
+    ))
+    yield jobs
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+class TestZipIngest:
+    async def test_lote_de_borradores(self, fake_env):
+        """Cada PDF del ZIP es un borrador; se ignoran otros archivos y se marcan duplicadas"""
+        archivo = _zip({
+            "marzo/f1.pdf": b"00003-00000001",
+            "marzo/f2.pdf": b"00003-00000002",
+            "marzo/notas.txt": b"no es factura",
+            "__MACOSX/marzo/._f1.pdf": b"basura",
+        })
+        lote = await invoice_extraction.ingest_zip(archivo, "admin")
+
+        assert lote["total"] == 2 and lote["procesadas"] == 2
+        por_archivo = {b["archivo"]: b for b in lote["borradores"]}
+        assert por_archivo["marzo/f1.pdf"]["duplicada"] is True
+        assert por_archivo["marzo/f2.pdf"]["compra"]["numero"] == "00003-00000002"
+        assert {j["batchId"] for j in fake_env.created} == {lote["batchId"]}
+
+    async def test_cache_por_hash(self, fake_env, monkeypatch):
+        """Un PDF ya leído no se vuelve a parsear"""
+        import hashlib
+        digest = hashlib.sha256(b"00003-00000009").hexdigest()
+        fake_env.previos.append(SimpleNamespace(sha256=digest, source="gemini", result={"numero": "cacheado"}))
+        lote = await invoice_extraction.ingest_zip(_zip({"f.pdf": b"00003-00000009"}), None)
+        assert lote["desdeCache"] == 1
+        assert lote["borradores"][0]["compra"]["numero"] == "cacheado"
+
+    async def test_zip_invalido(self, fake_env):
+        with pytest.raises(invoice_extraction.ZipIngestError):
+            await invoice_extraction.ingest_zip(io.BytesIO(b"no es zip"), None)
@@ -0,0 +1,40 @@
+"""
+Tests de la lectura tradicional (sin IA) de facturas PDF de compras.
+"""
+from services.invoice_parser import clean_amount, parsear_factura
+
+
+FACTURA_AFIP = """
+ORIGINAL
+Razón Social: Limpiezas del Sur SRL
+CUIT: 30-71234567-8
+Punto de Venta: 00003 Comp. Nro: 00001234
+Fecha de Emisión: 05/03/2026
+Código Producto/Servicio Cantidad U. Medida Precio Unit. % Bonif Subtotal
+1 Limpieza oficina mensual 2,00 unidades 50.000,00 0,00 100.000,00
+Importe Neto Gravado: $ 100.000,00
+IVA 21%: $ 21.000,00
+Importe Total: $ 121.000,00
+"""
+
+
+class TestInvoiceParser:
+    def test_clean_amount_formatos(self):
+        """Importes con coma o punto decimal y separadores de miles"""
+        assert clean_amount("1.234,56") == 1234.56
+        assert clean_amount("1,234.56") == 1234.56
+        assert clean_amount("1234,5") == 1234.5
+        assert clean_amount("abc") == 0.0
+
+    def test_factura_afip(self):
+        """Datos de cabecera, ítems, totales y categoría de una factura AFIP típica"""
+        datos = parsear_factura(FACTURA_AFIP)
+        assert datos["proveedor"] == "Limpiezas del Sur SRL"
+        assert datos["cuit"] == "30-71234567-8"
+        assert datos["numero"] == "00003-00001234"
+        assert datos["fecha"] == "2026-03-05"
+        assert datos["subtotal"] == 100000.0
+        assert datos["iva"] == 21000.0
+        assert datos["total"] == 121000.0
+        assert datos["categoria"] == "SERVICIOS"
+        assert datos["items"][0]["subtotal"] == 100000.0
@@ -0,0 +1,281 @@
+"""
+Tests de las métricas del panel y de su cache de snapshots.
+"""
+import asyncio
+import time
+import pytest
+from services.snapshot_cache import SnapshotCache
+
+
+class CountingPrisma:
+    """Proxy del cliente prisma que cuenta las llamadas a la base"""
+
+    def __init__(self, client):
+        self._client = client
+        self.calls = 0
+
+    def __getattr__(self, name):
+        target = getattr(self._client, name)
+        if name == "query_raw":
+            return self._count(target)
+        return _CountingModel(target, self)
+
+    def _count(self, method):
+        async def wrapper(*args, **kwargs):
+            self.calls += 1
+            return await method(*args, **kwargs)
+        return wrapper
+
+
+class _CountingModel:
+    def __init__(self, model, counter: CountingPrisma):
+        self._model = model
+        self._counter = counter
+
+    def __getattr__(self, name):
+        return self._counter._count(getattr(self._model, name))
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {"n": self.calls}
+
+
+class TestSnapshotCache:
+    """Snapshot compartido con refresco en background"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_load(self):
+        """Requests concurrentes sin snapshot disparan un solo cálculo"""
+        cache = SnapshotCache(ttl_seconds=30, max_stale_seconds=300)
+        loader = Loader()
+        results = await asyncio.gather(*(cache.get("overview", loader) for _ in range(5)))
+
+        assert loader.calls == 1
+        assert all(r.value == {"n": 1} for r in results)
+
+    @pytest.mark.asyncio
+    async def test_fresh_snapshot_is_reused(self):
+        """Dentro del TTL no se recalcula"""
+        cache = SnapshotCache(ttl_seconds=30, max_stale_seconds=300)
+        loader = Loader()
+        await cache.get("overview", loader)
+        snapshot = await cache.get("overview", loader)
+
+        assert loader.calls == 1
+        assert snapshot.age_seconds < 30
+
+    @pytest.mark.asyncio
+    async def test_stale_snapshot_refreshes_in_background(self):
+        """Vencido el TTL se devuelve el viejo y se recalcula en background"""
+        offset = [0.0]
+        cache = SnapshotCache(ttl_seconds=30, max_stale_seconds=300, clock=lambda: time.monotonic() + offset[0])
+        loader = Loader()
+        await cache.get("overview", loader)
+
+        offset[0] = 60
+        snapshot = await cache.get("overview", loader)
+        assert snapshot.value == {"n": 1}
+        assert snapshot.age_seconds >= 60
+
+        await asyncio.sleep(0.05)
+        assert loader.calls == 2
+        assert (await cache.get("overview", loader)).value == {"n": 2}
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_logged_once(self, caplog):
+        """Varios stale hits durante un refresco que falla lo loguean una sola vez"""
+        offset = [0.0]
+        cache = SnapshotCache(ttl_seconds=30, max_stale_seconds=300, clock=lambda: time.monotonic() + offset[0])
+        await cache.get("overview", Loader())
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("db caída")
+
+        offset[0] = 60
+        for _ in range(5):
+            assert (await cache.get("overview", failing)).value == {"n": 1}
+        await asyncio.sleep(0.05)
+
+        assert sum("No se pudo refrescar" in r.message for r in caplog.records) == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_shared_load(self):
+        """Si el primer request se cancela, los demás reciben igual el resultado"""
+        cache = SnapshotCache(ttl_seconds=30, max_stale_seconds=300)
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return {"n": 1}
+
+        primero = asyncio.create_task(cache.get("overview", slow))
+        await asyncio.sleep(0)
+        segundo = asyncio.create_task(cache.get("overview", slow))
+        await asyncio.sleep(0)
+        primero.cancel()
+
+        assert (await segundo).value == {"n": 1}
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_right_after_load(self):
+        """Un invalidate() apenas termina la carga no rompe a quien la esperaba"""
+        cache = SnapshotCache(ttl_seconds=30, max_stale_seconds=300)
+
+        async def loader():
+            asyncio.get_running_loop().call_soon(cache.invalidate)
+            return {"n": 1}
+
+        assert (await cache.get("overview", loader)).value == {"n": 1}
+
+    @pytest.mark.asyncio
+    async def test_force_recomputes(self):
+        """force=True ignora el snapshot"""
+        cache = SnapshotCache(ttl_seconds=30, max_stale_seconds=300)
+        loader = Loader()
+        await cache.get("overview", loader)
+        snapshot = await cache.get("overview", loader, force=True)
+
+        assert snapshot.value == {"n": 2}
+
+
+class TestOverviewMetrics:
+    """Endpoint /api/metrics/overview"""
+
+    @pytest.mark.asyncio
+    async def test_overview_reports_snapshot_age(self, client, admin_token):
+        """La respuesta incluye la antigüedad del snapshot"""
+        response = await client.get(
+            "/api/metrics/overview", headers={"Authorization": f"Bearer {admin_token}"}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert "totals" in data
+        assert data["snapshot"]["ageSeconds"] >= 0
+
+
+class TestCourseMetrics:
+    """Endpoint /api/metrics/courses"""
+
+    async def _create_courses(self, prisma, prefix: str, n: int) -> list:
+        return [
+            await prisma.curso.create(
+                data={
+                    "nombre": f"Curso {prefix}{i}",
+                    "descripcion": "Curso de prueba de métricas",
+                    "codigo": f"MET-{prefix}{i}",
+                    "duracionHoras": 4,
+                }
+            )
+            for i in range(n)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_query_count_is_constant(self, client, admin_token, db, monkeypatch):
+        """La cantidad de consultas no depende de la cantidad de cursos"""
+        import routers.metrics as metrics_router
+
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        created = await self._create_courses(db, "A", 2)
+        try:
+            counter = CountingPrisma(db)
+            monkeypatch.setattr(metrics_router, "prisma", counter)
+            response = await client.get("/api/metrics/courses", headers=headers)
+            assert response.status_code == 200
+            calls_few = counter.calls
+
+            monkeypatch.setattr(metrics_router, "prisma", db)
+            created += await self._create_courses(db, "B", 8)
+
+            counter = CountingPrisma(db)
+            monkeypatch.setattr(metrics_router, "prisma", counter)
+            response = await client.get("/api/metrics/courses", headers=headers)
+            assert response.status_code == 200
+            assert counter.calls == calls_few == 2
+        finally:
+            for curso in created:
+                await db.curso.delete(where={"id": curso.id})
+
+    @pytest.mark.asyncio
+    async def test_pagination_and_sorting(self, client, admin_token, db):
+        """limit/skip paginan y sort ordena por el campo pedido"""
+        created = await self._create_courses(db, "P", 3)
+        try:
+            response = await client.get(
+                "/api/metrics/courses?sort=nombre&order=asc&limit=2",
+                headers={"Authorization": f"Bearer {admin_token}"},
+            )
+            assert response.status_code == 200
+            data = response.json()
+            assert len(data["courses"]) == 2
+            assert data["total"] >= 3
+            nombres = [c["nombre"] for c in data["courses"]]
+            assert nombres == sorted(nombres)
+        finally:
+            for curso in created:
+                await db.curso.delete(where={"id": curso.id})
+
+    @pytest.mark.asyncio
+    async def test_invalid_sort(self, client, admin_token):
+        """Un campo de orden desconocido es 400"""
+        response = await client.get(
+            "/api/metrics/courses?sort=foo",
+            headers={"Authorization": f"Bearer {admin_token}"},
+        )
+        assert response.status_code == 400
+
+
+class TestMetricRollups:
+    """Rollups diarios que alimentan /conversions y capacitaciones/overview"""
+
+    def test_exam_dimension(self):
+        """El resultado del examen se guarda como dimensión legible"""
+        from services.metric_rollups import exam_dimension
+
+        assert exam_dimension(True) == "aprobado"
+        assert exam_dimension(False) == "reprobado"
+        assert exam_dimension(None) == "pendiente"
+
+    @pytest.mark.asyncio
+    async def test_conversions_read_from_rollups(self, client, admin_token, db):
+        """Una cotización nueva aparece en /conversions después del refresh del worker"""
+        from datetime import timedelta
+        from services import metric_rollups
+
+        cotizacion = await db.cotizacion.create(
+            data={
+                "empresa": "Rollup SA",
+                "nombre": "Test",
+                "email": "rollup@example.com",
+                "telefono": "123",
+                "quantity": 1,
+                "course": "defensivo",
+                "modality": "online",
+                "totalPrice": 100.0,
+                "pricePerStudent": 100.0,
+                "discount": 0,
+                "status": "converted",
+            }
+        )
+        try:
+            await metric_rollups.refresh_recent(timedelta(minutes=5))
+            response = await client.get(
+                "/api/metrics/conversions?days=1",
+                headers={"Authorization": f"Bearer {admin_token}"},
+            )
+            assert response.status_code == 200
+            today = cotizacion.createdAt.strftime("%Y-%m-%d")
+            day = next(d for d in response.json()["data"] if d["date"] == today)
+            assert day["converted"] >= 1
+        finally:
+            await db.cotizacion.delete(where={"id": cotizacion.id})
+            await metric_rollups.rebuild_all()
@@ -0,0 +1,114 @@
+"""
+Tests del manifiesto offline firmado (services/offline_manifest.py).
+"""
+from types import SimpleNamespace
+import pytest
+from services import offline_manifest
+
+
+class FakeDB:
+    """credential_manifest_log y credenciales vigentes en memoria."""
+
+    def __init__(self, credenciales):
+        self.credenciales = dict(credenciales)  # numero -> (dni, curso, vence)
+        self.log = []  # (version, numero, accion, creado)
+        self.ahora = 0.0
+        self.credentialmanifestentry = SimpleNamespace(create=self._registrar)
+
+    async def _registrar(self, data):
+        self.log.append((len(self.log) + 1, data["numero"], data["accion"], self.ahora))
+
+    async def query_raw(self, sql, *args):
+        if 'MAX("version")' in sql:
+            (ventana,) = args
+            return [{"version": max((v for v, _, _, c in self.log if c <= self.ahora - ventana), default=0)}]
+        if "DISTINCT ON" in sql:
+            desde, hasta = args
+            ultimo = {n: a for v, n, a, _ in self.log if desde < v <= hasta}
+            return [{"numero": n, "accion": a} for n, a in ultimo.items()]
+        numeros = self.credenciales
+        if args:
+            desde, hasta = args
+            numeros = {n for v, n, _, _ in self.log if desde < v <= hasta} & set(self.credenciales)
+        return [
+            {"numero": n, "dni": self.credenciales[n][0], "curso": self.credenciales[n][1], "vence": self.credenciales[n][2]}
+            for n in numeros
+        ]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDB({
+        "VMP-2026-00001": ("30111111", "MD-01", None),
+        "VMP-2026-00002": ("30222222", "CP-02", 1893456000),
+    })
+    monkeypatch.setattr(offline_manifest, "prisma", fake)
+    monkeypatch.setattr(offline_manifest, "_completo", None)
+    monkeypatch.setattr(offline_manifest.settings, "OFFLINE_MANIFEST_VERSION_LAG_SECONDS", 5)
+    return fake
+
+
+def _abrir(respuesta):
+    return offline_manifest.verificar(respuesta, offline_manifest.clave_publica()["clave"])
+
+
+@pytest.mark.asyncio
+class TestOfflineManifest:
+    async def test_completo_firmado(self, db):
+        """El manifiesto completo se verifica con la clave pública y trae todas las vigentes"""
+        manifiesto = _abrir(await offline_manifest.generar())
+        assert manifiesto["tipo"] == "completo"
+        assert set(manifiesto["credenciales"]) == {"VMP-2026-00001", "VMP-2026-00002"}
+        dni_hash, curso, vence = manifiesto["credenciales"]["VMP-2026-00002"]
+        assert dni_hash == offline_manifest.hash_dni("VMP-2026-00002", "30222222")
+        assert "30222222" not in dni_hash
+        assert (curso, vence) == ("CP-02", 1893456000)
+
+    async def test_manifiesto_alterado_no_verifica(self, db):
+        """Un manifiesto modificado no pasa la verificación del escáner"""
+        respuesta = await offline_manifest.generar()
+        respuesta = {**respuesta, "manifiesto": respuesta["manifiesto"].replace("CP-02", "MD-01")}
+        with pytest.raises(ValueError):
+            _abrir(respuesta)
+
+    async def test_delta_desde_una_version(self, db):
+        """El delta trae solo altas y bajas posteriores; aplicado da el estado actual"""
+        base = _abrir(await offline_manifest.generar())
+
+        db.credenciales["VMP-2026-00003"] = ("30333333", "MD-01", None)
+        await offline_manifest.registrar("vmp-2026-3", offline_manifest.ALTA)
+        del db.credenciales["VMP-2026-00001"]
+        await offline_manifest.registrar("VMP-2026-00001", offline_manifest.BAJA)
+        db.ahora += 5
+
+        delta = _abrir(await offline_manifest.generar(base["version"]))
+        assert delta["tipo"] == "delta"
+        assert delta["desde"] == base["version"] and delta["version"] == 2
+        assert list(delta["credenciales"]) == ["VMP-2026-00003"]
+        assert delta["bajas"] == ["VMP-2026-00001"]
+
+        local = {**base["credenciales"], **delta["credenciales"]}
+        for numero in delta["bajas"]:
+            local.pop(numero, None)
+        assert set(local) == {"VMP-2026-00002", "VMP-2026-00003"}
+
+    async def test_sin_cambios_y_version_desconocida(self, db):
+        """Sin cambios el delta viene vacío; una versión que no existe recibe el completo"""
+        await offline_manifest.registrar("VMP-2026-00002", offline_manifest.ALTA)
+        db.ahora += 5
+        vacio = _abrir(await offline_manifest.generar(1))
+        assert vacio["credenciales"] == {} and vacio["bajas"] == []
+        assert _abrir(await offline_manifest.generar(99))["tipo"] == "completo"
+
+    async def test_version_no_pasa_cambios_recientes(self, db):
+        """Un cambio todavía dentro de la ventana no adelanta la versión: llega en el delta siguiente"""
+        base = _abrir(await offline_manifest.generar())
+        db.credenciales["VMP-2026-00003"] = ("30333333", "MD-01", None)
+        await offline_manifest.registrar("VMP-2026-00003", offline_manifest.ALTA)
+
+        reciente = _abrir(await offline_manifest.generar(base["version"]))
+        assert reciente["version"] == base["version"]
+
+        db.ahora += 5
+        delta = _abrir(await offline_manifest.generar(reciente["version"]))
+        assert list(delta["credenciales"]) == ["VMP-2026-00003"]
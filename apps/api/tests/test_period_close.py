@@ -0,0 +1,113 @@
+"""
+Tests de cierres de período y saldos a una fecha (services/period_close.py).
+"""
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from services import period_close
+
+
+class FakePeriods:
+    def __init__(self, cierres=()):
+        self.cierres = list(cierres)
+
+    async def find_first(self, where=None, order=None):
+        candidatos = [
+            c for c in self.cierres
+            if not where or c.periodEnd <= where["periodEnd"]["lte"]
+        ]
+        return max(candidatos, key=lambda c: c.periodEnd, default=None)
+
+    async def find_unique(self, where):
+        return next((c for c in self.cierres if c.period == where["period"]), None)
+
+
+class FakeSnapshots:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def find_many(self, where):
+        return [r for r in self.rows if r.periodId == where["periodId"]]
+
+
+class FakePrisma:
+    def __init__(self, cierres=(), snapshots=(), movimientos=()):
+        self.accountingperiod = FakePeriods(cierres)
+        self.accountbalancesnapshot = FakeSnapshots(list(snapshots))
+        self.movimientos = list(movimientos)
+        self.queries = []
+
+    async def query_raw(self, sql, *params):
+        self.queries.append(params)
+        return self.movimientos
+
+
+@pytest.mark.asyncio
+class TestSaldosAlDia:
+    async def test_sin_cierres_suma_desde_el_inicio(self, monkeypatch):
+        """Sin cierres previos el saldo sale de un único agregado sin límite inferior"""
+        fake = FakePrisma(movimientos=[{"account_id": "caja", "debit": 100, "credit": 40}])
+        monkeypatch.setattr(period_close, "prisma", fake)
+
+        totales = await period_close.saldos_al(datetime(2026, 3, 15))
+        assert totales == {"caja": (100.0, 40.0)}
+        assert fake.queries == [("2026-03-16T00:00:00",)]
+
+    async def test_ultimo_cierre_mas_delta(self, monkeypatch):
+        """El saldo es el snapshot del último cierre más los asientos posteriores"""
+        marzo = SimpleNamespace(id="p3", period="2026-03", periodEnd=datetime(2026, 4, 1))
+        fake = FakePrisma(
+            cierres=[marzo],
+            snapshots=[
+                SimpleNamespace(periodId="p3", accountId="caja", debit=1000.0, credit=200.0),
+                SimpleNamespace(periodId="p3", accountId="ventas", debit=0.0, credit=800.0),
+            ],
+            movimientos=[
+                {"account_id": "caja", "debit": 50, "credit": 0},
+                {"account_id": "iva", "debit": 0, "credit": 10},
+            ],
+        )
+        monkeypatch.setattr(period_close, "prisma", fake)
+
+        totales = await period_close.saldos_al(datetime(2026, 4, 10))
+        assert totales == {
+            "caja": (1050.0, 200.0),
+            "ventas": (0.0, 800.0),
+            "iva": (0.0, 10.0),
+        }
+        # El delta arranca en el fin del período cerrado
+        assert fake.queries == [("2026-04-11T00:00:00", "2026-04-01T00:00:00")]
+
+    async def test_fin_de_mes_cerrado_no_consulta_el_mayor(self, monkeypatch):
+        """Al último día de un mes cerrado alcanza con el snapshot"""
+        marzo = SimpleNamespace(id="p3", period="2026-03", periodEnd=datetime(2026, 4, 1))
+        fake = FakePrisma(
+            cierres=[marzo],
+            snapshots=[SimpleNamespace(periodId="p3", accountId="caja", debit=10.0, credit=0.0)],
+        )
+        monkeypatch.setattr(period_close, "prisma", fake)
+
+        assert await period_close.saldos_al(datetime(2026, 3, 31)) == {"caja": (10.0, 0.0)}
+        assert fake.queries == []
+
+
+@pytest.mark.asyncio
+class TestCierre:
+    async def test_fin_de_periodo(self):
+        assert period_close.fin_de_periodo("2026-02") == datetime(2026, 3, 1)
+        assert period_close.fin_de_periodo("2026-12") == datetime(2027, 1, 1)
+
+    async def test_no_cierra_mes_en_curso(self, monkeypatch):
+        monkeypatch.setattr(period_close, "prisma", FakePrisma())
+        en_curso = datetime.now().strftime("%Y-%m")
+        with pytest.raises(period_close.PeriodoError):
+            await period_close.cerrar_periodo(en_curso)
+
+    async def test_fecha_en_periodo_cerrado(self, monkeypatch):
+        """No se puede asentar ni borrar antes del fin del último cierre"""
+        marzo = SimpleNamespace(id="p3", period="2026-03", periodEnd=datetime(2026, 4, 1))
+        monkeypatch.setattr(period_close, "prisma", FakePrisma(cierres=[marzo]))
+
+        with pytest.raises(period_close.PeriodoError):
+            await period_close.verificar_abierto(datetime(2026, 3, 31, 18, 0))
+        await period_close.verificar_abierto(datetime(2026, 4, 1))
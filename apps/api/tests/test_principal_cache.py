@@ -0,0 +1,87 @@
+"""
+Tests del cache de usuario autenticado usado por get_current_user.
+"""
+import time
+import pytest
+from httpx import AsyncClient
+from auth.principal_cache import PrincipalCache, principal_cache
+
+
+class TestPrincipalCache:
+    """Tests unitarios del LRU + TTL"""
+
+    def test_hit_and_miss_counters(self):
+        """Un set seguido de get cuenta un hit; un id desconocido cuenta un miss"""
+        cache = PrincipalCache(max_entries=10, ttl_seconds=60)
+        cache.set("u1", {"id": "u1"})
+
+        assert cache.get("u1") == {"id": "u1"}
+        assert cache.get("u2") is None
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+
+    def test_token_version_mismatch_is_miss(self):
+        """Un token con otra versión no reutiliza la entrada cacheada"""
+        cache = PrincipalCache(max_entries=10, ttl_seconds=60)
+        cache.set("u1", {"id": "u1"}, token_version=1)
+
+        assert cache.get("u1", token_version=2) is None
+        assert cache.get("u1", token_version=1) is None  # la entrada vieja se descartó
+
+    def test_ttl_expiration(self, monkeypatch):
+        """Las entradas vencidas se descartan"""
+        cache = PrincipalCache(max_entries=10, ttl_seconds=5)
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now)
+        cache.set("u1", {"id": "u1"})
+
+        monkeypatch.setattr(time, "monotonic", lambda: now + 6)
+        assert cache.get("u1") is None
+
+    def test_lru_eviction(self):
+        """Al superar max_entries se expulsa la entrada menos usada"""
+        cache = PrincipalCache(max_entries=2, ttl_seconds=60)
+        cache.set("u1", 1)
+        cache.set("u2", 2)
+        cache.get("u1")
+        cache.set("u3", 3)
+
+        assert cache.get("u2") is None
+        assert cache.get("u1") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalidate(self):
+        """invalidate() fuerza la relectura desde la base"""
+        cache = PrincipalCache(max_entries=10, ttl_seconds=60)
+        cache.set("u1", 1)
+        cache.invalidate("u1")
+
+        assert cache.get("u1") is None
+        assert cache.stats()["invalidations"] == 1
+
+
+class TestPrincipalCacheIntegration:
+    """El cache se invalida en las escrituras sobre el usuario"""
+
+    @pytest.mark.asyncio
+    async def test_deactivated_user_is_rejected(
+        self, client: AsyncClient, auth_token, admin_token, test_user, test_admin
+    ):
+        """Desactivar un usuario invalida su entrada y el siguiente request da 401"""
+        principal_cache.clear()
+
+        response = await client.get("/api/auth/me", headers={"Authorization": f"Bearer {auth_token}"})
+        assert response.status_code == 200
+
+        response = await client.put(
+            f"/api/users/{test_user.id}",
+            json={"activo": False},
+            headers={"Authorization": f"Bearer {admin_token}"},
+        )
+        assert response.status_code == 200
+
+        response = await client.get("/api/auth/me", headers={"Authorization": f"Bearer {auth_token}"})
+        assert response.status_code == 401
@@ -0,0 +1,168 @@
+"""
+Tests del rate limiter de ventana deslizante (middleware/rate_limit.py).
+"""
+import fakeredis
+import pytest
+from middleware.rate_limit import MemorySlidingWindowStore, RateLimiter, RateLimitExceeded, RedisSlidingWindowStore
+
+
+class FakeSharedStore(MemorySlidingWindowStore):
+    """Store en memoria que se comporta como el de Redis (compartido entre limiters)"""
+
+    is_shared = True
+
+    def __init__(self, clock):
+        super().__init__(clock=clock)
+        self.calls = 0
+
+    async def acquire(self, key, limit, window_seconds, cost=1):
+        self.calls += 1
+        return await super().acquire(key, limit, window_seconds, cost)
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestSlidingWindowStore:
+    """Algoritmo de ventana deslizante por contador"""
+
+    @pytest.mark.asyncio
+    async def test_limit_within_window(self):
+        """Se otorgan hasta `limit` permisos por ventana"""
+        store = MemorySlidingWindowStore(clock=Clock())
+        granted = [(await store.acquire("k", 3, 60)).granted for _ in range(4)]
+
+        assert granted == [1, 1, 1, 0]
+
+    @pytest.mark.asyncio
+    async def test_previous_window_is_weighted(self):
+        """A mitad de la ventana siguiente la anterior cuenta la mitad"""
+        clock = Clock(now=600.0)
+        store = MemorySlidingWindowStore(clock=clock)
+        for _ in range(4):
+            await store.acquire("k", 4, 60)
+
+        clock.now = 690.0  # mitad de la ventana siguiente
+        assert (await store.acquire("k", 4, 60, cost=5)).granted == 2
+
+    @pytest.mark.asyncio
+    async def test_retry_after(self):
+        """Al rechazar informa cuánto esperar"""
+        clock = Clock(now=600.0)
+        store = MemorySlidingWindowStore(clock=clock)
+        await store.acquire("k", 1, 60)
+
+        result = await store.acquire("k", 1, 60)
+        assert result.granted == 0
+        assert result.retry_after == pytest.approx(60)
+
+
+class TestRedisSlidingWindowStore:
+    """El script Lua corrido contra un server que habla el protocolo de Redis (fakeredis)"""
+
+    @pytest.mark.asyncio
+    async def test_limit_and_partial_grant(self):
+        """Mismos permisos que el store en memoria, incluido un cost > 1 otorgado en parte"""
+        clock = Clock(now=600.0)
+        client = fakeredis.FakeAsyncRedis()
+        store = RedisSlidingWindowStore("redis://fake", client=client, clock=clock)
+        assert [(await store.acquire("k", 4, 60)).granted for _ in range(5)] == [1, 1, 1, 1, 0]
+
+        clock.now = 690.0  # mitad de la ventana siguiente: la anterior cuenta 2
+        assert (await store.acquire("k", 4, 60, cost=5)).granted == 2
+        assert int(await client.get("rl:{k}:11")) == 2
+
+        result = await store.acquire("k", 4, 60)
+        assert result.granted == 0
+        assert result.retry_after == pytest.approx(15)
+
+    @pytest.mark.asyncio
+    async def test_keys_share_slot_and_expire(self):
+        """Ambas ventanas usan el hash tag de la clave y el contador vence a las dos ventanas"""
+        client = fakeredis.FakeAsyncRedis()
+        store = RedisSlidingWindowStore("redis://fake", client=client, clock=Clock(now=600.0))
+        await store.acquire("login:ip:1.2.3.4", 5, 60, cost=3)
+
+        assert await client.keys("*") == [b"rl:{login:ip:1.2.3.4}:10"]
+        assert 0 < await client.pttl("rl:{login:ip:1.2.3.4}:10") <= 120_000
+
+    @pytest.mark.asyncio
+    async def test_workers_share_the_counter(self):
+        """Dos workers contra el mismo Redis no duplican el límite"""
+        server = fakeredis.FakeServer()
+        clock = Clock()
+        workers = [
+            RateLimiter(RedisSlidingWindowStore("redis://fake", client=fakeredis.FakeAsyncRedis(server=server), clock=clock))
+            for _ in range(2)
+        ]
+        allowed = 0
+        for i in range(10):
+            try:
+                await workers[i % 2].hit("login:ip:1.2.3.4", 5, 60)
+                allowed += 1
+            except RateLimitExceeded:
+                pass
+
+        assert allowed == 5
+
+
+class TestRateLimiter:
+    """Límites compartidos entre workers y reserva local"""
+
+    @pytest.mark.asyncio
+    async def test_shared_store_enforces_global_limit(self):
+        """Dos workers con el mismo store no duplican el límite"""
+        store = FakeSharedStore(Clock())
+        workers = [RateLimiter(store), RateLimiter(store)]
+        allowed = 0
+        for i in range(10):
+            try:
+                await workers[i % 2].hit("login:ip:1.2.3.4", 5, 60)
+                allowed += 1
+            except RateLimitExceeded:
+                pass
+
+        assert allowed == 5
+
+    @pytest.mark.asyncio
+    async def test_prefetch_skips_store_for_hot_keys(self):
+        """Una clave caliente reserva varios permisos y no va al store en cada request"""
+        store = FakeSharedStore(Clock())
+        limiter = RateLimiter(store, lease_seconds=60)
+        for _ in range(10):
+            await limiter.hit("public:ip:1.2.3.4", 100, 60, prefetch=5)
+
+        assert store.calls < 10
+        assert limiter.local_hits > 0
+
+    @pytest.mark.asyncio
+    async def test_prefetch_never_exceeds_limit(self):
+        """Los permisos reservados cuentan contra el límite"""
+        store = FakeSharedStore(Clock())
+        workers = [RateLimiter(store, lease_seconds=60) for _ in range(3)]
+        allowed = 0
+        for i in range(60):
+            try:
+                await workers[i % 3].hit("public:ip:1.2.3.4", 20, 60, prefetch=5)
+                allowed += 1
+            except RateLimitExceeded:
+                pass
+
+        assert allowed <= 20
+
+    @pytest.mark.asyncio
+    async def test_rejected_key_is_blocked_locally(self):
+        """Después de un rechazo no se consulta el store hasta el Retry-After"""
+        store = FakeSharedStore(Clock())
+        limiter = RateLimiter(store)
+        await limiter.hit("k", 1, 60)
+        for _ in range(5):
+            with pytest.raises(RateLimitExceeded):
+                await limiter.hit("k", 1, 60)
+
+        assert store.calls == 2
@@ -0,0 +1,60 @@
+"""
+Tests del mapa de versiones de token usado por get_principal (JWT_CLAIMS_MODE).
+"""
+import time
+from auth.revocation import TokenRevocationMap
+
+
+def _fresh_map() -> TokenRevocationMap:
+    revocations = TokenRevocationMap(refresh_seconds=15, full_reload_seconds=600)
+    revocations._last_refresh = time.monotonic()
+    return revocations
+
+
+class TestTokenRevocationMap:
+    """Respuestas de is_current según el estado del mapa"""
+
+    def test_current_version_is_accepted(self):
+        """Misma versión y usuario activo: el token vale"""
+        revocations = _fresh_map()
+        revocations.record("u1", 3, True)
+
+        assert revocations.is_current("u1", 3) is True
+
+    def test_bumped_version_revokes(self):
+        """Un token con versión anterior queda revocado"""
+        revocations = _fresh_map()
+        revocations.record("u1", 4, True)
+
+        assert revocations.is_current("u1", 3) is False
+
+    def test_newer_version_falls_back(self):
+        """Un token más nuevo que el mapa (otro worker incrementó la versión) va a la base"""
+        revocations = _fresh_map()
+        revocations.record("u1", 3, True)
+
+        assert revocations.is_current("u1", 4) is None
+
+    def test_inactive_user_revokes(self):
+        """Un usuario desactivado no pasa aunque la versión coincida"""
+        revocations = _fresh_map()
+        revocations.record("u1", 0, False)
+
+        assert revocations.is_current("u1", 0) is False
+
+    def test_unknown_user_falls_back(self):
+        """Usuario desconocido (o borrado): hay que ir a la base"""
+        revocations = _fresh_map()
+        revocations.record("u1", 0, True)
+        revocations.forget("u1")
+
+        assert revocations.is_current("u1", 0) is None
+
+    def test_stale_map_falls_back(self, monkeypatch):
+        """Si el loop de refresco dejó de correr, no se confía en el mapa"""
+        revocations = _fresh_map()
+        revocations.record("u1", 0, True)
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 60)
+
+        assert revocations.is_current("u1", 0) is None
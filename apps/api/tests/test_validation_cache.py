@@ -0,0 +1,151 @@
+"""
+Tests del cache de validación pública de credenciales
+(services/credential_validator.py).
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from services import credential_validator as validator_module
+from services.credential_numbering import numero_canonico
+from services.credential_validator import CredentialValidator
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _credencial(numero, vencimiento=None):
+    return SimpleNamespace(
+        numero=numero,
+        fechaEmision=datetime(2026, 3, 1, tzinfo=timezone.utc),
+        fechaVencimiento=vencimiento,
+        alumno=SimpleNamespace(nombre="Juan", apellido="Pérez", dni="30123456", empresa=None),
+        curso=SimpleNamespace(nombre="Manejo defensivo", codigo="MD-01", descripcion=None),
+    )
+
+
+class FakeCredenciales:
+    def __init__(self, rows=()):
+        self.rows = {numero_canonico(c.numero): c for c in rows}
+        self.calls = 0
+        self.gate = None
+
+    async def find_first(self, where, include=None):
+        self.calls += 1
+        # La fila se lee al empezar: lo que cambie mientras la consulta sigue no se ve
+        row = self.rows.get(where["numeroCanonico"])
+        if self.gate is not None:
+            await self.gate.wait()
+        return row
+
+
+@pytest.fixture
+def credenciales(monkeypatch):
+    fake = FakeCredenciales([_credencial("VMP-2026-00001")])
+    monkeypatch.setattr(validator_module, "prisma", SimpleNamespace(credencial=fake))
+    return fake
+
+
+def _validator(clock=None):
+    return CredentialValidator(max_entries=10, ttl_seconds=60, negative_ttl_seconds=10, clock=clock or Clock())
+
+
+@pytest.mark.asyncio
+class TestValidationCache:
+    async def test_escaneos_repetidos_una_consulta(self, credenciales):
+        """Escaneos repetidos y en otro formato del mismo número no vuelven a la base"""
+        validator = _validator()
+        primera = await validator.resolve("vmp-2026-00001 ")
+        segunda = await validator.resolve("VMP-2026-00001")
+        assert primera.result["status"] == "valid"
+        assert segunda is primera
+        assert primera.max_age == 60
+        assert credenciales.calls == 1
+
+    async def test_consultas_simultaneas_comparten_la_consulta(self, credenciales):
+        """Varios inspectores escaneando a la vez: una sola ida a la base"""
+        validator = _validator()
+        credenciales.gate = asyncio.Event()
+        tareas = [asyncio.create_task(validator.resolve("VMP-2026-00001")) for _ in range(20)]
+        await asyncio.sleep(0)
+        credenciales.gate.set()
+        resultados = await asyncio.gather(*tareas)
+        assert credenciales.calls == 1
+        assert {r.etag for r in resultados} == {resultados[0].etag}
+        assert validator.stats()["coalesced"] == 19
+
+    async def test_no_encontrada_cacheada_menos_tiempo(self, credenciales):
+        """Los números inexistentes se cachean con el TTL negativo"""
+        clock = Clock()
+        validator = _validator(clock)
+        assert (await validator.resolve("VMP-2026-09999")).result["status"] == "not_found"
+        clock.now = 5
+        await validator.resolve("VMP-2026-09999")
+        assert credenciales.calls == 1
+        clock.now = 11
+        await validator.resolve("VMP-2026-09999")
+        assert credenciales.calls == 2
+
+    async def test_emitir_invalida_el_no_encontrada(self, credenciales):
+        """Al emitir un número se descartan los "no encontrada" que lo habrían encontrado"""
+        validator = _validator()
+        assert (await validator.resolve("09999")).result["status"] == "not_found"
+        credenciales.rows["VMP-2026-09999"] = _credencial("VMP-2026-09999")
+        validator.invalidate("VMP-2026-09999")
+        assert (await validator.resolve("09999")).result["status"] == "valid"
+
+    async def test_eliminar_invalida_todos_los_formatos(self, credenciales):
+        """Eliminar una credencial descarta sus resultados bajo cualquier formato"""
+        validator = _validator()
+        await validator.resolve("VMP-2026-00001")
+        await validator.resolve("00001")
+        await validator.resolve("VMP-2026-00002")
+        del credenciales.rows["VMP-2026-00001"]
+        validator.invalidate("VMP-2026-00001")
+        assert validator.stats()["entries"] == 1
+        assert (await validator.resolve("00001")).result["status"] == "not_found"
+
+    async def test_eliminar_durante_la_consulta_no_cachea_lo_viejo(self, credenciales):
+        """Una consulta que leyó la credencial antes de eliminarla no deja cacheado el resultado viejo"""
+        validator = _validator()
+        credenciales.gate = asyncio.Event()
+        en_curso = asyncio.create_task(validator.resolve("VMP-2026-00001"))
+        await asyncio.sleep(0)
+
+        del credenciales.rows["VMP-2026-00001"]
+        validator.invalidate("VMP-2026-00001")
+        despues = asyncio.create_task(validator.resolve("VMP-2026-00001"))
+        await asyncio.sleep(0)
+        credenciales.gate.set()
+
+        assert (await en_curso).result["status"] == "valid"  # leyó antes de eliminar
+        assert (await despues).result["status"] == "not_found"
+        assert (await validator.resolve("VMP-2026-00001")).result["status"] == "not_found"
+        assert credenciales.calls == 2
+
+    async def test_valida_no_se_cachea_despues_de_vencer(self, credenciales):
+        """Una credencial por vencer se cachea solo hasta su vencimiento"""
+        vence = datetime.now(timezone.utc) + timedelta(seconds=20)
+        credenciales.rows["VMP-2026-00003"] = _credencial("VMP-2026-00003", vence)
+        validacion = await _validator().resolve("VMP-2026-00003")
+        assert validacion.result["status"] == "valid"
+        assert validacion.max_age <= 20
+
+    async def test_error_de_base_llega_a_todos_y_no_se_cachea(self, credenciales):
+        """Si la consulta falla, todos los que esperaban reciben el error"""
+        validator = _validator()
+
+        async def falla(where, include=None):
+            await asyncio.sleep(0)
+            raise RuntimeError("db caída")
+
+        credenciales.find_first = falla
+        tareas = [asyncio.create_task(validator.resolve("VMP-2026-00001")) for _ in range(3)]
+        resultados = await asyncio.gather(*tareas, return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in resultados)
+        assert validator.stats()["entries"] == 0
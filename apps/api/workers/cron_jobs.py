@@ -39,3 +39,31 @@ async def check_expiring_credentials_async():
 def check_expiring_credentials():
     print("Running check_expiring_credentials task...")
     asyncio.run(check_expiring_credentials_async())
+
+async def refresh_metric_rollups_async(full: bool = False):
+    from services import metric_rollups
+
+    try:
+        if not prisma.is_connected():
+            await prisma.connect()
+
+        if full:
+            await metric_rollups.rebuild_all()
+        else:
+            # Solapado con la frecuencia de la tarea para no perder escrituras
+            rebuilt = await metric_rollups.refresh_recent(timedelta(minutes=15))
+            print(f"[CRON] Rollups de métricas recalculados: {rebuilt}")
+    except Exception as e:
+        print(f"Error refreshing metric rollups: {e}")
+    finally:
+        if prisma.is_connected():
+            await prisma.disconnect()
+
+@shared_task(name="workers.cron_jobs.refresh_metric_rollups")
+def refresh_metric_rollups():
+    asyncio.run(refresh_metric_rollups_async())
+
+@shared_task(name="workers.cron_jobs.rebuild_metric_rollups")
+def rebuild_metric_rollups():
+    print("Running rebuild_metric_rollups task...")
+    asyncio.run(refresh_metric_rollups_async(full=True))
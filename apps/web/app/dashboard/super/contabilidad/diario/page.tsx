@@ -51,45 +51,21 @@ export default function LibroDiarioPage() {
         setHasta('');
     };
 
-    const handleExportCSV = () => {
+    const handleExportCSV = async () => {
         try {
-            if (entries.length === 0) {
-                toast.error('No hay datos para exportar.');
-                return;
-            }
-
-            let csvContent = "\ufeff"; // UTF-8 BOM
-            csvContent += "Fecha;Concepto/Asiento;Referencia;Código Cuenta;Nombre Cuenta;Descripción Movimiento;Debe;Haber\n";
-            
-            entries.forEach(journal => {
-                const fechaStr = new Date(journal.date).toLocaleDateString('es-AR');
-                const refStr = journal.reference || '';
-                const concepto = journal.concept || '';
-                
-                if (journal.entries && Array.isArray(journal.entries)) {
-                    journal.entries.forEach((entry: any) => {
-                        const accCode = entry.account ? entry.account.code : entry.accountId;
-                        const accName = entry.account ? entry.account.name : '';
-                        const desc = entry.description || '';
-                        const debeStr = entry.debit > 0 ? entry.debit.toString().replace('.', ',') : '';
-                        const haberStr = entry.credit > 0 ? entry.credit.toString().replace('.', ',') : '';
-                        
-                        csvContent += `"${fechaStr}";"${concepto}";"${refStr}";"${accCode}";"${accName}";"${desc}";"${debeStr}";"${haberStr}"\n`;
-                    });
-                }
-            });
-
-            const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
+            // El servidor arma el archivo por lotes: incluye todo el rango sin cargarlo en pantalla
+            const blob = await accountingApi.exportJournal('xlsx', desde || undefined, hasta || undefined);
             const url = URL.createObjectURL(blob);
             const link = document.createElement("a");
             link.setAttribute("href", url);
-            link.setAttribute("download", `libro_diario_${new Date().toISOString().split('T')[0]}.csv`);
+            link.setAttribute("download", `libro_diario_${new Date().toISOString().split('T')[0]}.xlsx`);
             document.body.appendChild(link);
             link.click();
             document.body.removeChild(link);
-            toast.success('Libro Diario exportado a Excel (CSV) correctamente');
+            URL.revokeObjectURL(url);
+            toast.success('Libro Diario exportado a Excel correctamente');
         } catch (error) {
-            console.error('Error al exportar CSV:', error);
+            console.error('Error al exportar Excel:', error);
             toast.error('Ocurrió un error al exportar a Excel.');
         }
     };
@@ -24,6 +24,8 @@ export default function LibroMayorPage() {
     const [selectedCode, setSelectedCode] = useState('');
     const [mayorData, setMayorData] = useState<any>(null);
     const [isLoading, setIsLoading] = useState(false);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
+    const [isExporting, setIsExporting] = useState(false);
     const [isLoadingAccounts, setIsLoadingAccounts] = useState(true);
     const [desde, setDesde] = useState('');
     const [hasta, setHasta] = useState('');
@@ -63,6 +65,21 @@ export default function LibroMayorPage() {
         }
     };
 
+    // El mayor viene paginado: las páginas siguientes se agregan a la tabla
+    const fetchMoreMayor = async () => {
+        if (!mayorData?.nextCursor) return;
+        setIsLoadingMore(true);
+        try {
+            const data = await accountingApi.getMayorCuenta(selectedCode, desde || undefined, hasta || undefined, mayorData.nextCursor);
+            setMayorData({ ...data, entries: [...mayorData.entries, ...data.entries], openingBalance: mayorData.openingBalance });
+        } catch (error: any) {
+            console.error('Error fetching mayor:', error);
+            toast.error(error.message || 'No se pudieron cargar más movimientos.');
+        } finally {
+            setIsLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         if (selectedCode) {
             fetchMayor();
@@ -74,24 +91,41 @@ export default function LibroMayorPage() {
         setHasta('');
     };
 
-    const handleExportCSV = () => {
+    // El export lleva el mayor completo, no solo las páginas ya cargadas en la tabla
+    const fetchMayorCompleto = async () => {
+        let entries = [...mayorData.entries];
+        let cursor = mayorData.nextCursor;
+        let balance = mayorData.balance;
+        while (cursor) {
+            const data = await accountingApi.getMayorCuenta(selectedCode, desde || undefined, hasta || undefined, cursor, 1000);
+            entries = [...entries, ...data.entries];
+            cursor = data.nextCursor;
+            balance = data.balance;
+        }
+        return { ...mayorData, entries, balance, nextCursor: null };
+    };
+
+    const handleExportCSV = async () => {
+        if (!mayorData || !mayorData.entries || mayorData.entries.length === 0) {
+            toast.error('No hay datos para exportar.');
+            return;
+        }
+        setIsExporting(true);
         try {
-            if (!mayorData || !mayorData.entries || mayorData.entries.length === 0) {
-                toast.error('No hay datos para exportar.');
-                return;
-            }
+            const completo = await fetchMayorCompleto();
 
             let csvContent = "\ufeff"; // UTF-8 BOM
-            csvContent += `Libro Mayor - Cuenta: ${mayorData.account.code} - ${mayorData.account.name} (Tipo: ${mayorData.account.type})\n`;
+            csvContent += `Libro Mayor - Cuenta: ${completo.account.code} - ${completo.account.name} (Tipo: ${completo.account.type})\n`;
             csvContent += `Generado el: ${new Date().toLocaleDateString('es-AR')} ${new Date().toLocaleTimeString('es-AR')}\n`;
             if (desde || hasta) {
                 csvContent += `Rango de Fechas: Desde ${desde || 'Inicio'} Hasta ${hasta || 'Fin'}\n`;
             }
-            csvContent += `Saldo Acumulado Final: $${mayorData.balance.toFixed(2).replace('.', ',')}\n\n`;
+            csvContent += `Saldo Anterior: $${(completo.openingBalance ?? 0).toFixed(2).replace('.', ',')}\n`;
+            csvContent += `Saldo Acumulado Final: $${completo.balance.toFixed(2).replace('.', ',')}\n\n`;
             
             csvContent += "Fecha;Concepto del Asiento;Referencia;Tipo;Descripción del Movimiento;Debe;Haber;Saldo Acumulado\n";
             
-            mayorData.entries.forEach((entry: any) => {
+            completo.entries.forEach((entry: any) => {
                 const fechaStr = new Date(entry.date).toLocaleDateString('es-AR');
                 const concepto = entry.concept || '';
                 const refStr = entry.reference || '';
@@ -116,6 +150,8 @@ export default function LibroMayorPage() {
         } catch (error) {
             console.error('Error al exportar CSV:', error);
             toast.error('Ocurrió un error al exportar.');
+        } finally {
+            setIsExporting(false);
         }
     };
 
@@ -134,10 +170,10 @@ export default function LibroMayorPage() {
                     <Button 
                         variant="outline" 
                         onClick={handleExportCSV} 
-                        disabled={isLoading || !mayorData || !mayorData.entries || mayorData.entries.length === 0}
+                        disabled={isLoading || isExporting || !mayorData || !mayorData.entries || mayorData.entries.length === 0}
                     >
                         <FileSpreadsheet className="h-4 w-4 mr-2 text-emerald-600" />
-                        Exportar Excel
+                        {isExporting ? 'Exportando...' : 'Exportar Excel'}
                     </Button>
                 </div>
             </div>
@@ -285,7 +321,16 @@ export default function LibroMayorPage() {
                                     </td>
                                 </tr>
                             ) : (
-                                mayorData.entries.map((entry: any) => (
+                                <>
+                                {mayorData.openingBalance !== 0 && (
+                                    <tr className="bg-slate-50/50">
+                                        <td colSpan={5} className="px-6 py-3 text-xs font-bold text-slate-500 uppercase">Saldo anterior</td>
+                                        <td className="px-6 py-3 text-right text-sm font-mono font-bold text-slate-900 bg-slate-50/30">
+                                            ${mayorData.openingBalance.toLocaleString('es-AR', {minimumFractionDigits: 2})}
+                                        </td>
+                                    </tr>
+                                )}
+                                {mayorData.entries.map((entry: any) => (
                                     <tr key={entry.id} className="hover:bg-slate-50/50 transition-colors">
                                         <td className="px-6 py-4 text-sm text-slate-900 whitespace-nowrap">
                                             {new Date(entry.date).toLocaleDateString('es-AR')}
@@ -307,11 +352,19 @@ export default function LibroMayorPage() {
                                             ${entry.balance.toLocaleString('es-AR', {minimumFractionDigits: 2})}
                                         </td>
                                     </tr>
-                                ))
+                                ))}
+                                </>
                             )}
                         </tbody>
                     </table>
                 </div>
+                {mayorData?.nextCursor && !isLoading && (
+                    <div className="p-4 border-t border-slate-100 text-center">
+                        <Button variant="outline" onClick={fetchMoreMayor} disabled={isLoadingMore}>
+                            {isLoadingMore ? 'Cargando...' : 'Cargar más movimientos'}
+                        </Button>
+                    </div>
+                )}
             </Card>
         </div>
     );
@@ -47,9 +47,10 @@ export default function ValidarCredencialPage({ params }: { params: { codigo: st
             setIsLoading(true);
             setError(null);
 
+            // El backend normaliza el número (BLT-RT/1294, 1294, VMP-2026-1294...);
+            // solo se evita la barra, que no puede ir dentro del path.
             const raw = decodeURIComponent(params.codigo).trim().toUpperCase();
-            const num = raw.replace('BLT-RT/', '').replace('BLT-RT-', '').replace('VMP-2026-', '').replace('BLT-RT', '');
-            const targetCode = raw.includes('VMP-') ? raw : `VMP-2026-${num}`;
+            const targetCode = encodeURIComponent(raw.replace(/\//g, '-'));
 
             const data = await api.get(`/public/validar/${targetCode}`);
             setResult(data);
@@ -1,4 +1,4 @@
-import { api } from '../api-client';
+import { api, API_URL } from '../api-client';
 
 export interface VentaItem {
   descripcion: string;
@@ -55,18 +55,44 @@ export const accountingApi = {
   deleteCompra: async (id: string) => {
     return await api.delete(`/accounting/compras/${id}`);
   },
+  // La lectura del PDF corre como job en el servidor: se encola y se
+  // consulta hasta que termina (un PDF ya leído vuelve terminado al instante)
   uploadPdf: async (file: File) => {
     const formData = new FormData();
     formData.append('file', file);
-    return await api.post('/accounting/compras/upload-pdf', formData);
+    let job = await api.post('/accounting/compras/pdf-jobs', formData);
+    const deadline = Date.now() + 120_000;
+    while (job.status === 'PENDING' || job.status === 'PROCESSING') {
+      if (Date.now() > deadline) {
+        throw new Error('La lectura del PDF está demorando demasiado. Intente nuevamente.');
+      }
+      await new Promise(resolve => setTimeout(resolve, 1000));
+      job = await api.get(`/accounting/compras/pdf-jobs/${job.jobId}`);
+    }
+    if (job.status === 'FAILED') {
+      throw new Error(job.error || 'No se pudo leer el PDF de la factura.');
+    }
+    return job.result;
   },
   
   // Reports
-  getBalance: async () => {
-    return await api.get('/accounting/reports/balance');
+  // asOf (YYYY-MM-DD): saldos al cierre de ese día
+  getBalance: async (asOf?: string) => {
+    return await api.get(`/accounting/reports/balance${asOf ? `?asOf=${asOf}` : ''}`);
   },
-  getSummary: async () => {
-    return await api.get('/accounting/summary');
+  getSummary: async (asOf?: string) => {
+    return await api.get(`/accounting/summary${asOf ? `?asOf=${asOf}` : ''}`);
+  },
+
+  // Cierre de períodos (YYYY-MM)
+  getPeriods: async () => {
+    return await api.get('/accounting/periods');
+  },
+  closePeriod: async (period: string) => {
+    return await api.post('/accounting/periods/close', { period });
+  },
+  reopenPeriod: async (period: string) => {
+    return await api.delete(`/accounting/periods/${period}`);
   },
 
   // Journal
@@ -81,14 +107,28 @@ export const accountingApi = {
     }
     return await api.get(url);
   },
+  // Exportación completa generada en el servidor (streaming por lotes)
+  exportJournal: async (formato: 'csv' | 'xlsx', desde?: string, hasta?: string): Promise<Blob> => {
+    const token = typeof window !== 'undefined' ? localStorage.getItem('vmp_token') : null;
+    const params = new URLSearchParams({ formato });
+    if (desde) params.append('desde', desde);
+    if (hasta) params.append('hasta', hasta);
+    const res = await fetch(`${API_URL}/api/accounting/journal/export?${params.toString()}`, {
+      headers: token ? { Authorization: `Bearer ${token}` } : {},
+    });
+    if (!res.ok) throw new Error('Error al exportar el Libro Diario');
+    return res.blob();
+  },
   createManualEntry: async (data: any) => {
     return await api.post('/accounting/journal', data);
   },
-  getMayorCuenta: async (code: string, desde?: string, hasta?: string) => {
+  getMayorCuenta: async (code: string, desde?: string, hasta?: string, cursor?: string, limit?: number) => {
     let url = `/accounting/journal/accounts/${code}`;
     const params = new URLSearchParams();
     if (desde) params.append('desde', desde);
     if (hasta) params.append('hasta', hasta);
+    if (cursor) params.append('cursor', cursor);
+    if (limit) params.append('limit', String(limit));
     const queryStr = params.toString();
     if (queryStr) {
       url += `?${queryStr}`;
@@ -15,6 +15,40 @@ export interface CredencialListItem {
     empresaNombre?: string;
 }
 
+export interface VerificacionItem {
+    consulta: string;
+    tipo: 'numero' | 'dni';
+    status: 'valid' | 'expired' | 'not_found';
+    numero?: string;
+    curso?: string;
+    fechaVencimiento?: string | null;
+    dni?: string;
+    alumno?: string;
+    credenciales?: { numero: string; status: 'valid' | 'expired'; curso: string; fechaVencimiento: string | null }[];
+}
+
+export interface VerificacionMasiva {
+    total: number;
+    validas: number;
+    vencidas: number;
+    noEncontradas: number;
+    resultados: VerificacionItem[];
+}
+
+export interface LoteCredenciales {
+    jobId: string;
+    status: 'PENDING' | 'PROCESSING' | 'DONE' | 'FAILED';
+    cursoId: string;
+    empresaId?: string | null;
+    total: number;
+    procesadas: number;
+    emitidas: number;
+    omitidas: number;
+    fallidas: number;
+    resultados?: { alumnoId: string; numero?: string; estado: string; pdfUrl?: string; error?: string }[] | null;
+    error?: string | null;
+}
+
 export const credencialesApi = {
     /**
      * Listar credenciales (INSTRUCTOR/SUPER_ADMIN)
@@ -41,6 +75,27 @@ export const credencialesApi = {
         return api.post('/credenciales/generar-manual', { alumnoId, cursoId });
     },
 
+    /**
+     * Emitir en lote las credenciales de un curso (INSTRUCTOR/SUPER_ADMIN)
+     */
+    async emitirLote(cursoId: string, empresaId?: string): Promise<LoteCredenciales> {
+        return api.post('/credenciales/lotes', { cursoId, empresaId });
+    },
+
+    /**
+     * Avance de un lote de emisión
+     */
+    async obtenerLote(jobId: string): Promise<LoteCredenciales> {
+        return api.get(`/credenciales/lotes/${jobId}`);
+    },
+
+    /**
+     * Verificar de una vez las credenciales de una cuadrilla (usuarios B2B)
+     */
+    async verificarMasivo(numeros: string[], dnis: string[] = []): Promise<VerificacionMasiva> {
+        return api.post('/b2b/credenciales/verificar', { numeros, dnis });
+    },
+
     /**
      * Eliminar credencial (SUPER_ADMIN)
      */